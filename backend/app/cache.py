@@ -0,0 +1,190 @@
+"""In-process cache of API responses, invalidated by a global data version.
+
+Case, genomics and anomaly responses only change when ingestion or anomaly
+detection commits new data, at most every few hours. :func:`cached_endpoint`
+memoizes an endpoint's result keyed by endpoint, its normalized query
+parameters and the current data version; writers call
+:func:`bump_data_version` after committing, which makes every older entry
+unreachable (they are dropped on the next lookup).
+
+The cache is LRU-bounded to ``settings.RESPONSE_CACHE_MAX_ENTRIES`` entries
+(0 disables it) and single-flight: concurrent misses for the same key share one
+computation instead of stampeding the database. Hit/miss counts are reported by
+``/api/health/cache``.
+
+:class:`ConditionalGetMiddleware` lets clients skip the body altogether: read
+endpoints carry a strong ``ETag`` derived from the data version and the request
+path and query, and a matching ``If-None-Match`` is answered with ``304 Not
+Modified`` before the endpoint runs. ``Cache-Control`` comes from
+``settings.CACHE_CONTROL``, keyed by path prefix; paths without a policy are
+passed through untouched.
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import logging
+import secrets
+from collections import OrderedDict
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_data_version = 0
+# Versions restart at 0 with the process, so ETags also carry a per-process token
+_boot_token = secrets.token_hex(8)
+
+
+def data_version() -> int:
+    return _data_version
+
+
+def bump_data_version(reason: str):
+    """Invalidate every cached response; call after committing data that endpoints read."""
+    global _data_version
+    _data_version += 1
+    logger.info(f"Data version {_data_version} ({reason})")
+
+
+class ResponseCache:
+    def __init__(self):
+        self._entries: OrderedDict = OrderedDict()
+        self._inflight: dict = {}
+        self._version = _data_version
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_compute(self, key, compute):
+        """Return the cached value for ``key`` at the current data version, computing it at most once."""
+        version = _data_version
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        full_key = (version, key)
+
+        while True:
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return self._entries[full_key]
+            pending = self._inflight.get(full_key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The request computing it went away; compute it ourselves
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # waiters re-raise it; don't warn about an unretrieved exception
+            raise
+        finally:
+            del self._inflight[full_key]
+
+        future.set_result(value)
+        if version == self._version and settings.RESPONSE_CACHE_MAX_ENTRIES > 0:
+            self._entries[full_key] = value
+            while len(self._entries) > settings.RESPONSE_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "data_version": _data_version,
+            "entries": len(self._entries),
+            "max_entries": settings.RESPONSE_CACHE_MAX_ENTRIES,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+api_cache = ResponseCache()
+
+
+def get_cache_stats() -> dict:
+    return api_cache.stats()
+
+
+def cached_endpoint(func):
+    """Serve ``func``'s result from :data:`api_cache`; apply below the ``@router.get`` decorator."""
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__name__}"
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        # Defaults are filled in, so omitted and explicitly default parameters share an entry
+        params = tuple(sorted((k, repr(v)) for k, v in bound.arguments.items()))
+        return await api_cache.get_or_compute((name, params), lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def _cache_policy(path: str) -> str | None:
+    """The ``Cache-Control`` value of the longest configured prefix of ``path``."""
+    matches = [
+        prefix for prefix in settings.CACHE_CONTROL if path == prefix or path.startswith(prefix.rstrip("/") + "/")
+    ]
+    return settings.CACHE_CONTROL[max(matches, key=len)] if matches else None
+
+
+def _etag(request: Request, version: int) -> str:
+    query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+    digest = hashlib.sha256(f"{_boot_token}:{version}:{request.url.path}?{query}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so a W/ prefix added by a proxy still matches
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next) -> Response:
+        policy = _cache_policy(request.url.path)
+        if policy is None or request.method not in ("GET", "HEAD"):
+            return await call_next(request)
+
+        version = _data_version
+        etag = _etag(request, version)
+        headers = {"ETag": etag, "Cache-Control": policy}
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        # Only tag bodies computed entirely at this version; a concurrent bump may have mixed data in.
+        # A response that sets its own Cache-Control (a partial dashboard) is left untagged.
+        if response.status_code == 200 and version == _data_version and "cache-control" not in response.headers:
+            response.headers.update(headers)
+        return response
@@ -5,6 +5,55 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     FORECAST_ALPHA: float = 0.3
     FORECAST_CI_MULTIPLIER: float = 1.96
+    FLUNET_BACKFILL_CONCURRENCY: int = 4
+    # "copy" (binary COPY into a staging table) or "insert" (batched INSERT ... ON CONFLICT)
+    BULK_LOAD_METHOD: str = "copy"
+    # "update" overwrites revised counts (ON CONFLICT DO UPDATE when changed); "ignore" keeps the first value
+    FLUNET_UPSERT_MODE: str = "update"
+    # Weeks before each country's watermark that delta ingestion re-requests to pick up revisions
+    FLUNET_REVISION_LOOKBACK_WEEKS: int = 4
+    # flu_cases layout: "wide" (varchar flu_type/source, "" for no region/city) or "compact" (SMALLINT
+    # codes via lookup tables, NULL region/city, narrower unique key; PostgreSQL 15+). See app.models
+    FLU_CASE_SCHEMA: str = "wide"
+    # The nightly truncate-and-reload is an optional consistency check once delta ingestion runs
+    FULL_REBUILD_ENABLED: bool = False
+    # An interrupted full backfill resumes from its per-year checkpoints if retried within this window
+    BACKFILL_CHECKPOINT_MAX_AGE_HOURS: int = 24
+    # Nextstrain dataset paths ingested into genomic_sequences; the lineage is taken from the path
+    NEXTSTRAIN_DATASETS: list[str] = [
+        "flu/seasonal/h3n2/ha/12y",
+        "flu/seasonal/h1n1pdm/ha/12y",
+        "flu/seasonal/vic/ha/12y",
+        "flu/seasonal/yam/ha/12y",
+    ]
+    NEXTSTRAIN_CONCURRENCY: int = 4
+    # Upstream responses are cached here (default: a directory under the system temp dir) and
+    # revalidated with ETag/Last-Modified; unchanged content is not re-parsed or re-loaded
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_DIR: str = ""
+    HTTP_CACHE_MAX_AGE_DAYS: int = 30
+    # Where ingestion reads upstream APIs from: "live", "record" (live, archiving every payload into
+    # INGEST_ARCHIVE_DIR) or "replay" (served from that archive only, no network access)
+    INGEST_SOURCE: str = "live"
+    INGEST_ARCHIVE_DIR: str = "data/payload-archive"
+    # Answer the /api/cases/* endpoints and forecasts from an in-memory columnar copy of
+    # flu_cases_weekly, rebuilt after each ingest, instead of querying the database per request
+    CASE_SNAPSHOT_ENABLED: bool = False
+    # API responses are cached in-process until ingestion commits new data; 0 disables the cache
+    RESPONSE_CACHE_MAX_ENTRIES: int = 512
+    # Cache-Control per API path prefix (longest match wins). These responses also get ETags
+    # and answer If-None-Match with 304 until the data changes; other paths are left alone
+    CACHE_CONTROL: dict[str, str] = {
+        "/api/cases": "public, max-age=60",
+        "/api/genomics": "public, max-age=300",
+        "/api/anomalies": "public, max-age=60",
+        "/api/forecast": "public, max-age=300",
+        "/api/dashboard": "public, max-age=60",
+    }
+    # Where CPU-heavy parsing and forecast math run: "thread", "process" or "inline" (on the event loop)
+    CPU_EXECUTOR: str = "thread"
+    CPU_EXECUTOR_WORKERS: int = 2
+    LOOP_LAG_INTERVAL_SECONDS: float = 0.5
 
     model_config = {"extra": "ignore"}
 
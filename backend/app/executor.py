@@ -0,0 +1,139 @@
+"""Off-loop execution of CPU-heavy work, plus event-loop blocking measurements.
+
+Ingestion parsing and forecast math are synchronous and would otherwise stall
+every API request sharing the event loop. :func:`run_cpu_bound` sends such work
+to a thread or process pool (``settings.CPU_EXECUTOR``: ``thread``, ``process``
+or ``inline``) and records how long each kind of task took.
+
+:class:`LoopLagMonitor` measures how late the loop wakes up from a fixed
+sleep, which is exactly how long some callback blocked it. Both are reported by
+``/api/health/executor``.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LAG_SAMPLE_WINDOW = 1200
+
+_executor: Executor | None = None
+_task_stats: dict[str, dict] = defaultdict(lambda: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+
+
+def _get_executor() -> Executor | None:
+    global _executor
+    if settings.CPU_EXECUTOR == "inline":
+        return None
+    if _executor is None:
+        workers = max(1, settings.CPU_EXECUTOR_WORKERS)
+        if settings.CPU_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+        logger.info("Started %s CPU executor with %s workers", settings.CPU_EXECUTOR, workers)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _record(label: str, elapsed: float):
+    stats = _task_stats[label]
+    stats["count"] += 1
+    stats["total_seconds"] += elapsed
+    stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+
+async def run_cpu_bound(func, *args, label: str | None = None):
+    """Run ``func(*args)`` on the configured executor and await its result.
+
+    With a process pool ``func`` and its arguments must be picklable, so pass
+    module-level functions and plain data.
+    """
+    label = label or getattr(func, "__qualname__", repr(func))
+    executor = _get_executor()
+    started = time.perf_counter()
+    try:
+        if executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args))
+    finally:
+        _record(label, time.perf_counter() - started)
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how much later than scheduled a periodic sleep wakes up."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: deque[float] = deque(maxlen=LAG_SAMPLE_WINDOW)
+        self.blocked_seconds = 0.0
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def record(self, lag: float):
+        lag = max(0.0, lag)
+        self.samples.append(lag)
+        self.blocked_seconds += lag
+        self.max_lag = max(self.max_lag, lag)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - started - self.interval)
+
+    def stats(self) -> dict:
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else 0.0
+        return {
+            "interval_seconds": self.interval,
+            "samples": len(ordered),
+            "p99_ms": round(p99 * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+
+loop_monitor = LoopLagMonitor(settings.LOOP_LAG_INTERVAL_SECONDS)
+
+
+def get_executor_stats() -> dict:
+    return {
+        "mode": settings.CPU_EXECUTOR,
+        "workers": settings.CPU_EXECUTOR_WORKERS,
+        "tasks": {
+            label: {
+                "count": s["count"],
+                "total_seconds": round(s["total_seconds"], 3),
+                "max_seconds": round(s["max_seconds"], 3),
+            }
+            for label, s in _task_stats.items()
+        },
+        "loop_lag": loop_monitor.stats(),
+    }
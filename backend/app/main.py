@@ -9,7 +9,10 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from slowapi.util import get_remote_address
 
+from app.cache import ConditionalGetMiddleware, get_cache_stats
+from app.executor import get_executor_stats, loop_monitor, shutdown_executor
 from app.scheduler import create_scheduler, get_backfill_status, init_db, run_startup_jobs
+from app.services.snapshot import refresh_snapshot
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
@@ -19,14 +22,18 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    await refresh_snapshot()
     scheduler = create_scheduler()
     scheduler.start()
+    loop_monitor.start()
     # Run startup jobs in background so the app starts immediately
     asyncio.create_task(run_startup_jobs())
     logger.info("FluTracker backend started")
     yield
     # Shutdown
     scheduler.shutdown(wait=False)
+    await loop_monitor.stop()
+    shutdown_executor()
     logger.info("FluTracker backend stopped")
 
 
@@ -35,6 +42,8 @@ limiter = Limiter(key_func=get_remote_address, default_limits=["60/minute"])
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Innermost, so 304s still pass through CORS and rate limiting
+app.add_middleware(ConditionalGetMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -45,13 +54,14 @@ app.add_middleware(
 app.add_middleware(SlowAPIMiddleware)
 
 # Import and include routers (after app creation so routers can reference `app`)
-from app.routers import anomalies, cases, genomics  # noqa: E402
+from app.routers import anomalies, cases, dashboard, genomics  # noqa: E402
 from app.routers import forecast as forecast_router  # noqa: E402
 
 app.include_router(cases.router, prefix="/api")
 app.include_router(genomics.router, prefix="/api/genomics")
 app.include_router(anomalies.router, prefix="/api")
 app.include_router(forecast_router.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api")
 
 
 @app.get("/api/health")
@@ -62,3 +72,13 @@ async def health():
 @app.get("/api/health/backfill")
 async def health_backfill():
     return await get_backfill_status()
+
+
+@app.get("/api/health/executor")
+async def health_executor():
+    return get_executor_stats()
+
+
+@app.get("/api/health/cache")
+async def health_cache():
+    return get_cache_stats()
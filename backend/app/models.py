@@ -2,11 +2,19 @@ import enum
 from datetime import datetime
 
 from sqlalchemy import (
+    JSON,
+    BigInteger,
     Column,
     Date,
     DateTime,
+    Index,
     Integer,
+    MetaData,
+    SmallInteger,
     String,
+    Table,
+    Text,
+    TypeDecorator,
     UniqueConstraint,
 )
 from sqlalchemy import (
@@ -14,6 +22,8 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import DeclarativeBase
 
+from app.config import settings
+
 
 class FluType(str, enum.Enum):
     H1N1 = "H1N1"
@@ -40,22 +50,161 @@ class Base(DeclarativeBase):
     pass
 
 
+class CodedEnum(TypeDecorator):
+    """A closed set of names stored as SMALLINT codes (1, 2, ...) rather than varchars.
+
+    Binds and results use the names, so code reading or writing the column
+    cannot tell it from a string (or non-native enum) column. Given an Enum
+    class it stores member names like ``Enum(native_enum=False)``, accepts
+    members, names or values, and returns members. New names must be appended:
+    a name's code is its position.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, values: type[enum.Enum] | tuple[str, ...]):
+        super().__init__()
+        self.values = values
+        members = list(values) if isinstance(values, type) else []
+        self.names = tuple(m.name for m in members) if members else tuple(values)
+        self._codes = {name: code for code, name in enumerate(self.names, start=1)}
+        self._codes.update({m.value: self._codes[m.name] for m in members})
+
+    def rows(self) -> list[dict]:
+        """``{"code", "name"}`` rows for the type's lookup table."""
+        return [{"code": code, "name": name} for code, name in enumerate(self.names, start=1)]
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._codes[value.name if isinstance(value, enum.Enum) else value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not one of {self.names}") from None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        name = self.names[value - 1]
+        return self.values[name] if isinstance(self.values, type) else name
+
+
+class EmptyAsNull(TypeDecorator):
+    """String column that stores ``""`` as NULL and reads NULL back as ``""``."""
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return value or None
+
+    def process_result_value(self, value, dialect):
+        return value or ""
+
+
+FLU_TYPE_CODES = CodedEnum(FluType)
+CASE_SOURCE_CODES = CodedEnum(("who_flunet",))
+
+
+def flu_case_table(metadata: MetaData, compact: bool = False) -> Table:
+    """The ``flu_cases`` table in the default (wide) or the compact layout.
+
+    The compact layout stores ``flu_type`` and ``source`` as SMALLINT codes
+    listed in the ``flu_types`` and ``case_sources`` lookup tables, stores empty
+    ``region``/``city`` as NULL, and keys rows on a narrower unique index that
+    treats NULLs as equal (PostgreSQL 15+). Rows read and write the same values
+    either way; only ``refresh_weekly_rollup`` translates codes back to names in
+    SQL. Selected by ``settings.FLU_CASE_SCHEMA``; existing databases are
+    converted with migrations/compact_flu_cases.sql.
+    """
+    if compact:
+        place, flu_type, source = EmptyAsNull, FLU_TYPE_CODES, CASE_SOURCE_CODES
+        # Fixed-width columns first, so index tuples carry no alignment padding
+        key = UniqueConstraint(
+            "time",
+            "flu_type",
+            "source",
+            "country_code",
+            "region",
+            "city",
+            name="uq_flu_case",
+            postgresql_nulls_not_distinct=True,
+        )
+    else:
+        place, flu_type, source = String, SAEnum(FluType, native_enum=False), String(50)
+        key = UniqueConstraint("country_code", "region", "city", "flu_type", "source", "time", name="uq_flu_case")
+
+    return Table(
+        "flu_cases",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("country_code", String(10), nullable=False, index=True),
+        Column("region", place(100), default=""),
+        Column("city", place(100), default=""),
+        Column("flu_type", flu_type, nullable=False),
+        Column("source", source, nullable=False, default="who_flunet"),
+        Column("time", Date, nullable=False),
+        Column("new_cases", Integer, nullable=False, default=0),
+        Column("iso_year", Integer, nullable=False),
+        Column("iso_week", Integer, nullable=False),
+        key,
+        # Rollup refreshes sum the touched weeks from this index alone (INCLUDE is PostgreSQL-only);
+        # it also serves every other lookup by time, so there is no single-column time index
+        Index(
+            "ix_flu_cases_time_covering",
+            "time",
+            postgresql_include=["country_code", "flu_type", "new_cases"],
+        ),
+        # Range-partitioned by ISO year on PostgreSQL (see app.services.partitions)
+        info={"partition_by": "time"},
+    )
+
+
 class FluCase(Base):
-    __tablename__ = "flu_cases"
+    __table__ = flu_case_table(Base.metadata, compact=settings.FLU_CASE_SCHEMA == "compact")
+
+
+class FluTypeCode(Base):
+    """Lookup of the flu_type codes of the compact flu_cases layout; rewritten on startup (see app.services.codes)."""
+
+    __tablename__ = "flu_types"
+
+    code = Column(SmallInteger, primary_key=True, autoincrement=False)
+    # As stored by the varchar flu_type columns (the FluType member name)
+    name = Column(String(32), nullable=False, unique=True)
+
+
+class CaseSource(Base):
+    """Lookup of the source codes of the compact flu_cases layout; rewritten on startup (see app.services.codes)."""
+
+    __tablename__ = "case_sources"
+
+    code = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(String(50), nullable=False, unique=True)
+
+
+class FluCaseWeekly(Base):
+    """Weekly totals of flu_cases per country and type, refreshed by ingestion (see app.services.rollup)."""
+
+    __tablename__ = "flu_cases_weekly"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    country_code = Column(String(10), nullable=False, index=True)
-    region = Column(String(100), default="")
-    city = Column(String(100), default="")
+    time = Column(Date, nullable=False)
+    country_code = Column(String(10), nullable=False)
     flu_type = Column(SAEnum(FluType, native_enum=False), nullable=False)
-    source = Column(String(50), nullable=False, default="who_flunet")
-    time = Column(Date, nullable=False, index=True)
     new_cases = Column(Integer, nullable=False, default=0)
-    iso_year = Column(Integer, nullable=False)
-    iso_week = Column(Integer, nullable=False)
 
     __table_args__ = (
-        UniqueConstraint("country_code", "region", "city", "flu_type", "source", "time", name="uq_flu_case"),
+        UniqueConstraint("time", "country_code", "flu_type", name="uq_flu_cases_weekly"),
+        # WHERE country_code = X [AND time >= cutoff] GROUP BY time (historical chart, forecast)
+        Index("ix_flu_cases_weekly_country_time", "country_code", "time"),
+        # WHERE time >= cutoff GROUP BY country_code/time/flu_type SUM(new_cases), as index-only scans
+        Index(
+            "ix_flu_cases_weekly_time_covering",
+            "time",
+            postgresql_include=["country_code", "flu_type", "new_cases"],
+        ),
     )
 
 
@@ -69,7 +218,60 @@ class GenomicSequence(Base):
     collection_date = Column(Date, nullable=False)
     count = Column(Integer, nullable=False, default=1)
 
-    __table_args__ = (UniqueConstraint("country_code", "clade", "lineage", "collection_date", name="uq_genomic_seq"),)
+    __table_args__ = (
+        UniqueConstraint("country_code", "clade", "lineage", "collection_date", name="uq_genomic_seq"),
+        # WHERE collection_date >= cutoff GROUP BY clade/country_code SUM(count), as index-only scans
+        Index(
+            "ix_genomic_sequences_collection_date_covering",
+            "collection_date",
+            postgresql_include=["clade", "country_code", "count"],
+        ),
+    )
+
+
+class Country(Base):
+    """Country dimension joined by the cases queries; rewritten from app/data on startup (see app.services.countries)."""
+
+    __tablename__ = "countries"
+
+    code = Column(String(10), primary_key=True)
+    name = Column(String(200), nullable=False, default="")
+    continent = Column(String(32), nullable=False, default="")
+    population = Column(BigInteger, nullable=True)
+
+
+class IngestionState(Base):
+    """High-water mark of the latest ISO week ingested per source and country."""
+
+    __tablename__ = "ingestion_state"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String(50), nullable=False)
+    country_code = Column(String(10), nullable=False)
+    last_iso_year = Column(Integer, nullable=False)
+    last_iso_week = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("source", "country_code", name="uq_ingestion_state"),)
+
+
+class BackfillCheckpoint(Base):
+    """Progress of an interrupted backfill: pages already downloaded per job and unit (e.g. ISO year)."""
+
+    __tablename__ = "backfill_checkpoints"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job = Column(String(50), nullable=False)
+    unit = Column(Integer, nullable=False)
+    # URLs of the pages downloaded so far, in order; their bodies are in the HTTP response cache
+    pages = Column(JSON, nullable=False, default=list)
+    # The next page to request, or None once every page has been downloaded
+    next_link = Column(Text, nullable=True)
+    # Set once the unit's rows are committed
+    completed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("job", "unit", name="uq_backfill_checkpoint"),)
 
 
 class Anomaly(Base):
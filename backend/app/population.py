@@ -31,3 +31,8 @@ POPULATIONS = _load_populations()
 
 def get_population(country_code: str) -> int:
     return POPULATIONS.get(country_code.upper(), DEFAULT_POPULATION)
+
+
+def per_100k(cases: int, country_code: str) -> float:
+    """Cases per 100k inhabitants, as SQL computes it from the countries table (unrounded)."""
+    return cases / get_population(country_code) * 100000
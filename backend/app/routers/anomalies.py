@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from sqlalchemy import desc, select
 
+from app.cache import cached_endpoint
 from app.database import async_session
 from app.models import Anomaly
 from app.schemas import AnomalyOut
@@ -9,6 +10,7 @@ router = APIRouter()
 
 
 @router.get("/anomalies", response_model=list[AnomalyOut])
+@cached_endpoint
 async def get_anomalies():
     async with async_session() as session:
         result = await session.execute(select(Anomaly).order_by(desc(Anomaly.detected_at)).limit(50))
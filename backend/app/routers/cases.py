@@ -1,127 +1,46 @@
 from datetime import date
 
 from fastapi import APIRouter, Query
-from sqlalchemy import String, and_, case, cast, desc, func, select
 
-from app.database import async_session
-from app.models import FluCase
-from app.population import get_population
+from app.cache import cached_endpoint
 from app.schemas import CaseSummary, CountryRow, HistoricalPoint, MapDataPoint, SubtypePoint
+from app.services.case_stats import SORT_FIELDS, CaseStats, CountryFilters, case_stats
 from app.utils import weeks_ago
 
 router = APIRouter()
 
-
-def _per_100k(cases: int, cc: str) -> float:
-    pop = get_population(cc)
-    return round(cases / pop * 100000, 2) if pop else 0
-
-
-@router.get("/cases/summary", response_model=CaseSummary)
-async def cases_summary():
-    async with async_session() as session:
-        summary_r = await session.execute(
-            select(
-                func.max(FluCase.time).label("max_date"),
-                func.sum(FluCase.new_cases).label("total_cases"),
-                func.count(func.distinct(FluCase.country_code)).label("countries_reporting"),
-            )
-        )
-        summary = summary_r.one()
-        max_date = summary.max_date
-        if not max_date:
-            return CaseSummary()
-
-        current_cutoff = weeks_ago(max_date, 1)
-        prior_cutoff = weeks_ago(max_date, 2)
-
-        week_totals_r = await session.execute(
-            select(
-                func.sum(case((FluCase.time >= current_cutoff, FluCase.new_cases), else_=0)).label(
-                    "current_week_cases"
-                ),
-                func.sum(
-                    case(
-                        (
-                            and_(
-                                FluCase.time >= prior_cutoff,
-                                FluCase.time < current_cutoff,
-                            ),
-                            FluCase.new_cases,
-                        ),
-                        else_=0,
-                    )
-                ).label("prior_week_cases"),
-            )
-        )
-        week_totals = week_totals_r.one()
-        current_week = week_totals.current_week_cases or 0
-        prior_week = week_totals.prior_week_cases or 0
-
-        change = ((current_week - prior_week) / prior_week * 100) if prior_week else 0
-
-        return CaseSummary(
-            total_cases=summary.total_cases or 0,
-            countries_reporting=summary.countries_reporting or 0,
-            current_week_cases=current_week,
-            prior_week_cases=prior_week,
-            week_change_pct=round(change, 1),
-        )
-
-
-@router.get("/cases/map", response_model=list[MapDataPoint])
-async def cases_map():
-    async with async_session() as session:
-        max_date_r = await session.execute(select(func.max(FluCase.time)))
-        max_date = max_date_r.scalar()
-        if not max_date:
-            return []
-
-        cutoff = weeks_ago(max_date, 4)
-        q = (
-            select(
-                FluCase.country_code,
-                func.sum(FluCase.new_cases).label("total"),
-            )
-            .where(FluCase.time >= cutoff)
-            .group_by(FluCase.country_code)
-        )
-        result = await session.execute(q)
-        return [
-            MapDataPoint(
-                country_code=r.country_code,
-                total_cases=r.total,
-                per_100k=_per_100k(r.total, r.country_code),
-            )
-            for r in result
-        ]
+# Responses are built from a CaseStats (app.services.case_stats), which answers
+# from the in-memory case snapshot when available and from SQL otherwise. The
+# builders below are shared with the /api/dashboard bundle.
+
+
+async def case_summary(stats: CaseStats) -> CaseSummary:
+    summary = await stats.summary()
+    if summary is None:
+        return CaseSummary()
+    total_cases, countries_reporting, current_week, prior_week = summary
+    change = ((current_week - prior_week) / prior_week * 100) if prior_week else 0
+    return CaseSummary(
+        total_cases=total_cases,
+        countries_reporting=countries_reporting,
+        current_week_cases=current_week,
+        prior_week_cases=prior_week,
+        week_change_pct=round(change, 1),
+    )
+
+
+async def map_points(stats: CaseStats) -> list[MapDataPoint]:
+    max_date = await stats.max_date()
+    if not max_date:
+        return []
+    rows = await stats.country_incidence(since=weeks_ago(max_date, 4))
+    return [MapDataPoint(country_code=cc, total_cases=total, per_100k=round(rate, 2)) for cc, total, rate in rows]
 
 
-@router.get("/cases/historical", response_model=list[HistoricalPoint])
-async def cases_historical(
-    country: str = Query("", max_length=2, description="Country code filter"),
-):
+def historical_points(rows: list[tuple[date, int]]) -> list[HistoricalPoint]:
     """Season comparison data — current + past 9 seasons, normalized Oct-Sep."""
-    async with async_session() as session:
-        q = (
-            select(
-                FluCase.time,
-                func.sum(FluCase.new_cases).label("total"),
-            )
-            .group_by(FluCase.time)
-            .order_by(FluCase.time)
-        )
-        if country:
-            q = q.where(FluCase.country_code == country.upper())
-        result = await session.execute(q)
-        rows = list(result)
-
-    if not rows:
-        return []
-
     points = []
-    for r in rows:
-        d = r.time
+    for d, total in rows:
         # Season year: Oct starts new season
         season_year = d.year if d.month >= 10 else d.year - 1
         season = f"{season_year}/{season_year + 1}"
@@ -133,140 +52,101 @@ async def cases_historical(
                 season=season,
                 week_offset=week_offset,
                 date=d.isoformat(),
-                cases=r.total,
+                cases=total,
             )
         )
-
     return points
 
 
-@router.get("/cases/subtypes", response_model=list[SubtypePoint])
-async def cases_subtypes():
-    async with async_session() as session:
-        max_date_r = await session.execute(select(func.max(FluCase.time)))
-        max_date = max_date_r.scalar()
-        if not max_date:
-            return []
+async def subtype_points(stats: CaseStats) -> list[SubtypePoint]:
+    max_date = await stats.max_date()
+    if not max_date:
+        return []
+    rows = await stats.weekly_type_totals(since=weeks_ago(max_date, 52))
+    return [SubtypePoint(date=d.isoformat(), subtype=flu_type, cases=total) for d, flu_type, total in rows]
 
-        cutoff = weeks_ago(max_date, 52)
-        flu_type_label = cast(FluCase.flu_type, String).label("flu_type")
-        q = (
-            select(
-                FluCase.time,
-                flu_type_label,
-                func.sum(FluCase.new_cases).label("total"),
-            )
-            .where(FluCase.time >= cutoff)
-            .group_by(FluCase.time, flu_type_label)
-            .order_by(FluCase.time)
-        )
-        result = await session.execute(q)
-        return [SubtypePoint(date=r.time.isoformat(), subtype=r.flu_type, cases=r.total) for r in result]
 
+async def country_rows(stats: CaseStats, filters: CountryFilters = CountryFilters()) -> list[CountryRow]:
+    max_date = await stats.max_date()
+    if not max_date:
+        return []
 
-@router.get("/cases/countries", response_model=list[CountryRow])
-async def cases_countries(
-    search: str = Query("", max_length=64, description="Search filter"),
-    continent: str = Query("", max_length=32, description="Continent filter"),
-    flu_type: str = Query("", max_length=32, description="Flu type filter"),
-    sort: str = Query("cases", max_length=32, description="Sort field"),
-):
-    async with async_session() as session:
-        max_date_r = await session.execute(select(func.max(FluCase.time)))
-        max_date = max_date_r.scalar()
-        if not max_date:
-            return []
+    cutoff = weeks_ago(max_date, 4)
+    rows = await stats.country_stats(
+        since=cutoff,
+        # Prior year same period
+        prior_since=weeks_ago(cutoff, 52),
+        prior_until=weeks_ago(cutoff, 48),
+        # Sparkline data (last 12 weeks)
+        spark_since=weeks_ago(max_date, 12),
+        filters=filters,
+    )
+    return [
+        CountryRow(
+            rank=r.rank,
+            country_code=r.country_code,
+            country_name=r.name,
+            total_cases=r.total,
+            per_100k=round(r.per_100k, 2),
+            prior_year_cases=r.prior_total,
+            delta_pct=round(r.delta_pct, 1),
+            dominant_type=r.flu_type,
+            sparkline=r.sparkline,
+            severity=round(r.severity, 3),
+            continent=r.continent,
+        )
+        for r in rows
+    ]
 
-        cutoff = weeks_ago(max_date, 4)
 
-        # Current period totals
-        q = (
-            select(
-                FluCase.country_code,
-                func.sum(FluCase.new_cases).label("total"),
-            )
-            .where(FluCase.time >= cutoff)
-            .group_by(FluCase.country_code)
-            .order_by(desc("total"))
-        )
-        result = await session.execute(q)
-        current_data = {r.country_code: r.total for r in result}
+@router.get("/cases/summary", response_model=CaseSummary)
+@cached_endpoint
+async def cases_summary():
+    async with case_stats() as stats:
+        return await case_summary(stats)
 
-        # Prior year same period
-        prior_start = weeks_ago(cutoff, 52)
-        prior_end = weeks_ago(cutoff, 48)
-        prior_q = (
-            select(
-                FluCase.country_code,
-                func.sum(FluCase.new_cases).label("total"),
-            )
-            .where(FluCase.time >= prior_start, FluCase.time < prior_end)
-            .group_by(FluCase.country_code)
-        )
-        prior_result = await session.execute(prior_q)
-        prior_data = {r.country_code: r.total for r in prior_result}
 
-        # Dominant type per country (current period)
-        flu_type_label = cast(FluCase.flu_type, String).label("flu_type")
-        dom_q = (
-            select(
-                FluCase.country_code,
-                flu_type_label,
-                func.sum(FluCase.new_cases).label("total"),
-            )
-            .where(FluCase.time >= cutoff)
-            .group_by(FluCase.country_code, flu_type_label)
-            .order_by(desc("total"))
-        )
-        dom_result = await session.execute(dom_q)
-        dominant = {}
-        for r in dom_result:
-            if r.country_code not in dominant:
-                dominant[r.country_code] = r.flu_type
+@router.get("/cases/map", response_model=list[MapDataPoint])
+@cached_endpoint
+async def cases_map():
+    async with case_stats() as stats:
+        return await map_points(stats)
 
-        # Sparkline data (last 12 weeks)
-        spark_cutoff = weeks_ago(max_date, 12)
-        spark_q = (
-            select(
-                FluCase.country_code,
-                FluCase.time,
-                func.sum(FluCase.new_cases).label("total"),
-            )
-            .where(FluCase.time >= spark_cutoff)
-            .group_by(FluCase.country_code, FluCase.time)
-            .order_by(FluCase.time)
-        )
-        spark_result = await session.execute(spark_q)
-        sparklines = {}
-        for r in spark_result:
-            sparklines.setdefault(r.country_code, []).append(r.total)
 
-    rows = []
-    sorted_countries = sorted(current_data.items(), key=lambda x: x[1], reverse=True)
-    max_per100k = max((_per_100k(t, c) for c, t in current_data.items()), default=1)
+@router.get("/cases/historical", response_model=list[HistoricalPoint])
+@cached_endpoint
+async def cases_historical(
+    country: str = Query("", max_length=2, description="Country code filter"),
+):
+    async with case_stats() as stats:
+        rows = await stats.weekly_totals(country=country.upper() or None)
+    return historical_points(rows)
 
-    for rank, (cc, total) in enumerate(sorted_countries, 1):
-        prior = prior_data.get(cc, 0)
-        delta = ((total - prior) / prior * 100) if prior else 0
-        per100k = _per_100k(total, cc)
-        severity = min(per100k / max(max_per100k, 1), 1.0)
 
-        if search and search.lower() not in cc.lower():
-            continue
+@router.get("/cases/subtypes", response_model=list[SubtypePoint])
+@cached_endpoint
+async def cases_subtypes():
+    async with case_stats() as stats:
+        return await subtype_points(stats)
 
-        rows.append(
-            CountryRow(
-                rank=rank,
-                country_code=cc,
-                country_name=cc,
-                total_cases=total,
-                per_100k=per100k,
-                prior_year_cases=prior,
-                delta_pct=round(delta, 1),
-                dominant_type=dominant.get(cc, ""),
-                sparkline=sparklines.get(cc, []),
-                severity=round(severity, 3),
-            )
-        )
 
-    return rows[:50]
+@router.get("/cases/countries", response_model=list[CountryRow])
+@cached_endpoint
+async def cases_countries(
+    search: str = Query("", max_length=64, description="Search filter"),
+    continent: str = Query("", max_length=32, description="Continent filter"),
+    flu_type: str = Query("", max_length=32, description="Dominant flu type filter"),
+    sort: str = Query("cases", pattern=f"^({'|'.join(SORT_FIELDS)})$", description="Sort field (descending)"),
+    after: str = Query("", max_length=2, description="Country code of the previous page's last row"),
+    limit: int = Query(50, ge=1, le=250, description="Page size"),
+):
+    filters = CountryFilters(
+        search=search,
+        continent=continent,
+        flu_type=flu_type,
+        sort=sort,
+        after=after.upper() or None,
+        limit=limit,
+    )
+    async with case_stats() as stats:
+        return await country_rows(stats, filters)
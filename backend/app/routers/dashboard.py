@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, Query, Response
+
+from app.cache import cached_endpoint
+from app.routers.anomalies import get_anomalies
+from app.routers.cases import case_summary, country_rows, historical_points, map_points, subtype_points
+from app.routers.genomics import genomic_trends
+from app.schemas import DashboardBundle
+from app.services.case_stats import case_stats
+from app.services.forecast import generate_forecast
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+CASE_SECTIONS = ("summary", "map", "countries", "subtypes", "historical", "forecast")
+
+
+@cached_endpoint
+async def _case_sections(country: str) -> dict:
+    # One session (or the snapshot) for every case section, so the latest week is only looked up once
+    async with case_stats() as stats:
+        sections = {
+            "summary": await case_summary(stats),
+            "map": await map_points(stats),
+            "countries": await country_rows(stats),
+            "subtypes": await subtype_points(stats),
+        }
+        weekly = await stats.weekly_totals(country=country or None)
+    sections["historical"] = historical_points(weekly)
+    try:
+        sections["forecast"] = await generate_forecast(country_code=country or None, rows=weekly)
+    except Exception:
+        # Fails the same way until the data changes, so it is cached along with the other sections
+        logger.exception("Dashboard forecast failed for country %r", country)
+        sections["forecast"] = None
+    return sections
+
+
+def _section(name: str, result):
+    """A gathered section's value, or None (logged) if it raised."""
+    if isinstance(result, BaseException):
+        if not isinstance(result, Exception):
+            raise result
+        logger.error("Dashboard section %s failed", name, exc_info=result)
+        return None
+    return result
+
+
+@router.get("/dashboard", response_model=DashboardBundle)
+async def dashboard(
+    response: Response,
+    country: str = Query("", max_length=2, description="Country for the historical chart and forecast"),
+):
+    """Everything the dashboard page shows, in one request.
+
+    A section that fails to load is null and named in ``errors``; the others are
+    still returned.
+    """
+    # Anomalies and clade trends read other tables, so they run concurrently on their own
+    # sessions. Each part is cached on its own (anomalies and clade trends share entries with
+    # their standalone endpoints), so a failure is retried on the next request.
+    cases, anomalies, clade_trends = await asyncio.gather(
+        _case_sections(country.upper()),
+        get_anomalies(),
+        genomic_trends(years=1, country="", top_n=6),
+        return_exceptions=True,
+    )
+    sections = {
+        **(_section("cases", cases) or dict.fromkeys(CASE_SECTIONS)),
+        "anomalies": _section("anomalies", anomalies),
+        "clade_trends": _section("clade_trends", clade_trends),
+    }
+    errors = [name for name, value in sections.items() if value is None]
+    if errors:
+        # Keep a partial bundle out of browser and proxy caches (see ConditionalGetMiddleware)
+        response.headers["Cache-Control"] = "no-store"
+    return DashboardBundle(**sections, errors=errors)
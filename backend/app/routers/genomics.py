@@ -3,6 +3,7 @@ from datetime import timedelta
 from fastapi import APIRouter, Query
 from sqlalchemy import desc, func, select
 
+from app.cache import cached_endpoint
 from app.database import async_session
 from app.models import GenomicSequence
 from app.schemas import GenomicCountryRow, GenomicSummary, GenomicTrendPoint
@@ -11,6 +12,7 @@ router = APIRouter()
 
 
 @router.get("/trends", response_model=list[GenomicTrendPoint])
+@cached_endpoint
 async def genomic_trends(
     years: int = Query(1, ge=1, le=10, description="Years of data"),
     country: str = Query("", max_length=2, description="Country filter"),
@@ -75,6 +77,7 @@ async def genomic_trends(
 
 
 @router.get("/summary", response_model=GenomicSummary)
+@cached_endpoint
 async def genomic_summary():
     async with async_session() as session:
         total_r = await session.execute(select(func.sum(GenomicSequence.count)))
@@ -104,6 +107,7 @@ async def genomic_summary():
 
 
 @router.get("/countries", response_model=list[GenomicCountryRow])
+@cached_endpoint
 async def genomic_countries():
     async with async_session() as session:
         ranked_clades = (
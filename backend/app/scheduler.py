@@ -1,14 +1,18 @@
 import asyncio
 import logging
-from datetime import date
+from datetime import date, timedelta
+from functools import partial
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy import delete, func, select
+from sqlalchemy import func, select
 
+from app.cache import bump_data_version
+from app.config import settings
 from app.database import async_session, engine
-from app.models import Anomaly, Base, FluCase, GenomicSequence
+from app.models import Base, FluCase, FluCaseWeekly, GenomicSequence
+from app.services.snapshot import refresh_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +23,21 @@ STARTUP_BACKFILL_RETRY_SECONDS = 15
 
 
 async def _run_who_flunet():
-    from app.services.flunet import ingest_flunet
+    from app.services.flunet import ingest_flunet_delta
 
-    logger.info("Running WHO FluNet ingestion (last 4 weeks)")
-    await ingest_flunet(weeks_back=4)
+    logger.info("Running WHO FluNet delta ingestion")
+    return await ingest_flunet_delta()
+
+
+async def _run_who_flunet_job():
+    """Scheduled delta ingestion; re-runs anomaly detection only when case counts changed."""
+    result = await _run_who_flunet()
+    if result.changed:
+        logger.info(
+            "FluNet delta changed %s rows (%s new, %s revised)", result.changed, result.inserted, result.updated
+        )
+        await refresh_snapshot()
+        await _run_anomaly_detection()
 
 
 async def _run_anomaly_detection():
@@ -32,30 +47,132 @@ async def _run_anomaly_detection():
     await detect_anomalies()
 
 
-async def _run_full_rebuild():
+async def _run_full_rebuild(year: int | None = None):
+    """Reload all sources into shadow tables and swap them in atomically.
+
+    Readers keep seeing the current data until the swap. A source whose load
+    fails, comes back empty or is unchanged upstream since it was last loaded
+    keeps its live table untouched. Upstream responses are only marked
+    processed once the swap has committed, so a rebuild that fails before
+    then is not skipped as unchanged next time.
+
+    With ``year`` only that ISO year of flu cases is reloaded, as a partition
+    swap (see :func:`_run_year_rebuild`).
+    """
+    if year is not None:
+        return await _run_year_rebuild(year)
+
     from app.services.anomaly import detect_anomalies
-    from app.services.flunet import ingest_flunet_full
-    from app.services.nextstrain import ingest_nextstrain
+    from app.services.flunet import load_flunet_full
+    from app.services.http_cache import response_cache
+    from app.services.nextstrain import load_nextstrain
+    from app.services.rollup import refresh_weekly_rollup
+    from app.services.shadow import build_shadow_indexes, create_shadow_table, drop_shadow_table, swap_shadow_tables
 
     logger.info("Running full daily rebuild")
-    async with async_session() as session:
-        await session.execute(delete(FluCase))
-        await session.execute(delete(GenomicSequence))
-        await session.execute(delete(Anomaly))
-        await session.commit()
-    logger.info("Cleared all tables for rebuild")
-
-    await ingest_flunet_full()
-    await ingest_nextstrain()
+    loaders = [
+        (FluCase.__table__, load_flunet_full),
+        (GenomicSequence.__table__, load_nextstrain),
+    ]
+
+    loaded = []
+    responses = []
+    for table, load in loaders:
+        async with engine.begin() as conn:
+            shadow = await create_shadow_table(conn, table)
+        try:
+            rows, pending = await load(shadow)
+        except Exception:
+            logger.exception("Full rebuild of %s failed; keeping live table", table.name)
+            rows, pending = 0, []
+        if rows:
+            async with engine.begin() as conn:
+                await build_shadow_indexes(conn, table, shadow)
+            loaded.append(table)
+            responses.extend(pending)
+        else:
+            logger.warning("Full rebuild loaded no rows for %s; keeping live table", table.name)
+            async with engine.begin() as conn:
+                await drop_shadow_table(conn, table)
+
+    if loaded:
+        async with engine.begin() as conn:
+            await swap_shadow_tables(conn, loaded)
+            if FluCase.__table__ in loaded:
+                await refresh_weekly_rollup(conn)
+        response_cache.mark_processed(responses)
+        bump_data_version("full rebuild")
+        if FluCase.__table__ in loaded:
+            await refresh_snapshot()
+
     await detect_anomalies()
     logger.info("Full rebuild complete")
 
 
+async def _run_year_rebuild(year: int):
+    """Reload one ISO year of flu cases and swap it in as that year's partition.
+
+    The other years, and genomics, are left alone. Like the full rebuild,
+    readers see the old year until the swap, and a failed or empty load keeps
+    it. Needs the partitioned PostgreSQL table (see app.services.partitions).
+    """
+    from app.services.anomaly import detect_anomalies
+    from app.services.flunet import load_flunet_year
+    from app.services.http_cache import response_cache
+    from app.services.partitions import is_partitioned, iso_year_bounds
+    from app.services.rollup import refresh_weekly_rollup
+    from app.services.shadow import (
+        build_partition_shadow_indexes,
+        create_partition_shadow,
+        drop_partition_shadow,
+        swap_partition,
+    )
+
+    table = FluCase.__table__
+    async with engine.begin() as conn:
+        if not await is_partitioned(conn, table):
+            logger.warning("Rebuilding a single year needs partitioned PostgreSQL tables; skipping %s", year)
+            return
+        logger.info("Rebuilding flu cases for %s", year)
+        shadow = await create_partition_shadow(conn, table, year)
+    try:
+        rows, pages = await load_flunet_year(year, shadow)
+    except Exception:
+        logger.exception("Rebuild of %s failed; keeping live partition", year)
+        rows, pages = 0, []
+    if not rows:
+        logger.warning("Rebuild of %s loaded no rows; keeping live partition", year)
+        async with engine.begin() as conn:
+            await drop_partition_shadow(conn, table, year)
+        return
+
+    async with engine.begin() as conn:
+        await build_partition_shadow_indexes(conn, table, shadow, year)
+    start, end = iso_year_bounds(year)
+    async with engine.begin() as conn:
+        await swap_partition(conn, table, year)
+        await refresh_weekly_rollup(conn, [start + timedelta(weeks=w) for w in range((end - start).days // 7)])
+    response_cache.mark_processed(pages)
+    bump_data_version(f"rebuild of {year}")
+    await refresh_snapshot()
+    await detect_anomalies()
+    logger.info("Rebuild of %s complete", year)
+
+
+async def _ensure_flu_case_partitions():
+    """Create this and next ISO year's flu_cases partitions ahead of the first rows landing in them."""
+    from app.services.partitions import ensure_partitions
+
+    year = date.today().isocalendar()[0]
+    async with engine.begin() as conn:
+        await ensure_partitions(conn, FluCase.__table__, [year, year + 1])
+
+
 def create_scheduler() -> AsyncIOScheduler:
     scheduler = AsyncIOScheduler()
 
     scheduler.add_job(
-        _run_who_flunet,
+        _run_who_flunet_job,
         trigger=IntervalTrigger(hours=6),
         id="who_flunet",
         replace_existing=True,
@@ -69,19 +186,43 @@ def create_scheduler() -> AsyncIOScheduler:
     )
 
     scheduler.add_job(
-        _run_full_rebuild,
-        trigger=CronTrigger(hour=5),
-        id="full_daily_rebuild",
+        _ensure_flu_case_partitions,
+        trigger=CronTrigger(day=1, hour=0),
+        id="flu_case_partitions",
         replace_existing=True,
     )
 
+    # Delta ingestion picks up revisions within its lookback window; the full
+    # rebuild is an opt-in consistency check.
+    if settings.FULL_REBUILD_ENABLED:
+        scheduler.add_job(
+            _run_full_rebuild,
+            trigger=CronTrigger(hour=5),
+            id="full_daily_rebuild",
+            replace_existing=True,
+        )
+
     return scheduler
 
 
 async def init_db():
-    """Create tables if they don't exist."""
+    """Create tables (flu_cases partitioned on PostgreSQL) if they don't exist, reseed the countries dimension and code lookups, and fill the weekly rollup if it was just added."""
+    from app.services.codes import seed_codes
+    from app.services.countries import seed_countries
+    from app.services.partitions import create_partitioned_table
+    from app.services.rollup import refresh_weekly_rollup
+
     async with engine.begin() as conn:
+        # create_all skips the already created parent (and its indexes)
+        await create_partitioned_table(conn, FluCase.__table__)
         await conn.run_sync(Base.metadata.create_all)
+        await seed_countries(conn)
+        await seed_codes(conn)
+        rollup_empty = (await conn.execute(select(FluCaseWeekly.id).limit(1))).first() is None
+        if rollup_empty and (await conn.execute(select(FluCase.id).limit(1))).first() is not None:
+            await refresh_weekly_rollup(conn)
+            logger.info("Built flu_cases_weekly from existing flu_cases rows")
+    await _ensure_flu_case_partitions()
     logger.info("Database tables created/verified")
 
 
@@ -93,17 +234,20 @@ async def run_startup_jobs():
     logger.info("Running startup jobs...")
     await _run_who_flunet()
 
+    # The tables are missing history here, so reload even content the response
+    # cache has seen before (e.g. after the database was reset).
     await _ensure_min_history_span(
         label="flu cases",
         fetch_span=_get_flu_case_span,
-        ingest=ingest_flunet_full,
+        ingest=partial(ingest_flunet_full, force=True),
     )
+    await refresh_snapshot()
 
     await _run_anomaly_detection()
     await _ensure_min_history_span(
         label="genomics",
         fetch_span=_get_genomics_span,
-        ingest=ingest_nextstrain,
+        ingest=partial(ingest_nextstrain, force=True),
     )
 
 
@@ -184,6 +328,8 @@ async def _ensure_min_history_span(label: str, fetch_span, ingest):
 
 
 async def get_backfill_status() -> dict:
+    from app.services.flunet import get_backfill_progress
+
     flu_min, flu_max, flu_span = await _get_flu_case_span()
     gen_min, gen_max, gen_span = await _get_genomics_span()
     return {
@@ -193,6 +339,7 @@ async def get_backfill_status() -> dict:
             "max_date": flu_max.isoformat() if flu_max else None,
             "span_days": flu_span,
             "meets_target": bool(flu_span is not None and flu_span >= TARGET_BACKFILL_DAYS),
+            "years": {str(year): progress for year, progress in get_backfill_progress().items()},
         },
         "genomics": {
             "min_date": gen_min.isoformat() if gen_min else None,
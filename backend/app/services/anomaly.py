@@ -3,8 +3,10 @@ from datetime import datetime, timedelta
 
 from sqlalchemy import delete, func, select
 
+from app.cache import bump_data_version
 from app.database import async_session
-from app.models import Anomaly, AnomalyType, FluCase, Severity
+from app.models import Anomaly, AnomalyType, FluCaseWeekly, Severity
+from app.services.countries import get_country_name
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +21,12 @@ async def detect_anomalies():
             await session.execute(delete(Anomaly))
 
             # Get the max date in data
-            result = await session.execute(select(func.max(FluCase.time)))
+            result = await session.execute(select(func.max(FluCaseWeekly.time)))
             max_date = result.scalar()
             if not max_date:
                 logger.info("No case data for anomaly detection")
                 await session.commit()
+                bump_data_version("anomaly detection")
                 return
 
             # Get recent 4 weeks of data per country
@@ -32,9 +35,9 @@ async def detect_anomalies():
 
             # Recent totals per country
             recent_q = (
-                select(FluCase.country_code, func.sum(FluCase.new_cases).label("recent_total"))
-                .where(FluCase.time >= recent_cutoff)
-                .group_by(FluCase.country_code)
+                select(FluCaseWeekly.country_code, func.sum(FluCaseWeekly.new_cases).label("recent_total"))
+                .where(FluCaseWeekly.time >= recent_cutoff)
+                .group_by(FluCaseWeekly.country_code)
             )
             recent_result = await session.execute(recent_q)
             recent_data = {row.country_code: row.recent_total for row in recent_result}
@@ -42,13 +45,13 @@ async def detect_anomalies():
             # Historical weekly average and stddev per country (last 52 weeks)
             hist_q = (
                 select(
-                    FluCase.country_code,
-                    func.avg(FluCase.new_cases).label("avg_cases"),
-                    func.stddev(FluCase.new_cases).label("std_cases"),
-                    func.count(FluCase.new_cases).label("n"),
+                    FluCaseWeekly.country_code,
+                    func.avg(FluCaseWeekly.new_cases).label("avg_cases"),
+                    func.stddev(FluCaseWeekly.new_cases).label("std_cases"),
+                    func.count(FluCaseWeekly.new_cases).label("n"),
                 )
-                .where(FluCase.time >= hist_cutoff, FluCase.time < recent_cutoff)
-                .group_by(FluCase.country_code)
+                .where(FluCaseWeekly.time >= hist_cutoff, FluCaseWeekly.time < recent_cutoff)
+                .group_by(FluCaseWeekly.country_code)
             )
             hist_result = await session.execute(hist_q)
             hist_data = {}
@@ -72,7 +75,7 @@ async def detect_anomalies():
                     anomalies.append(
                         Anomaly(
                             country_code=cc,
-                            country_name=cc,
+                            country_name=get_country_name(cc),
                             anomaly_type=AnomalyType.SPIKE,
                             severity=severity,
                             message=f"{cc}: cases {zscore:.1f}x std above mean ({int(weekly_avg)} vs avg {int(avg)})",
@@ -87,5 +90,6 @@ async def detect_anomalies():
                 logger.info("No anomalies detected")
 
             await session.commit()
+        bump_data_version("anomaly detection")
     except Exception:
         logger.exception("Anomaly detection failed")
@@ -0,0 +1,192 @@
+"""Record upstream payloads to a local archive and replay them without network access.
+
+``settings.INGEST_SOURCE`` selects how :func:`upstream_client` reaches the WHO
+and Nextstrain APIs:
+
+* ``live`` — plain httpx (the default)
+* ``record`` — live requests, with every successful response body saved to
+  the archive in ``settings.INGEST_ARCHIVE_DIR``
+* ``replay`` — responses are served from the archive only; a request that was
+  never recorded raises :class:`LookupError`
+
+The archive is content-addressed: bodies are stored gzip-compressed under
+``blobs/`` by the SHA-256 of their decoded content, so identical pages are
+kept once, and ``manifest.json`` maps each request URL to its blob, status and
+validators. Replay runs at disk speed and answers conditional requests the way
+the recorded upstream would, so the parse→upsert path can be profiled and
+regression-tested repeatably. While replaying, :func:`source_clock` reports the
+recording time so that date-derived request URLs match the recorded ones.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from app.config import settings
+
+CHUNK_SIZE = 1 << 20
+MANIFEST = "manifest.json"
+# Response headers worth replaying; encodings and lengths describe the original transfer only
+KEPT_HEADERS = ("content-type", "etag", "last-modified")
+
+
+class PayloadArchive:
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self._manifest: dict | None = None
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            path = self.directory / MANIFEST
+            self._manifest = json.loads(path.read_text()) if path.exists() else {"recorded_at": None, "requests": {}}
+        return self._manifest
+
+    def _save_manifest(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f"{MANIFEST}.tmp"
+        tmp.write_text(json.dumps(self.manifest, indent=1, sort_keys=True))
+        os.replace(tmp, self.directory / MANIFEST)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest[:2] / f"{digest}.gz"
+
+    @property
+    def recorded_at(self) -> datetime | None:
+        value = self.manifest.get("recorded_at")
+        return datetime.fromisoformat(value) if value else None
+
+    def lookup(self, url: str) -> dict | None:
+        return self.manifest["requests"].get(url)
+
+    async def store(self, url: str, response: httpx.Response) -> dict:
+        """Stream ``response``'s decoded body into the archive and record it under ``url``."""
+        blobs = self.directory / "blobs"
+        blobs.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=blobs, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as out:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+            blob = self.blob_path(digest.hexdigest())
+            blob.parent.mkdir(exist_ok=True)
+            if blob.exists():
+                os.unlink(tmp)
+            else:
+                os.replace(tmp, blob)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+        entry = {
+            "status": response.status_code,
+            "headers": {k: response.headers[k] for k in KEPT_HEADERS if k in response.headers},
+            "sha256": digest.hexdigest(),
+        }
+        if self.manifest["recorded_at"] is None:
+            self.manifest["recorded_at"] = datetime.utcnow().isoformat()
+        self.manifest["requests"][url] = entry
+        self._save_manifest()
+        return entry
+
+    def response(self, request: httpx.Request, entry: dict) -> httpx.Response:
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            stream=_BlobStream(self.blob_path(entry["sha256"])),
+            request=request,
+        )
+
+
+class _BlobStream(httpx.AsyncByteStream):
+    def __init__(self, path: Path):
+        self.path = path
+
+    async def __aiter__(self):
+        with gzip.open(self.path, "rb") as fp:
+            while chunk := fp.read(CHUNK_SIZE):
+                yield chunk
+
+
+def _not_modified(request: httpx.Request, headers: dict) -> bool:
+    etag = request.headers.get("if-none-match")
+    since = request.headers.get("if-modified-since")
+    return bool((etag and etag == headers.get("etag")) or (since and since == headers.get("last-modified")))
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forwards requests to ``transport`` and archives every successful response."""
+
+    def __init__(self, archive: PayloadArchive, transport: httpx.AsyncBaseTransport):
+        self.archive = archive
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # Always fetch full bodies so the archive never holds a bare 304
+        for header in ("if-none-match", "if-modified-since"):
+            request.headers.pop(header, None)
+        response = await self.transport.handle_async_request(request)
+        if response.status_code != 200:
+            return response
+        upstream = httpx.Response(
+            response.status_code, headers=response.headers, stream=response.stream, request=request
+        )
+        try:
+            entry = await self.archive.store(str(request.url), upstream)
+        finally:
+            await upstream.aclose()
+        return self.archive.response(request, entry)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves archived responses; never touches the network."""
+
+    def __init__(self, archive: PayloadArchive):
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        entry = self.archive.lookup(url)
+        if entry is None:
+            raise LookupError(f"{url} is not in the payload archive at {self.archive.directory}")
+        if _not_modified(request, entry["headers"]):
+            return httpx.Response(304, headers=entry["headers"], request=request)
+        return self.archive.response(request, entry)
+
+
+def _live_transport(limits: httpx.Limits | None) -> httpx.AsyncBaseTransport:
+    return httpx.AsyncHTTPTransport(limits=limits or httpx.Limits())
+
+
+def upstream_client(timeout: float, limits: httpx.Limits | None = None) -> httpx.AsyncClient:
+    """httpx client for upstream data sources, live, recording or replaying per ``settings.INGEST_SOURCE``."""
+    mode = settings.INGEST_SOURCE
+    if mode == "live":
+        return httpx.AsyncClient(timeout=timeout, **({"limits": limits} if limits else {}))
+    archive = PayloadArchive(settings.INGEST_ARCHIVE_DIR)
+    if mode == "record":
+        transport = RecordingTransport(archive, _live_transport(limits))
+    elif mode == "replay":
+        transport = ReplayTransport(archive)
+    else:
+        raise ValueError(f"Unknown INGEST_SOURCE: {mode}")
+    return httpx.AsyncClient(timeout=timeout, transport=transport)
+
+
+def source_clock() -> datetime | None:
+    """The archive's recording time while replaying, otherwise None (use the real clock)."""
+    if settings.INGEST_SOURCE != "replay":
+        return None
+    return PayloadArchive(settings.INGEST_ARCHIVE_DIR).recorded_at
@@ -0,0 +1,219 @@
+"""Bulk loading helpers shared by the ingestion services.
+
+Two write paths are available:
+
+* ``insert`` — batched multi-row ``INSERT ... ON CONFLICT`` statements built by
+  SQLAlchemy (the original path; works on any dialect with ``pg_insert``).
+* ``copy`` — rows are streamed with asyncpg's binary ``COPY`` into a temporary
+  staging table and merged into the target with a single
+  ``INSERT ... SELECT ... ON CONFLICT``. This skips statement compilation and
+  per-parameter binding entirely and is several times faster on large loads.
+
+``settings.BULK_LOAD_METHOD`` selects the path; ``copy`` silently falls back to
+``insert`` on non-PostgreSQL connections.
+
+:func:`bulk_insert` ignores conflicting rows. :func:`bulk_upsert` instead
+updates conflicting rows whose value columns actually differ and reports how
+many rows were inserted, updated and left unchanged.
+"""
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import Table, UniqueConstraint, literal_column, or_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 1000
+
+# PostgreSQL sets xmax to 0 on freshly inserted tuples and to the locking
+# transaction on rows touched by ON CONFLICT DO UPDATE.
+_INSERTED_FLAG = "(xmax = 0)"
+
+
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(
+            self.inserted + other.inserted,
+            self.updated + other.updated,
+            self.unchanged + other.unchanged,
+        )
+
+
+def _load_columns(table: Table) -> list[str]:
+    """Every column except the autoincrementing primary key, in table order."""
+    # Not every primary key column: partitioned tables also key on their partition column
+    return [c.name for c in table.columns if c is not table.autoincrement_column]
+
+
+def _constraint_columns(table: Table, constraint: str) -> list[str]:
+    for c in table.constraints:
+        if isinstance(c, UniqueConstraint) and c.name == constraint:
+            return list(c.columns.keys())
+    raise ValueError(f"{table.name} has no unique constraint {constraint}")
+
+
+def _row_tuples(table: Table, columns: list[str], records: Iterable[dict], dialect) -> Iterable[tuple]:
+    """Convert record dicts to COPY tuples, applying each column's bind processing.
+
+    Non-native enums, for example, are stored by member name, so the string
+    values produced by the parsers have to go through the same conversion
+    SQLAlchemy applies on a normal INSERT.
+    """
+    processors = []
+    for name in columns:
+        column = table.c[name]
+        proc = column.type.bind_processor(dialect)
+        default = column.default.arg if column.default is not None and column.default.is_scalar else None
+        processors.append((name, proc, default))
+
+    for rec in records:
+        row = []
+        for name, proc, default in processors:
+            val = rec.get(name, default)
+            row.append(proc(val) if proc is not None and val is not None else val)
+        yield tuple(row)
+
+
+async def insert_batches(session: AsyncSession, table: Table, records: list[dict], constraint: str) -> int:
+    """Insert ``records`` with batched ``INSERT ... ON CONFLICT DO NOTHING`` statements."""
+    inserted = 0
+    for i in range(0, len(records), INSERT_BATCH_SIZE):
+        batch = records[i : i + INSERT_BATCH_SIZE]
+        stmt = pg_insert(table).values(batch)
+        stmt = stmt.on_conflict_do_nothing(constraint=constraint)
+        result = await session.execute(stmt)
+        inserted += max(result.rowcount or 0, 0)
+    return inserted
+
+
+async def _copy_to_staging(session: AsyncSession, table: Table, records: Iterable[dict]) -> str:
+    """Stream ``records`` with binary COPY into a per-transaction staging copy of ``table``.
+
+    The staging table is dropped on commit and truncated on reuse within the
+    same transaction. Returns its name.
+    """
+    connection = await session.connection()
+    columns = _load_columns(table)
+    staging = f"_stage_{table.name}"
+    column_list = ", ".join(columns)
+
+    await session.execute(
+        text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP "
+            f"AS SELECT {column_list} FROM {table.name} WITH NO DATA"
+        )
+    )
+    await session.execute(text(f"TRUNCATE {staging}"))
+
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        staging,
+        records=_row_tuples(table, columns, records, connection.dialect),
+        columns=columns,
+    )
+    return staging
+
+
+async def copy_insert(session: AsyncSession, table: Table, records: Iterable[dict], constraint: str) -> int:
+    """Stream ``records`` through binary COPY into a staging table, then merge into ``table``.
+
+    Runs inside the session's current transaction. Returns the number of rows
+    actually inserted into ``table``.
+    """
+    staging = await _copy_to_staging(session, table, records)
+    column_list = ", ".join(_load_columns(table))
+    result = await session.execute(
+        text(
+            f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {staging} "
+            f"ON CONFLICT ON CONSTRAINT {constraint} DO NOTHING"
+        )
+    )
+    return max(result.rowcount or 0, 0)
+
+
+async def bulk_insert(session: AsyncSession, table: Table, records: list[dict], constraint: str) -> int:
+    """Insert ``records`` into ``table`` ignoring conflicts on ``constraint``, using the configured path."""
+    if not records:
+        return 0
+    connection = await session.connection()
+    if settings.BULK_LOAD_METHOD == "copy" and connection.dialect.name == "postgresql":
+        return await copy_insert(session, table, records, constraint)
+    return await insert_batches(session, table, records, constraint)
+
+
+def _count_flags(flags: Iterable[bool], total: int) -> UpsertResult:
+    inserted = updated = 0
+    for flag in flags:
+        if flag:
+            inserted += 1
+        else:
+            updated += 1
+    return UpsertResult(inserted=inserted, updated=updated, unchanged=total - inserted - updated)
+
+
+async def upsert_batches(
+    session: AsyncSession, table: Table, records: list[dict], constraint: str, update_columns: list[str]
+) -> UpsertResult:
+    """Batched ``INSERT ... ON CONFLICT DO UPDATE`` touching only rows whose ``update_columns`` differ."""
+    result = UpsertResult()
+    for i in range(0, len(records), INSERT_BATCH_SIZE):
+        batch = records[i : i + INSERT_BATCH_SIZE]
+        stmt = pg_insert(table).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            constraint=constraint,
+            set_={c: stmt.excluded[c] for c in update_columns},
+            where=or_(*(table.c[c].is_distinct_from(stmt.excluded[c]) for c in update_columns)),
+        ).returning(literal_column(_INSERTED_FLAG).label("inserted"))
+        rows = await session.execute(stmt)
+        result = result + _count_flags((r.inserted for r in rows), len(batch))
+    return result
+
+
+async def copy_upsert(
+    session: AsyncSession, table: Table, records: list[dict], constraint: str, update_columns: list[str]
+) -> UpsertResult:
+    """COPY ``records`` into a staging table and merge with ``ON CONFLICT DO UPDATE ... WHERE changed``."""
+    staging = await _copy_to_staging(session, table, records)
+    column_list = ", ".join(_load_columns(table))
+    key_columns = _constraint_columns(table, constraint)
+
+    # DISTINCT ON keeps a single staged row per key: DO UPDATE may not touch
+    # the same target row twice in one statement.
+    assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+    changed = " OR ".join(f"{table.name}.{c} IS DISTINCT FROM EXCLUDED.{c}" for c in update_columns)
+    rows = await session.execute(
+        text(
+            f"INSERT INTO {table.name} ({column_list}) "
+            f"SELECT DISTINCT ON ({', '.join(key_columns)}) {column_list} FROM {staging} "
+            f"ON CONFLICT ON CONSTRAINT {constraint} DO UPDATE SET {assignments} WHERE {changed} "
+            f"RETURNING {_INSERTED_FLAG} AS inserted"
+        )
+    )
+    return _count_flags((r.inserted for r in rows), len(records))
+
+
+async def bulk_upsert(
+    session: AsyncSession, table: Table, records: list[dict], constraint: str, update_columns: list[str]
+) -> UpsertResult:
+    """Insert new rows and update existing rows whose ``update_columns`` changed, using the configured path."""
+    if not records:
+        return UpsertResult()
+    connection = await session.connection()
+    if settings.BULK_LOAD_METHOD == "copy" and connection.dialect.name == "postgresql":
+        return await copy_upsert(session, table, records, constraint, update_columns)
+    return await upsert_batches(session, table, records, constraint, update_columns)
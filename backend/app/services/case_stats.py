@@ -0,0 +1,411 @@
+"""Case aggregates for one request, from the in-memory snapshot or one SQL session.
+
+:func:`case_stats` yields a :class:`CaseStats` that answers the group-bys the
+cases API, the dashboard bundle and forecasts need over ``flu_cases_weekly``.
+With a case snapshot available (app.services.snapshot) they are computed in
+memory; otherwise they run on a single session opened for the request.
+
+Results shared between sections of a response — the latest week and country
+totals over a period — are computed once per ``CaseStats`` and reused.
+"""
+
+import json
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy import Float, String, and_, case, cast, func, or_, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.models import Country, FluCaseWeekly
+from app.population import DEFAULT_POPULATION, per_100k
+from app.services.countries import get_continent, get_country_name
+from app.services.snapshot import CaseSnapshot, get_snapshot
+from app.utils import weeks_ago
+
+_UNSET = object()
+
+# Sort orders accepted by country_stats (all descending), and the CountryStats field each sorts on
+SORT_FIELDS = {"cases": "total", "per_100k": "per_100k", "delta": "delta_pct", "severity": "severity"}
+
+
+class CountryFilters(NamedTuple):
+    search: str = ""
+    continent: str = ""
+    flu_type: str = ""  # dominant type
+    sort: str = "cases"
+    after: str | None = None  # country code of the last row of the previous page
+    limit: int = 50
+
+
+class CountryStats(NamedTuple):
+    rank: int
+    country_code: str
+    name: str
+    continent: str
+    total: int
+    prior_total: int
+    flu_type: str
+    per_100k: float
+    delta_pct: float
+    severity: float
+    sparkline: list[int]
+
+
+class CaseStats:
+    def __init__(self, snapshot: CaseSnapshot | None = None, session: AsyncSession | None = None):
+        self._snapshot = snapshot
+        self._session = session
+        self._max_date = _UNSET
+        self._country_totals: dict[tuple, dict[str, int]] = {}
+
+    async def max_date(self) -> date | None:
+        if self._max_date is _UNSET:
+            if self._snapshot is not None:
+                self._max_date = self._snapshot.max_date
+            else:
+                result = await self._session.execute(select(func.max(FluCaseWeekly.time)))
+                self._max_date = result.scalar()
+        return self._max_date
+
+    async def summary(self) -> tuple[int, int, int, int] | None:
+        """Total cases, countries reporting, and cases in the latest and prior week; None without data."""
+        max_date = await self.max_date()
+        if not max_date:
+            return None
+        current_cutoff = weeks_ago(max_date, 1)
+        prior_cutoff = weeks_ago(max_date, 2)
+
+        if self._snapshot is not None:
+            return (
+                self._snapshot.total(),
+                self._snapshot.countries_reporting(),
+                self._snapshot.total(since=current_cutoff),
+                self._snapshot.total(since=prior_cutoff, until=current_cutoff),
+            )
+
+        result = await self._session.execute(
+            select(
+                func.sum(FluCaseWeekly.new_cases).label("total_cases"),
+                func.count(func.distinct(FluCaseWeekly.country_code)).label("countries_reporting"),
+                func.sum(case((FluCaseWeekly.time >= current_cutoff, FluCaseWeekly.new_cases), else_=0)).label(
+                    "current_week_cases"
+                ),
+                func.sum(
+                    case(
+                        (
+                            and_(
+                                FluCaseWeekly.time >= prior_cutoff,
+                                FluCaseWeekly.time < current_cutoff,
+                            ),
+                            FluCaseWeekly.new_cases,
+                        ),
+                        else_=0,
+                    )
+                ).label("prior_week_cases"),
+            )
+        )
+        r = result.one()
+        return (
+            r.total_cases or 0,
+            r.countries_reporting or 0,
+            r.current_week_cases or 0,
+            r.prior_week_cases or 0,
+        )
+
+    async def country_totals(self, since: date, until: date | None = None) -> dict[str, int]:
+        """``SUM(new_cases) GROUP BY country_code`` for ``since <= time < until``."""
+        key = (since, until)
+        if key not in self._country_totals:
+            if self._snapshot is not None:
+                totals = self._snapshot.country_totals(since=since, until=until)
+            else:
+                q = (
+                    select(
+                        FluCaseWeekly.country_code,
+                        func.sum(FluCaseWeekly.new_cases).label("total"),
+                    )
+                    .where(FluCaseWeekly.time >= since)
+                    .group_by(FluCaseWeekly.country_code)
+                )
+                if until is not None:
+                    q = q.where(FluCaseWeekly.time < until)
+                result = await self._session.execute(q)
+                totals = {r.country_code: r.total for r in result}
+            self._country_totals[key] = totals
+        return self._country_totals[key]
+
+    async def country_incidence(self, since: date) -> list[tuple[str, int, float]]:
+        """Total and cases per 100k inhabitants per country since ``since``, highest incidence first."""
+        if self._snapshot is not None:
+            rows = [(cc, total, per_100k(total, cc)) for cc, total in (await self.country_totals(since)).items()]
+            return sorted(rows, key=lambda r: (-r[2], r[0]))
+        w = FluCaseWeekly
+        current = (
+            select(w.country_code, func.sum(w.new_cases).label("total"))
+            .where(w.time >= since)
+            .group_by(w.country_code)
+            .subquery()
+        )
+        rate = _per_100k(current.c.total).label("per_100k")
+        result = await self._session.execute(
+            select(current.c.country_code, current.c.total, rate)
+            .outerjoin(Country, Country.code == current.c.country_code)
+            .order_by(rate.desc(), current.c.country_code)
+        )
+        return [(r.country_code, r.total, r.per_100k) for r in result]
+
+    async def weekly_totals(self, country: str | None = None) -> list[tuple[date, int]]:
+        """``SUM(new_cases) GROUP BY time ORDER BY time``, optionally for one country."""
+        if self._snapshot is not None:
+            return self._snapshot.weekly_totals(country=country)
+        q = (
+            select(
+                FluCaseWeekly.time,
+                func.sum(FluCaseWeekly.new_cases).label("total"),
+            )
+            .group_by(FluCaseWeekly.time)
+            .order_by(FluCaseWeekly.time)
+        )
+        if country:
+            q = q.where(FluCaseWeekly.country_code == country)
+        result = await self._session.execute(q)
+        return [(r.time, r.total) for r in result]
+
+    async def weekly_type_totals(self, since: date) -> list[tuple[date, str, int]]:
+        """``SUM(new_cases) GROUP BY time, flu_type ORDER BY time``."""
+        if self._snapshot is not None:
+            return self._snapshot.weekly_type_totals(since=since)
+        flu_type_label = cast(FluCaseWeekly.flu_type, String).label("flu_type")
+        q = (
+            select(
+                FluCaseWeekly.time,
+                flu_type_label,
+                func.sum(FluCaseWeekly.new_cases).label("total"),
+            )
+            .where(FluCaseWeekly.time >= since)
+            .group_by(FluCaseWeekly.time, flu_type_label)
+            .order_by(FluCaseWeekly.time)
+        )
+        result = await self._session.execute(q)
+        return [(r.time, r.flu_type, r.total) for r in result]
+
+    async def country_stats(
+        self,
+        since: date,
+        prior_since: date,
+        prior_until: date,
+        spark_since: date,
+        filters: CountryFilters = CountryFilters(),
+    ) -> list[CountryStats]:
+        """One page of per-country stats: totals since ``since`` and over the prior window, dominant
+        type since ``since`` and weekly totals since ``spark_since``, filtered and sorted per ``filters``.
+
+        Ranks and severities are relative to every reporting country, whatever the filters. On SQL
+        this is one CTE query, and sparklines are only aggregated for the countries on the page.
+        """
+        if self._snapshot is not None:
+            return _country_stats_in_memory(self._snapshot, since, prior_since, prior_until, spark_since, filters)
+
+        result = await self._session.execute(
+            _country_stats_query(self._session.bind.dialect.name, since, prior_since, prior_until, spark_since, filters)
+        )
+        rows = []
+        for r in result:
+            sparkline = r.sparkline if isinstance(r.sparkline, list) else json.loads(r.sparkline or "[]")
+            rows.append(
+                CountryStats(
+                    rank=r.rank,
+                    country_code=r.country_code,
+                    name=r.name,
+                    continent=r.continent or "",
+                    total=r.total,
+                    prior_total=r.prior_total,
+                    flu_type=r.flu_type or "",
+                    per_100k=r.per_100k,
+                    delta_pct=r.delta_pct,
+                    severity=r.severity,
+                    sparkline=sparkline,
+                )
+            )
+        return rows
+
+
+def _per_100k(total):
+    # Same arithmetic, in the same order, as app.population.per_100k
+    return cast(total, Float) / func.coalesce(Country.population, DEFAULT_POPULATION) * 100000
+
+
+def _matches(row: CountryStats, filters: CountryFilters) -> bool:
+    search = filters.search.lower()
+    return (
+        (not search or search in row.country_code.lower() or search in row.name.lower())
+        and (not filters.continent or filters.continent.lower() == row.continent.lower())
+        and (not filters.flu_type or filters.flu_type.lower() == row.flu_type.lower())
+    )
+
+
+def _country_stats_in_memory(
+    snapshot: CaseSnapshot,
+    since: date,
+    prior_since: date,
+    prior_until: date,
+    spark_since: date,
+    filters: CountryFilters,
+) -> list[CountryStats]:
+    current = snapshot.country_totals(since=since)
+    prior = snapshot.country_totals(since=prior_since, until=prior_until)
+    dominant = snapshot.dominant_types(since=since)
+    rates = {cc: per_100k(total, cc) for cc, total in current.items()}
+    max_per_100k = max(rates.values(), default=0)
+
+    rows = []
+    for rank, (cc, total) in enumerate(sorted(current.items(), key=lambda x: (-x[1], x[0])), 1):
+        prior_total = prior.get(cc, 0)
+        rows.append(
+            CountryStats(
+                rank=rank,
+                country_code=cc,
+                name=get_country_name(cc),
+                continent=get_continent(cc),
+                total=total,
+                prior_total=prior_total,
+                flu_type=dominant.get(cc, ""),
+                per_100k=rates[cc],
+                delta_pct=(total - prior_total) / prior_total * 100 if prior_total else 0.0,
+                severity=rates[cc] / max(max_per_100k, 1),
+                sparkline=[],
+            )
+        )
+
+    field = SORT_FIELDS[filters.sort]
+    rows = sorted((r for r in rows if _matches(r, filters)), key=lambda r: (-getattr(r, field), r.country_code))
+    if filters.after:
+        after = next((i for i, r in enumerate(rows) if r.country_code == filters.after), None)
+        rows = rows[after + 1 :] if after is not None else []
+    page = rows[: filters.limit]
+
+    series = snapshot.country_weekly_series(since=spark_since)
+    return [r._replace(sparkline=series.get(r.country_code, [])) for r in page]
+
+
+def _country_stats_query(
+    dialect: str, since: date, prior_since: date, prior_until: date, spark_since: date, filters: CountryFilters
+):
+    w = FluCaseWeekly
+    flu_type = cast(w.flu_type, String)
+    total = func.sum(w.new_cases)
+
+    current = (
+        select(w.country_code, total.label("total"))
+        .where(w.time >= since)
+        .group_by(w.country_code)
+        .cte("current_totals")
+    )
+    prior = (
+        select(w.country_code, total.label("total"))
+        .where(w.time >= prior_since, w.time < prior_until)
+        .group_by(w.country_code)
+        .cte("prior_totals")
+    )
+    # Ties go to the alphabetically first type, as in the snapshot
+    type_ranks = (
+        select(
+            w.country_code,
+            flu_type.label("flu_type"),
+            func.row_number().over(partition_by=w.country_code, order_by=(total.desc(), flu_type)).label("type_rank"),
+        )
+        .where(w.time >= since)
+        .group_by(w.country_code, flu_type)
+        .cte("type_ranks")
+    )
+
+    prior_total = func.coalesce(prior.c.total, 0)
+    stats = (
+        select(
+            current.c.country_code,
+            current.c.total,
+            prior_total.label("prior_total"),
+            type_ranks.c.flu_type,
+            func.coalesce(Country.name, current.c.country_code).label("name"),
+            Country.continent,
+            _per_100k(current.c.total).label("per_100k"),
+            case((prior_total > 0, cast(current.c.total - prior_total, Float) / prior_total * 100), else_=0.0).label(
+                "delta_pct"
+            ),
+            func.row_number().over(order_by=(current.c.total.desc(), current.c.country_code)).label("rank"),
+        )
+        .select_from(
+            current.outerjoin(prior, prior.c.country_code == current.c.country_code)
+            .outerjoin(
+                type_ranks,
+                and_(type_ranks.c.country_code == current.c.country_code, type_ranks.c.type_rank == 1),
+            )
+            .outerjoin(Country, Country.code == current.c.country_code)
+        )
+        .cte("country_stats")
+    )
+    max_per_100k = func.max(stats.c.per_100k).over()
+    ranked = select(
+        stats,
+        (stats.c.per_100k / case((max_per_100k > 1, max_per_100k), else_=1.0)).label("severity"),
+    ).cte("ranked")
+
+    sort_key = ranked.c[SORT_FIELDS[filters.sort]]
+    page = select(ranked)
+    if filters.search:
+        search = filters.search.lower()
+        page = page.where(
+            or_(
+                func.lower(ranked.c.country_code).contains(search, autoescape=True),
+                func.lower(ranked.c.name).contains(search, autoescape=True),
+            )
+        )
+    if filters.continent:
+        page = page.where(func.lower(ranked.c.continent) == filters.continent.lower())
+    if filters.flu_type:
+        page = page.where(func.lower(ranked.c.flu_type) == filters.flu_type.lower())
+    if filters.after:
+        # Keyset pagination: rows that sort after the given country's row
+        after_key = select(sort_key).where(ranked.c.country_code == filters.after).scalar_subquery()
+        page = page.where(or_(sort_key < after_key, and_(sort_key == after_key, ranked.c.country_code > filters.after)))
+    page = page.order_by(sort_key.desc(), ranked.c.country_code).limit(filters.limit).cte("page")
+
+    spark_weeks = (
+        select(w.country_code, w.time, total.label("total"))
+        .where(w.time >= spark_since, w.country_code.in_(select(page.c.country_code)))
+        .group_by(w.country_code, w.time)
+        .cte("spark_weeks")
+    )
+    if dialect == "postgresql":
+        series = func.array_agg(aggregate_order_by(spark_weeks.c.total, spark_weeks.c.time))
+        spark_source = spark_weeks
+    else:
+        # SQLite has no array_agg and (before 3.44) no ordered aggregates; json_group_array
+        # follows the order of an ordered subquery
+        spark_source = select(spark_weeks).order_by(spark_weeks.c.country_code, spark_weeks.c.time).subquery()
+        series = func.json_group_array(spark_source.c.total)
+    spark = (
+        select(spark_source.c.country_code, series.label("sparkline"))
+        .group_by(spark_source.c.country_code)
+        .cte("spark")
+    )
+
+    page_key = page.c[SORT_FIELDS[filters.sort]]
+    return (
+        select(page, spark.c.sparkline)
+        .select_from(page.outerjoin(spark, spark.c.country_code == page.c.country_code))
+        .order_by(page_key.desc(), page.c.country_code)
+    )
+
+
+@asynccontextmanager
+async def case_stats():
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        yield CaseStats(snapshot=snapshot)
+        return
+    async with async_session() as session:
+        yield CaseStats(session=session)
@@ -0,0 +1,66 @@
+"""Checkpoints that let an interrupted backfill resume instead of starting over.
+
+A backfill job is split into units (FluNet: one ISO year). While a unit
+downloads, the URLs of the pages fetched so far and the next-page cursor are
+saved after every page; once the unit's rows are committed it is marked
+completed. A later run of the same job skips completed units and replays the
+downloaded pages of a partial unit from the HTTP response cache before
+continuing from the cursor. A job that finishes clears its checkpoints, and
+checkpoints older than ``settings.BACKFILL_CHECKPOINT_MAX_AGE_HOURS`` are
+discarded rather than resumed.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+
+from app.config import settings
+from app.database import async_session
+from app.models import BackfillCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+async def load_checkpoints(job: str) -> dict[int, dict]:
+    """Checkpoints of an interrupted run of ``job`` by unit; empty if there is none to resume."""
+    cutoff = datetime.utcnow() - timedelta(hours=settings.BACKFILL_CHECKPOINT_MAX_AGE_HOURS)
+    async with async_session() as session:
+        latest = await session.scalar(
+            select(func.max(BackfillCheckpoint.updated_at)).where(BackfillCheckpoint.job == job)
+        )
+        if latest is None:
+            return {}
+        if latest < cutoff:
+            await session.execute(delete(BackfillCheckpoint).where(BackfillCheckpoint.job == job))
+            await session.commit()
+            logger.info(f"Discarded stale {job} checkpoints from {latest}")
+            return {}
+        rows = (await session.scalars(select(BackfillCheckpoint).where(BackfillCheckpoint.job == job))).all()
+    return {
+        row.unit: {"pages": list(row.pages), "next_link": row.next_link, "completed": row.completed_at is not None}
+        for row in rows
+    }
+
+
+async def save_checkpoint(job: str, unit: int, pages: list[str], next_link: str | None, completed: bool = False):
+    """Record ``unit``'s downloaded pages and cursor, or that its rows are committed."""
+    now = datetime.utcnow()
+    async with async_session() as session:
+        row = await session.scalar(
+            select(BackfillCheckpoint).where(BackfillCheckpoint.job == job, BackfillCheckpoint.unit == unit)
+        )
+        if row is None:
+            row = BackfillCheckpoint(job=job, unit=unit)
+            session.add(row)
+        row.pages = list(pages)
+        row.next_link = next_link
+        row.completed_at = now if completed else None
+        row.updated_at = now
+        await session.commit()
+
+
+async def clear_checkpoints(job: str):
+    async with async_session() as session:
+        await session.execute(delete(BackfillCheckpoint).where(BackfillCheckpoint.job == job))
+        await session.commit()
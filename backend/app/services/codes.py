@@ -0,0 +1,19 @@
+"""Lookup tables for the SMALLINT codes of the compact ``flu_cases`` layout.
+
+``flu_types`` and ``case_sources`` list each code of
+:data:`app.models.FLU_TYPE_CODES` and :data:`app.models.CASE_SOURCE_CODES`
+with its name, for SQL readers and for the weekly rollup, which translates
+compact rows back to names. Both are rewritten on every startup from the type
+definitions, whichever layout is in use, so switching layouts needs no reseed.
+"""
+
+from sqlalchemy import delete, insert
+
+from app.models import CASE_SOURCE_CODES, FLU_TYPE_CODES, CaseSource, FluTypeCode
+
+
+async def seed_codes(conn):
+    """Replace the lookup tables with the current codes; ``conn`` is a connection or session."""
+    for model, codes in ((FluTypeCode, FLU_TYPE_CODES), (CaseSource, CASE_SOURCE_CODES)):
+        await conn.execute(delete(model))
+        await conn.execute(insert(model), codes.rows())
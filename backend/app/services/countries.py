@@ -0,0 +1,63 @@
+"""The ``countries`` dimension table, seeded from the bundled country data.
+
+``app/data/countries.json`` holds each country's name and continent and
+``app/data/populations.json`` its population (see app.population). Queries join
+the table for display names, continent filters and per-capita rates; code that
+works from the in-memory case snapshot uses :func:`get_country_name`,
+:func:`get_continent` and :func:`app.population.per_100k` instead.
+"""
+
+import json
+import logging
+from pathlib import Path
+
+from sqlalchemy import delete, insert
+
+from app.models import Country
+from app.population import POPULATIONS
+
+logger = logging.getLogger(__name__)
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "countries.json"
+
+
+def _load_countries() -> dict[str, dict]:
+    try:
+        raw = json.loads(DATA_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        logger.exception("Could not read %s", DATA_PATH)
+        return {}
+    return {code.upper(): info for code, info in raw.items() if isinstance(info, dict)}
+
+
+COUNTRIES = _load_countries()
+
+
+def get_country_name(country_code: str) -> str:
+    """The country's display name, or its code when it has none."""
+    return COUNTRIES.get(country_code.upper(), {}).get("name") or country_code
+
+
+def get_continent(country_code: str) -> str:
+    return COUNTRIES.get(country_code.upper(), {}).get("continent", "")
+
+
+def country_rows() -> list[dict]:
+    """One ``countries`` row per code with a name, continent or population."""
+    return [
+        {
+            "code": code,
+            "name": get_country_name(code),
+            "continent": get_continent(code),
+            "population": POPULATIONS.get(code),
+        }
+        for code in sorted(COUNTRIES.keys() | POPULATIONS.keys())
+    ]
+
+
+async def seed_countries(conn):
+    """Replace the ``countries`` table with the bundled data; ``conn`` is a connection or session."""
+    rows = country_rows()
+    await conn.execute(delete(Country))
+    if rows:
+        await conn.execute(insert(Country), rows)
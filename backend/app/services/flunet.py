@@ -1,16 +1,34 @@
+import asyncio
+import json
 import logging
-from collections import defaultdict
-from datetime import datetime, timedelta
+from collections import deque
+from collections.abc import AsyncIterator
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import islice
 
 import httpx
+import numpy as np
+from sqlalchemy import Table, select, tuple_
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
+from app.cache import bump_data_version
+from app.config import settings
 from app.database import async_session
-from app.models import FluCase
+from app.executor import run_cpu_bound
+from app.models import FluCase, IngestionState
+from app.services.archive import source_clock, upstream_client
+from app.services.bulk import UpsertResult, bulk_insert, bulk_upsert
+from app.services.checkpoints import clear_checkpoints, load_checkpoints, save_checkpoint
+from app.services.http_cache import CachedResponse, open_body, response_cache
+from app.services.partitions import ensure_partitions, iso_years
+from app.services.rollup import refresh_weekly_rollup
+from app.services.shadow import unique_constraint_name
 
 logger = logging.getLogger(__name__)
 
 FLUNET_URL = "https://xmart-api-public.who.int/FLUMART/VIW_FNT"
+FLUNET_SOURCE = "who_flunet"
 
 UK_CODES = {"XE", "XI", "XS", "XW"}
 
@@ -32,10 +50,37 @@ SPECIFIC_FIELDS = list(SUBTYPE_MAP.keys())
 AGGREGATE_FIELDS = list(AGGREGATE_MAP.keys())
 LAST_RESORT_FIELDS = list(LAST_RESORT)
 FULL_BACKFILL_YEARS = 10
+# Delta runs never reach further back than this, e.g. after a long outage
+DELTA_MAX_WEEKS_BACK = 52
+# A country whose watermark trails the newest one by more than this has stopped
+# reporting for now and does not widen the delta window; its rows that fall
+# inside the window are still kept.
+DELTA_STALE_WEEKS = 8
+# Checkpoint job name of the resumable full backfill into flu_cases
+BACKFILL_JOB = "flunet_full"
+
+# year -> {"status", "pages", "raw_records", "records"} for the latest backfill
+_backfill_progress: dict[int, dict] = {}
+
+
+def _utcnow() -> datetime:
+    """Current time, or the recording time when replaying an archive so request windows match."""
+    return source_clock() or datetime.utcnow()
+
+
+@lru_cache(maxsize=None)
+def _week1_monday(iso_year: int) -> date:
+    """Monday of ISO week 1: the week containing January 4th."""
+    jan4 = date(iso_year, 1, 4)
+    return jan4 - timedelta(days=jan4.weekday())
 
 
 def _parse_week_date(iso_year: int, iso_week: int) -> datetime:
-    return datetime.strptime(f"{iso_year}-W{iso_week:02d}-1", "%G-W%V-%u")
+    """Monday of the given ISO week (same result as ``strptime(..., "%G-W%V-%u")``)."""
+    if not 1 <= iso_week <= 53:
+        raise ValueError(f"ISO week out of range: {iso_week}")
+    monday = _week1_monday(iso_year) + timedelta(weeks=iso_week - 1)
+    return datetime(monday.year, monday.month, monday.day)
 
 
 def _normalize_country(code: str) -> str:
@@ -44,191 +89,670 @@ def _normalize_country(code: str) -> str:
     return (code or "").upper()
 
 
+def _read_page(path: str) -> tuple[list[dict], str | None]:
+    """Decode one cached OData page into its ``value`` records and ``@odata.nextLink``."""
+    with open_body(path) as fp:
+        data = json.load(fp)
+    return data.get("value", []), data.get("@odata.nextLink")
+
+
+async def _fetch_query(
+    client: httpx.AsyncClient,
+    url: str,
+    force: bool = False,
+    on_page=None,
+    resume: dict[str, CachedResponse] | None = None,
+) -> tuple[list[dict] | None, list[CachedResponse]]:
+    """Download every page of an OData query through the response cache and aggregate its records.
+
+    Pages are parsed and folded into the aggregate as they arrive. A page whose
+    content was already loaded successfully is only parsed if some other page
+    of the query changed (or ``force``); its position is reserved so output
+    order is unaffected. Returns ``(None, pages)`` when the whole query is
+    unchanged. Callers pass ``pages`` to ``response_cache.mark_processed`` once
+    the records are written. ``on_page`` is awaited with each page, its raw
+    record count and the next page's URL. Pages in ``resume`` (by URL) were
+    downloaded by an interrupted run and are taken from the cache as they are.
+    """
+    aggregator = _WeeklyAggregator()
+    pages: list[CachedResponse] = []
+    deferred: list[tuple[CachedResponse, int]] = []
+    changed = force
+    while url:
+        logger.info(f"Fetching FluNet: {url[:120]}...")
+        page = (resume or {}).get(url) or await response_cache.fetch(client, url)
+        pages.append(page)
+        if page.unchanged and not changed and "next_link" in page.meta:
+            count = page.meta["records"]
+            deferred.append((page, aggregator.reserve(count)))
+            url = page.meta["next_link"]
+        else:
+            records, url = await run_cpu_bound(_read_page, str(page.path), label="flunet.read_page")
+            count = len(records)
+            response_cache.annotate(page, next_link=url, records=count)
+            changed = changed or not page.unchanged
+            await aggregator.add_offloaded(records)
+        if on_page is not None:
+            await on_page(page, count, url)
+
+    if not changed:
+        return None, pages
+    for page, base in deferred:
+        records, _ = await run_cpu_bound(_read_page, str(page.path), label="flunet.read_page")
+        await aggregator.add_offloaded(records, base)
+    return await aggregator.drain_offloaded(), pages
+
+
+async def _query_changed(client: httpx.AsyncClient, url: str) -> bool:
+    """Revalidate a previously loaded query's pages without parsing them; True if any page changed."""
+    while url:
+        page = await response_cache.fetch(client, url)
+        if not page.unchanged or "next_link" not in page.meta:
+            return True
+        url = page.meta["next_link"]
+    return False
+
+
+def _since_url(start: date, top: int = 120000) -> str:
+    """OData URL for every record from the ISO week containing ``start`` onwards."""
+    iso_year, iso_week, _ = start.isocalendar()
+    return (
+        f"{FLUNET_URL}?$filter=ISO_YEAR gt {iso_year} or (ISO_YEAR eq {iso_year} and ISO_WEEK ge {iso_week})&$top={top}"
+    )
+
+
+async def _fetch_since(start: date, force: bool = False) -> tuple[list[dict] | None, list[CachedResponse]]:
+    raw_counts = []
+
+    async def on_page(page: CachedResponse, count: int, next_link: str | None):
+        raw_counts.append(count)
+
+    async with upstream_client(timeout=120) as client:
+        records, pages = await _fetch_query(client, _since_url(start), force, on_page)
+
+    logger.info(f"Fetched {sum(raw_counts)} raw FluNet records since {start}")
+    return records, pages
+
+
+async def fetch_flunet_since(start: date) -> list[dict]:
+    """Fetch and process WHO FluNet data from the ISO week containing ``start`` onwards."""
+    records, _ = await _fetch_since(start, force=True)
+    return records
+
+
 async def fetch_flunet(weeks_back: int = 4):
     """Fetch WHO FluNet data for the last N weeks."""
-    cutoff = datetime.utcnow() - timedelta(weeks=weeks_back)
-    iso_year = cutoff.isocalendar()[0]
-    iso_week = cutoff.isocalendar()[1]
+    cutoff = _utcnow() - timedelta(weeks=weeks_back)
+    return await fetch_flunet_since(cutoff.date())
 
-    url = f"{FLUNET_URL}?$filter=ISO_YEAR ge {iso_year} and ISO_WEEK ge {iso_week}" f"&$top=120000"
 
-    records = []
-    async with httpx.AsyncClient(timeout=120) as client:
-        while url:
-            logger.info(f"Fetching FluNet: {url[:120]}...")
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            records.extend(data.get("value", []))
-            url = data.get("@odata.nextLink")
+def _year_url(year: int) -> str:
+    return f"{FLUNET_URL}?$filter=ISO_YEAR ge {year} and ISO_YEAR lt {year + 1}&$top=50000"
 
-    logger.info(f"Fetched {len(records)} raw FluNet records")
-    return _process_records(records)
 
-
-async def fetch_flunet_full(years_back: int = FULL_BACKFILL_YEARS):
-    """Fetch a bounded multi-year backfill window from FluNet."""
-    current_year = datetime.utcnow().year
+def _backfill_years(years_back: int) -> list[int]:
     # Include the current partial year plus the preceding full `years_back`
     # years so the startup span can satisfy a full 10-year requirement.
-    start_year = current_year - years_back
-    records = []
-
-    async with httpx.AsyncClient(timeout=180) as client:
-        for year in range(start_year, current_year + 1):
-            url = f"{FLUNET_URL}?$filter=ISO_YEAR ge {year} and ISO_YEAR lt {year + 1}" f"&$top=50000"
-            year_records = 0
-            while url:
-                logger.info("Fetching FluNet backfill year %s: %s...", year, url[:120])
-                resp = await client.get(url)
-                resp.raise_for_status()
-                data = resp.json()
-                page = data.get("value", [])
-                year_records += len(page)
-                records.extend(page)
-                url = data.get("@odata.nextLink")
-            logger.info("Fetched %s raw FluNet records for year %s", year_records, year)
+    current_year = _utcnow().year
+    return list(range(current_year - years_back, current_year + 1))
+
+
+async def _fetch_year(
+    client: httpx.AsyncClient,
+    year: int,
+    force: bool = False,
+    job: str | None = None,
+    checkpoint: dict | None = None,
+) -> tuple[list[dict] | None, list[CachedResponse]]:
+    """Download and aggregate every page of one ISO year, recording progress as pages arrive.
+
+    With a ``job``, each downloaded page is checkpointed; pages listed in an
+    interrupted run's ``checkpoint`` are read back from the response cache
+    instead of being downloaded again.
+
+    Returns ``(None, pages)`` if the year is unchanged since it was last loaded.
+    """
+    progress = _backfill_progress[year]
+    progress["status"] = "fetching"
+
+    resume = {}
+    if checkpoint and checkpoint["pages"]:
+        cached = [response_cache.cached(url) for url in checkpoint["pages"]]
+        if all(cached):
+            resume = dict(zip(checkpoint["pages"], cached))
+            logger.info(f"Resuming FluNet year {year} after {len(resume)} downloaded pages")
+    downloaded: list[str] = []
+
+    async def on_page(page: CachedResponse, count: int, next_link: str | None):
+        progress["pages"] += 1
+        progress["raw_records"] += count
+        if job is not None:
+            downloaded.append(page.url)
+            await save_checkpoint(job, year, downloaded, next_link)
 
+    try:
+        records, pages = await _fetch_query(client, _year_url(year), force, on_page, resume)
+    except Exception:
+        progress["status"] = "failed"
+        raise
+    progress["status"] = "done" if records is not None else "unchanged"
+    progress["records"] = len(records or [])
+    done = sum(1 for p in _backfill_progress.values() if p["status"] in ("done", "unchanged", "resumed"))
     logger.info(
-        "Fetched %s raw FluNet records for %s-year backfill",
-        len(records),
-        years_back,
+        "Fetched %s raw FluNet records for year %s in %s pages%s (%s/%s years done)",
+        progress["raw_records"],
+        year,
+        progress["pages"],
+        "" if records is not None else ", unchanged since last load",
+        done,
+        len(_backfill_progress),
     )
-    return _process_records(records)
-
-
-def _process_records(records: list) -> list[dict]:
-    """Parse FluNet records with subtype priority and UK normalization."""
-    parsed = []
-
-    for rec in records:
-        iso_year = rec.get("ISO_YEAR")
-        iso_week = rec.get("ISO_WEEK")
-        if not iso_year or not iso_week:
-            continue
-
-        country_code = _normalize_country(rec.get("ISO2") or rec.get("COUNTRY_CODE") or "")
-        if not country_code:
-            continue
-
-        try:
-            time_val = _parse_week_date(iso_year, iso_week)
-        except (ValueError, TypeError):
-            continue
-
-        has_specific = False
-        for field, label in SUBTYPE_MAP.items():
-            val = rec.get(field)
-            if val and int(val) > 0:
-                has_specific = True
-                parsed.append(
-                    {
-                        "country_code": country_code,
-                        "region": "",
-                        "city": "",
-                        "flu_type": label,
-                        "source": "who_flunet",
-                        "time": time_val.date(),
-                        "new_cases": int(val),
-                        "iso_year": iso_year,
-                        "iso_week": iso_week,
-                    }
-                )
-
-        if not has_specific:
-            for field, label in AGGREGATE_MAP.items():
-                val = rec.get(field)
-                if val and int(val) > 0:
-                    has_specific = True
-                    parsed.append(
-                        {
-                            "country_code": country_code,
-                            "region": "",
-                            "city": "",
-                            "flu_type": label,
-                            "source": "who_flunet",
-                            "time": time_val.date(),
-                            "new_cases": int(val),
-                            "iso_year": iso_year,
-                            "iso_week": iso_week,
-                        }
+    return records, pages
+
+
+def get_backfill_progress() -> dict[int, dict]:
+    """Per-year status of the most recent FluNet backfill."""
+    return {year: dict(p) for year, p in _backfill_progress.items()}
+
+
+async def stream_flunet_full(
+    years_back: int = FULL_BACKFILL_YEARS,
+    concurrency: int | None = None,
+    force: bool = False,
+    job: str | None = None,
+    processed: list[CachedResponse] | None = None,
+) -> AsyncIterator[list[dict]]:
+    """Stream a bounded multi-year backfill window from FluNet, one processed year at a time.
+
+    Each OData page is parsed and folded into a per-year aggregate as soon as it
+    arrives, so raw pages are never retained. Aggregation has to span the whole
+    year because UK nations and multiple surveillance origins for the same
+    country-week can land on different pages; once a year's pages are exhausted
+    its rows are final and are yielded for upserting.
+
+    With ``concurrency`` > 1 up to that many years (each with its own
+    ``@odata.nextLink`` chain) download in parallel over one pooled client.
+    Batches are still yielded in year order, so the output is identical to the
+    sequential path, and at most ``concurrency`` finished years are buffered.
+
+    Years whose responses are unchanged since they were last loaded are skipped
+    unless ``force``. A year is recorded as loaded once the consumer asks for
+    the next batch, i.e. after it has written this one. With ``processed`` its
+    pages are appended there instead, for a consumer whose writes only become
+    visible later (a rebuild shadow) to mark once they do.
+
+    With a ``job`` name the backfill is resumable: years the consumer already
+    wrote in an interrupted run of the same job are skipped (even with
+    ``force``) and a partly downloaded year continues from its last page; see
+    :mod:`app.services.checkpoints`. Checkpoints are cleared once every year
+    has been written.
+    """
+    if concurrency is None:
+        concurrency = settings.FLUNET_BACKFILL_CONCURRENCY
+    concurrency = max(1, concurrency)
+
+    checkpoints = await load_checkpoints(job) if job is not None else {}
+    years = _backfill_years(years_back)
+    _backfill_progress.clear()
+    for year in years:
+        _backfill_progress[year] = {"status": "pending", "pages": 0, "raw_records": 0, "records": 0}
+    completed = [year for year in years if checkpoints.get(year, {}).get("completed")]
+    for year in completed:
+        _backfill_progress[year]["status"] = "resumed"
+    if completed:
+        logger.info(f"Resuming FluNet backfill {job}: years {completed} were already loaded")
+    years = [year for year in years if year not in completed]
+
+    async def loaded(year: int, pages: list[CachedResponse]):
+        if processed is None:
+            response_cache.mark_processed(pages)
+        else:
+            processed.extend(pages)
+        if job is not None:
+            await save_checkpoint(job, year, [page.url for page in pages], None, completed=True)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with upstream_client(timeout=180, limits=limits) as client:
+        if concurrency == 1:
+            for year in years:
+                records, pages = await _fetch_year(client, year, force, job, checkpoints.get(year))
+                if records is not None:
+                    yield records
+                await loaded(year, pages)
+        else:
+            pending = deque()
+            remaining = iter(years)
+            try:
+                for year in islice(remaining, concurrency):
+                    pending.append(
+                        (year, asyncio.create_task(_fetch_year(client, year, force, job, checkpoints.get(year))))
                     )
+                while pending:
+                    year, task = pending.popleft()
+                    records, pages = await task
+                    next_year = next(remaining, None)
+                    if next_year is not None:
+                        task = asyncio.create_task(
+                            _fetch_year(client, next_year, force, job, checkpoints.get(next_year))
+                        )
+                        pending.append((next_year, task))
+                    if records is not None:
+                        yield records
+                    await loaded(year, pages)
+            finally:
+                for _, task in pending:
+                    task.cancel()
+                await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
+    if job is not None:
+        # Years loaded by the interrupted run count as processed too
+        for year in completed:
+            response_cache.mark_processed([p for p in map(response_cache.cached, checkpoints[year]["pages"]) if p])
+        await clear_checkpoints(job)
+
+
+# Output flu_type labels in per-record emission order: specific subtypes,
+# then aggregates, then the last-resort "unknown".
+TYPE_LABELS = [*SUBTYPE_MAP.values(), *AGGREGATE_MAP.values(), "unknown"]
+_UNKNOWN_SLOT = len(TYPE_LABELS) - 1
+
+
+def _numeric_column(records: list, field: str) -> np.ndarray:
+    """Values of ``field`` as float64, with missing and non-numeric entries as NaN."""
+    values = [rec.get(field) for rec in records]
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.empty(len(values), dtype=np.float64)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v) if v is not None else np.nan
+            except (TypeError, ValueError):
+                out[i] = np.nan
+        return out
+
+
+def _counts_matrix(records: list, fields: list[str]) -> np.ndarray:
+    """Case counts for ``fields`` as an (n, len(fields)) int64 matrix; missing or non-numeric values count as 0."""
+    matrix = np.column_stack([_numeric_column(records, f) for f in fields])
+    matrix = np.nan_to_num(matrix, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.trunc(matrix).astype(np.int64)
+
+
+def _week_start_ordinals(years: np.ndarray, weeks: np.ndarray) -> np.ndarray:
+    """Proleptic ordinal of the Monday of each ISO (year, week), via memoized week-1 Mondays."""
+    unique_years, inverse = np.unique(years, return_inverse=True)
+    week1 = np.array([_week1_monday(int(y)).toordinal() for y in unique_years], dtype=np.int64)
+    return week1[inverse] + (weeks - 1) * 7
+
+
+def _parse_page(records: list, base: int) -> tuple | None:
+    """Parse one page of raw records into compact integer columns.
+
+    Pure function of its inputs so it can run on a worker thread or process.
+    Returns ``(codes, day, country, slot, cases, iso_year, iso_week, position)``
+    where ``country`` indexes into ``codes`` and ``position`` orders rows as the
+    original per-record emission did; ``None`` if nothing on the page is usable.
+    """
+    n = len(records)
+    if not n:
+        return None
+
+    years = _numeric_column(records, "ISO_YEAR")
+    weeks = _numeric_column(records, "ISO_WEEK")
+    raw_codes = np.array([rec.get("ISO2") or rec.get("COUNTRY_CODE") or "" for rec in records], dtype=str)
+    unique_codes, code_inverse = np.unique(raw_codes, return_inverse=True)
+    codes: dict[str, int] = {}
+    code_index = np.array(
+        [
+            codes.setdefault(code, len(codes)) if (code := _normalize_country(raw)) else -1
+            for raw in unique_codes.tolist()
+        ],
+        dtype=np.int64,
+    )
+    countries = code_index[code_inverse]
+
+    valid = (
+        (countries >= 0)
+        & (years == np.trunc(years))
+        & (weeks == np.trunc(weeks))
+        & (years >= 1)
+        & (years <= 9999)
+        & (weeks >= 1)
+        & (weeks <= 53)
+    )
+    if not valid.any():
+        return None
+    rows = np.flatnonzero(valid)
+    page = [records[i] for i in rows]
+    years = years[rows].astype(np.int64)
+    weeks = weeks[rows].astype(np.int64)
+    countries = countries[rows]
+    days = _week_start_ordinals(years, weeks)
+
+    specific = _counts_matrix(page, SPECIFIC_FIELDS)
+    aggregate = _counts_matrix(page, AGGREGATE_FIELDS)
+    last_resort = _counts_matrix(page, LAST_RESORT_FIELDS)
+
+    # Subtype priority: specific subtypes win; aggregates only when no
+    # specific subtype was reported; otherwise the first positive
+    # last-resort total becomes "unknown".
+    specific_mask = specific > 0
+    has_specific = specific_mask.any(axis=1)
+    aggregate_mask = (aggregate > 0) & ~has_specific[:, None]
+    has_aggregate = aggregate_mask.any(axis=1)
+    last_positive = last_resort > 0
+    use_last = ~has_specific & ~has_aggregate & last_positive.any(axis=1)
+    last_values = last_resort[np.arange(len(page)), np.argmax(last_positive, axis=1)]
+
+    counts = np.concatenate([specific, aggregate, last_values[:, None]], axis=1)
+    mask = np.concatenate([specific_mask, aggregate_mask, use_last[:, None]], axis=1)
+    rec_idx, slot = np.nonzero(mask)
+    if not len(rec_idx):
+        return None  # every count on the page is zero or missing
+
+    return (
+        list(codes),
+        days[rec_idx],
+        countries[rec_idx],
+        slot.astype(np.int64),
+        counts[rec_idx, slot],
+        years[rec_idx],
+        weeks[rec_idx],
+        (base + rows[rec_idx]) * len(TYPE_LABELS) + slot,
+    )
 
-        if not has_specific:
-            for field in LAST_RESORT_FIELDS:
-                val = rec.get(field)
-                if val and int(val) > 0:
-                    parsed.append(
-                        {
-                            "country_code": country_code,
-                            "region": "",
-                            "city": "",
-                            "flu_type": "unknown",
-                            "source": "who_flunet",
-                            "time": time_val.date(),
-                            "new_cases": int(val),
-                            "iso_year": iso_year,
-                            "iso_week": iso_week,
-                        }
-                    )
-                    break
 
-    # Aggregate duplicates (handles UK merging)
-    agg = defaultdict(int)
-    meta = {}
-    for r in parsed:
-        key = (r["time"], r["country_code"], r["region"], r["city"], r["flu_type"], r["source"])
-        agg[key] += r["new_cases"]
-        meta[key] = (r["iso_year"], r["iso_week"])
-
-    result = []
-    for key, total in agg.items():
-        time_val, cc, region, city, flu_type, source = key
-        iy, iw = meta[key]
-        result.append(
-            {
-                "country_code": cc,
-                "region": region,
-                "city": city,
-                "flu_type": flu_type,
-                "source": source,
-                "time": time_val,
-                "new_cases": total,
-                "iso_year": iy,
-                "iso_week": iw,
-            }
+def _aggregate_chunks(chunks: list[tuple]) -> list[dict]:
+    """Sum parsed page chunks by (week, country, flu type) into upsert-ready rows.
+
+    Pure function of its inputs so it can run on a worker thread or process.
+    """
+    if not chunks:
+        return []
+
+    codes: dict[str, int] = {}
+    country_parts = []
+    for chunk_codes, _, local_country, *_ in chunks:
+        mapping = np.array([codes.setdefault(code, len(codes)) for code in chunk_codes], dtype=np.int64)
+        country_parts.append(mapping[local_country])
+    country = np.concatenate(country_parts)
+    day, slot, cases, years, weeks, position = (np.concatenate([c[i] for c in chunks]) for i in (1, 3, 4, 5, 6, 7))
+    code_list = list(codes)
+
+    keys = (day * len(code_list) + country) * len(TYPE_LABELS) + slot
+    _, first, group = np.unique(keys, return_index=True, return_inverse=True)
+    totals = np.bincount(group, weights=cases, minlength=len(first)).astype(np.int64)
+    last = np.full(len(first), -1, dtype=np.int64)
+    np.maximum.at(last, group, np.arange(len(keys)))
+    groups = np.argsort(position[first], kind="stable")
+    firsts = first[groups]
+    lasts = last[groups]
+
+    unique_days, day_inverse = np.unique(day[firsts], return_inverse=True)
+    dates = [date.fromordinal(d) for d in unique_days.tolist()]
+
+    return [
+        {
+            "country_code": code_list[cc],
+            "region": "",
+            "city": "",
+            "flu_type": TYPE_LABELS[type_slot],
+            "source": FLUNET_SOURCE,
+            "time": dates[d],
+            "new_cases": total,
+            "iso_year": iy,
+            "iso_week": iw,
+        }
+        for cc, type_slot, d, total, iy, iw in zip(
+            country[firsts].tolist(),
+            slot[firsts].tolist(),
+            day_inverse.tolist(),
+            totals[groups].tolist(),
+            years[lasts].tolist(),
+            weeks[lasts].tolist(),
         )
+    ]
+
+
+class _WeeklyAggregator:
+    """Columnar running sum of parsed FluNet rows keyed by week, country and flu type.
+
+    Each page is parsed in bulk (:func:`_parse_page`): field extraction is a
+    single pass per column and subtype priority, ISO-week to date conversion and
+    duplicate aggregation are NumPy array operations. Only compact integer
+    columns are kept between pages, so memory is bounded by parsed rows rather
+    than raw JSON records. Output rows and their order are identical to the
+    original per-record implementation (first occurrence order, last
+    occurrence's ISO year/week).
+
+    The ``*_offloaded`` variants run the parsing and aggregation on the CPU
+    executor instead of the event loop.
+    """
+
+    def __init__(self):
+        self._chunks: list[tuple] = []
+        self._offset = 0
+
+    def reserve(self, n: int) -> int:
+        """Reserve output positions for a page of ``n`` records that will be added later."""
+        base = self._offset
+        self._offset += n
+        return base
 
-    return result
+    def _take(self) -> list[tuple]:
+        # Pages added out of order (see reserve) are put back in position order
+        chunks = sorted(self._chunks, key=lambda chunk: chunk[7][0])
+        self.__init__()
+        return chunks
 
+    def add(self, records: list, base: int | None = None):
+        chunk = _parse_page(records, self.reserve(len(records)) if base is None else base)
+        if chunk is not None:
+            self._chunks.append(chunk)
 
-async def ingest_flunet(weeks_back: int = 4):
+    async def add_offloaded(self, records: list, base: int | None = None):
+        if base is None:
+            base = self.reserve(len(records))
+        chunk = await run_cpu_bound(_parse_page, records, base, label="flunet.parse_page")
+        if chunk is not None:
+            self._chunks.append(chunk)
+
+    def drain(self) -> list[dict]:
+        """Return the aggregated rows and reset the aggregator."""
+        return _aggregate_chunks(self._take())
+
+    async def drain_offloaded(self) -> list[dict]:
+        return await run_cpu_bound(_aggregate_chunks, self._take(), label="flunet.aggregate")
+
+
+def _process_records(records: list) -> list[dict]:
+    """Parse FluNet records with subtype priority and UK normalization, aggregating duplicates."""
+    aggregator = _WeeklyAggregator()
+    aggregator.add(records)
+    return aggregator.drain()
+
+
+async def ingest_flunet(weeks_back: int = 4) -> UpsertResult:
     """Fetch and upsert FluNet data."""
     try:
         records = await fetch_flunet(weeks_back)
-        await _upsert_records(records)
+        result = await _upsert_records(records)
         logger.info(f"Ingested {len(records)} FluNet records")
+        return result
     except Exception:
         logger.exception("FluNet ingestion failed")
+        return UpsertResult()
+
+
+async def ingest_flunet_delta(lookback_weeks: int | None = None) -> UpsertResult:
+    """Fetch only weeks newer than each country's watermark, minus a revision lookback.
+
+    Falls back to the fixed 4-week window when no watermarks exist yet.
+    Returns the inserted/updated/unchanged row counts.
+    """
+    if lookback_weeks is None:
+        lookback_weeks = settings.FLUNET_REVISION_LOOKBACK_WEEKS
+    try:
+        watermarks = await _load_watermarks(FLUNET_SOURCE)
+        if not watermarks:
+            logger.info("No FluNet watermarks yet; falling back to 4-week window")
+            return await ingest_flunet(weeks_back=4)
+
+        floors = _revision_floors(watermarks, lookback_weeks)
+        oldest_allowed = _utcnow().date() - timedelta(weeks=DELTA_MAX_WEEKS_BACK)
+        reporting_since = max(floors.values()) - timedelta(weeks=DELTA_STALE_WEEKS)
+        start = max(min(f for f in floors.values() if f >= reporting_since), oldest_allowed)
+
+        records, pages = await _fetch_since(start)
+        if records is None:
+            logger.info(f"FluNet unchanged since last delta from {start}; nothing to ingest")
+            return UpsertResult()
+        records = [r for r in records if r["time"] >= floors.get(r["country_code"], start)]
+        result = await _upsert_records(records)
+        response_cache.mark_processed(pages)
+        logger.info(f"Ingested {len(records)} FluNet records (delta since {start})")
+        return result
+    except Exception:
+        logger.exception("FluNet delta ingestion failed")
+        return UpsertResult()
+
+
+def _revision_floors(watermarks: dict[str, tuple[int, int]], lookback_weeks: int) -> dict[str, date]:
+    """Earliest week to keep per country: its watermark week minus the revision lookback."""
+    return {
+        cc: _parse_week_date(iso_year, iso_week).date() - timedelta(weeks=lookback_weeks)
+        for cc, (iso_year, iso_week) in watermarks.items()
+    }
 
 
-async def ingest_flunet_full():
+def _latest_weeks(records: list[dict]) -> dict[str, tuple[int, int]]:
+    """Latest (ISO year, ISO week) present per country in ``records``."""
+    latest: dict[str, tuple[int, int]] = {}
+    for r in records:
+        week = (r["iso_year"], r["iso_week"])
+        if week > latest.get(r["country_code"], (0, 0)):
+            latest[r["country_code"]] = week
+    return latest
+
+
+async def _load_watermarks(source: str) -> dict[str, tuple[int, int]]:
+    async with async_session() as session:
+        result = await session.execute(
+            select(IngestionState.country_code, IngestionState.last_iso_year, IngestionState.last_iso_week).where(
+                IngestionState.source == source
+            )
+        )
+        return {r.country_code: (r.last_iso_year, r.last_iso_week) for r in result}
+
+
+async def _advance_watermarks(session, source: str, records: list[dict]):
+    """Move each country's watermark forward to the newest week in ``records`` (never backwards)."""
+    latest = _latest_weeks(records)
+    if not latest:
+        return
+
+    now = datetime.utcnow()
+    stmt = pg_insert(IngestionState).values(
+        [
+            {"source": source, "country_code": cc, "last_iso_year": iy, "last_iso_week": iw, "updated_at": now}
+            for cc, (iy, iw) in latest.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_ingestion_state",
+        set_={
+            "last_iso_year": stmt.excluded.last_iso_year,
+            "last_iso_week": stmt.excluded.last_iso_week,
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=tuple_(IngestionState.last_iso_year, IngestionState.last_iso_week)
+        < tuple_(stmt.excluded.last_iso_year, stmt.excluded.last_iso_week),
+    )
+    await session.execute(stmt)
+
+
+async def ingest_flunet_full(force: bool = False):
     """Full backfill and upsert."""
     try:
-        records = await fetch_flunet_full()
-        await _upsert_records(records)
-        logger.info(f"Ingested {len(records)} FluNet records (full)")
+        await load_flunet_full(force=force)
     except Exception:
         logger.exception("FluNet full ingestion failed")
 
 
-async def _upsert_records(records: list[dict]):
+async def load_flunet_full(table: Table = FluCase.__table__, force: bool = False) -> tuple[int, list[CachedResponse]]:
+    """Full backfill into ``table``, upserting each year as soon as it has been processed.
+
+    Unlike :func:`ingest_flunet_full` this raises on failure, so callers such as
+    the shadow-table rebuild can tell an empty load from a failed one.
+
+    The live table skips years unchanged since they were last loaded. Any other
+    table (a rebuild shadow) starts empty, so it is loaded in full if any year
+    changed and not at all (returning 0 rows) if none did.
+
+    Returns the rows loaded and the responses they came from that still need
+    ``response_cache.mark_processed``: none for the live table, which marks
+    each year as it is written; for a shadow, all of them, to be marked once
+    the shadow has been swapped in.
+
+    Loads into the live table are checkpointed per year (each year's upsert
+    commits on its own), so calling this again after a failure resumes the
+    backfill instead of downloading every year again. A shadow table is dropped
+    when its rebuild fails, so shadow loads always start over.
+    """
+    if table is not FluCase.__table__ and not force:
+        async with upstream_client(timeout=180) as client:
+            for year in _backfill_years(FULL_BACKFILL_YEARS):
+                if await _query_changed(client, _year_url(year)):
+                    break
+            else:
+                logger.info(f"FluNet unchanged since last full load; skipping load into {table.name}")
+                return 0, []
+        force = True
+
+    live = table is FluCase.__table__
+    pending = None if live else []
+    total = 0
+    async for records in stream_flunet_full(force=force, job=BACKFILL_JOB if live else None, processed=pending):
+        await _upsert_records(records, table)
+        total += len(records)
+    logger.info(f"Ingested {total} FluNet records (full) into {table.name}")
+    return total, pending or []
+
+
+async def load_flunet_year(year: int, table: Table) -> tuple[int, list[CachedResponse]]:
+    """Download ISO ``year`` in full and load it into ``table``, a partition shadow being rebuilt.
+
+    Raises on failure, like :func:`load_flunet_full`. Returns the rows loaded
+    and the pages they came from, for the caller to mark processed once the
+    partition has been swapped in.
+    """
+    # Only this year's entry: the rest of the backfill progress is left as reported
+    _backfill_progress[year] = {"status": "pending", "pages": 0, "raw_records": 0, "records": 0}
+    async with upstream_client(timeout=180) as client:
+        records, pages = await _fetch_year(client, year, force=True)
+    await _upsert_records(records, table)
+    logger.info(f"Ingested {len(records)} FluNet records for {year} into {table.name}")
+    return len(records), pages
+
+
+async def _upsert_records(records: list[dict], table: Table = FluCase.__table__) -> UpsertResult:
+    """Write ``records`` to ``table`` and report how many rows were inserted, updated or unchanged.
+
+    In the default ``update`` mode WHO revisions to past weeks overwrite the
+    stored count; ``ignore`` keeps whatever was stored first.
+    """
     if not records:
-        return
+        return UpsertResult()
+
+    # New partitions get their own short transaction: creating one locks the whole table
+    async with async_session() as session:
+        await ensure_partitions(await session.connection(), table, iso_years(r["time"] for r in records))
+        await session.commit()
 
     async with async_session() as session:
-        # Deduplicate records within this payload only; existing-row duplicates
-        # are handled by ON CONFLICT DO NOTHING at the database level.
+        # Deduplicate records within this payload only; rows already in the
+        # table are resolved by ON CONFLICT at the database level.
         deduped_records = []
         seen = set()
         for r in records:
@@ -237,14 +761,25 @@ async def _upsert_records(records: list[dict]):
                 seen.add(key)
                 deduped_records.append(r)
 
-        if deduped_records:
-            # Batch insert
-            for i in range(0, len(deduped_records), 1000):
-                batch = deduped_records[i : i + 1000]
-                stmt = pg_insert(FluCase).values(batch)
-                stmt = stmt.on_conflict_do_nothing(constraint="uq_flu_case")
-                await session.execute(stmt)
-            await session.commit()
-            logger.info(f"Upserted {len(deduped_records)} FluNet records")
+        constraint = unique_constraint_name(table)
+        if settings.FLUNET_UPSERT_MODE == "update":
+            result = await bulk_upsert(session, table, deduped_records, constraint, ["new_cases"])
         else:
-            logger.info("No new FluNet records to insert")
+            inserted = await bulk_insert(session, table, deduped_records, constraint)
+            result = UpsertResult(inserted=inserted, unchanged=len(deduped_records) - inserted)
+        if table is FluCase.__table__:
+            await _advance_watermarks(session, FLUNET_SOURCE, deduped_records)
+            if result.changed:
+                await refresh_weekly_rollup(session, {r["time"] for r in deduped_records})
+        await session.commit()
+        if table is FluCase.__table__ and result.changed:
+            bump_data_version("FluNet upsert")
+        logger.info(
+            "Upserted %s FluNet records into %s: %s inserted, %s updated, %s unchanged",
+            len(deduped_records),
+            table.name,
+            result.inserted,
+            result.updated,
+            result.unchanged,
+        )
+        return result
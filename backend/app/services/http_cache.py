@@ -0,0 +1,180 @@
+"""On-disk cache of upstream HTTP responses with conditional revalidation.
+
+Bodies are stored gzip-compressed under ``settings.HTTP_CACHE_DIR``, keyed by
+URL, next to a small JSON metadata file holding the validators (``ETag``,
+``Last-Modified``), the SHA-256 of the body and the digest of the body last
+processed successfully. Re-fetching a cached URL sends ``If-None-Match`` /
+``If-Modified-Since``, so an unchanged upstream answers ``304`` and the body is
+served from disk.
+
+Ingestion compares :attr:`CachedResponse.unchanged` to skip parsing and
+upserting content that was already loaded, and calls
+:meth:`ResponseCache.mark_processed` only after its write committed.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+# Fast compression: bodies are written from the event loop as they stream in
+GZIP_LEVEL = 1
+PRUNE_INTERVAL_SECONDS = 24 * 3600
+
+
+def open_body(path: str | Path):
+    """Open a cached body for binary reading, transparently decompressing gzip files."""
+    with open(path, "rb") as fp:
+        magic = fp.read(2)
+    return gzip.open(path, "rb") if magic == b"\x1f\x8b" else open(path, "rb")
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    path: Path
+    digest: str
+    meta: dict = field(default_factory=dict)
+    # False when the server answered 304 and the body came from disk
+    fresh: bool = True
+
+    @property
+    def unchanged(self) -> bool:
+        """Whether this exact content was already processed successfully."""
+        return settings.HTTP_CACHE_ENABLED and self.meta.get("processed_digest") == self.digest
+
+    def open(self):
+        return open_body(self.path)
+
+
+class ResponseCache:
+    def __init__(self, directory: str | Path | None = None):
+        self.directory = Path(directory or settings.HTTP_CACHE_DIR or Path(tempfile.gettempdir()) / "flutracker-http")
+        self._last_prune = 0.0
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()[:40]
+        return self.directory / f"{key}.gz", self.directory / f"{key}.json"
+
+    def _read_meta(self, url: str) -> dict:
+        body_path, meta_path = self._paths(url)
+        if not (body_path.exists() and meta_path.exists()):
+            return {}
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return meta if meta.get("url") == url else {}
+
+    def _write_meta(self, meta: dict):
+        _, meta_path = self._paths(meta["url"])
+        tmp = meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, meta_path)
+
+    async def fetch(self, client: httpx.AsyncClient, url: str, headers: dict | None = None) -> CachedResponse:
+        """GET ``url``, revalidating any cached copy, and return the (possibly cached) body on disk."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._maybe_prune()
+        body_path, _ = self._paths(url)
+        meta = self._read_meta(url) if settings.HTTP_CACHE_ENABLED else {}
+
+        request_headers = dict(headers or {})
+        if meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        async with client.stream("GET", url, headers=request_headers) as resp:
+            if resp.status_code == 304 and meta:
+                meta["checked_at"] = datetime.utcnow().isoformat()
+                self._write_meta(meta)
+                os.utime(body_path)  # keep the body from being pruned while it is still current
+                logger.info("Not modified, using cached body: %s", url[:120])
+                return CachedResponse(url, body_path, meta["digest"], meta, fresh=False)
+            resp.raise_for_status()
+
+            digest = hashlib.sha256()
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL) as out:
+                    async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                        digest.update(chunk)
+                        out.write(chunk)
+                os.replace(tmp, body_path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+        now = datetime.utcnow().isoformat()
+        new_digest = digest.hexdigest()
+        # Annotations describe the old body; keep them only if the content is the same
+        if meta.get("digest") != new_digest:
+            meta = {"processed_digest": meta.get("processed_digest")}
+        meta = {
+            **meta,
+            "url": url,
+            "etag": resp.headers.get("etag"),
+            "last_modified": resp.headers.get("last-modified"),
+            "digest": new_digest,
+            "fetched_at": now,
+            "checked_at": now,
+        }
+        self._write_meta(meta)
+        return CachedResponse(url, body_path, meta["digest"], meta)
+
+    def cached(self, url: str) -> CachedResponse | None:
+        """The stored response for ``url`` without contacting the server, or None if there is none."""
+        meta = self._read_meta(url)
+        if not meta:
+            return None
+        body_path, _ = self._paths(url)
+        return CachedResponse(url, body_path, meta["digest"], meta, fresh=False)
+
+    def annotate(self, response: CachedResponse, **fields):
+        """Persist extra per-response facts (e.g. a parsed next-page link) alongside the validators."""
+        response.meta.update(fields)
+        self._write_meta(response.meta)
+
+    def mark_processed(self, responses: list[CachedResponse]):
+        """Record that each response's current content has been loaded successfully."""
+        for response in responses:
+            self.annotate(response, processed_digest=response.digest)
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = now
+        self.prune(settings.HTTP_CACHE_MAX_AGE_DAYS * 86400)
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete entries not revalidated within ``max_age_seconds`` (e.g. superseded delta windows)."""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for path in self.directory.glob("*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info("Pruned %s stale HTTP cache files", removed)
+        return removed
+
+
+response_cache = ResponseCache()
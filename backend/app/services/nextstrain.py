@@ -1,15 +1,27 @@
+import asyncio
 import logging
-from datetime import datetime
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from datetime import datetime, timedelta
 
 import httpx
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+import ijson
+from sqlalchemy import Table, delete
 
+from app.cache import bump_data_version
+from app.config import settings
 from app.database import async_session
+from app.executor import run_cpu_bound
 from app.models import GenomicSequence
+from app.services.archive import upstream_client
+from app.services.bulk import bulk_upsert
+from app.services.http_cache import CachedResponse, open_body, response_cache
+from app.services.shadow import unique_constraint_name
 
 logger = logging.getLogger(__name__)
 
-NEXTSTRAIN_URL = "https://nextstrain.org/charon/getDataset?prefix=/flu/seasonal/h3n2/ha/12y"
+NEXTSTRAIN_URL = "https://nextstrain.org/charon/getDataset?prefix=/{dataset}"
 
 # Mapping of Nextstrain country names to ISO 2-letter country codes
 # Nextstrain uses various formats: full names (United States), abbreviations (USA), or ISO codes
@@ -201,67 +213,223 @@ def normalize_country_code(country: str) -> str | None:
     return None
 
 
-async def fetch_nextstrain():
-    """Fetch genomic data from Nextstrain."""
-    async with httpx.AsyncClient(timeout=120) as client:
-        resp = await client.get(NEXTSTRAIN_URL, headers={"Accept": "application/json"})
-        resp.raise_for_status()
-        data = resp.json()
+# node_attrs entries a genomic record is built from; every other attribute is skipped while parsing
+NODE_ATTRS = ("country", "clade_membership", "subclade", "num_date")
 
-    tree = data.get("tree", {})
+# Parser frame tags (see iter_tree_attrs)
+_OTHER, _ROOT, _NODE, _ATTRS, _ATTR, _CHILDREN = range(6)
 
-    records = []
-    _walk_tree(tree, records)
-    logger.info(f"Parsed {len(records)} genomic sequences from Nextstrain")
+
+def dataset_url(dataset: str) -> str:
+    return NEXTSTRAIN_URL.format(dataset=dataset.strip("/"))
+
+
+def dataset_lineage(dataset: str) -> str:
+    """Lineage stored for a dataset path: the segment after ``seasonal``, e.g. ``h3n2`` for ``flu/seasonal/h3n2/ha/12y``."""
+    parts = dataset.strip("/").split("/")
+    if "seasonal" in parts[:-1]:
+        return parts[parts.index("seasonal") + 1]
+    return parts[0]
+
+
+async def download_datasets(datasets: list[str], concurrency: int | None = None) -> list[CachedResponse]:
+    """Download (or revalidate) each dataset into the response cache, up to ``concurrency`` at once.
+
+    Bodies are streamed to disk in fixed-size chunks, so the raw auspice JSON is
+    never held in memory. Wall-clock time tracks the slowest batch of datasets
+    rather than their sum.
+    """
+    concurrency = max(1, concurrency or settings.NEXTSTRAIN_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(client: httpx.AsyncClient, dataset: str) -> CachedResponse:
+        async with semaphore:
+            return await response_cache.fetch(client, dataset_url(dataset), headers={"Accept": "application/json"})
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with upstream_client(timeout=120, limits=limits) as client:
+        return await asyncio.gather(*(bounded(client, dataset) for dataset in datasets))
+
+
+async def parse_dataset(dataset: str, response: CachedResponse) -> list[dict]:
+    """Parse one downloaded dataset off the event loop into per-key counts tagged with its lineage."""
+    started = time.perf_counter()
+    records, tips = await run_cpu_bound(
+        parse_nextstrain_file, str(response.path), dataset_lineage(dataset), label="nextstrain.parse"
+    )
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Parsed %s genomic count rows from %s tips of %s in %.2fs (%.0f tips/sec)",
+        len(records),
+        tips,
+        dataset,
+        elapsed,
+        tips / elapsed if elapsed else 0,
+    )
     return records
 
 
-def _walk_tree(node: dict, records: list):
-    """Recursively walk Nextstrain tree to extract sequences."""
-    attrs = node.get("node_attrs", {})
-    country_val = attrs.get("country", {}).get("value", "")
-    clade = attrs.get("clade_membership", {}).get("value", "") or attrs.get("subclade", {}).get("value", "")
-    num_date = attrs.get("num_date", {}).get("value")
+async def parse_datasets(datasets: list[str], responses: list[CachedResponse]) -> list[dict]:
+    """Parse downloaded datasets and merge them into one set of genomic count rows.
+
+    Datasets of the same lineage (other segments or resolutions) sample the
+    same viruses, so they are merged by taking the larger count per key
+    instead of adding them.
+    """
+    results = await asyncio.gather(*(parse_dataset(d, r) for d, r in zip(datasets, responses)))
+    counts: dict[tuple, int] = {}
+    for records in results:
+        for record in records:
+            key = _sequence_key(record)
+            counts[key] = max(counts.get(key, 0), record["count"])
+    return _count_records(counts)
+
+
+def parse_nextstrain_file(path: str, lineage: str = "") -> tuple[list[dict], int]:
+    """Parse an auspice JSON file (optionally gzipped) into per-key genomic counts; returns ``(records, tips_seen)``.
+
+    Only tips (sampled sequences) are counted: internal nodes carry inferred
+    ancestral attributes and would inflate the counts.
+    """
+    counts: dict[tuple, int] = defaultdict(int)
+    tips = 0
+    with open_body(path) as fp:
+        for values in iter_tree_attrs(fp):
+            tips += 1
+            record = _node_record(values, lineage)
+            if record is not None:
+                counts[_sequence_key(record)] += record["count"]
+    return _count_records(counts), tips
+
+
+def _sequence_key(record: dict) -> tuple:
+    return record["country_code"], record["clade"], record["lineage"], record["collection_date"]
+
+
+def _count_records(counts: dict[tuple, int]) -> list[dict]:
+    return [
+        {"country_code": cc, "clade": clade, "lineage": lineage, "collection_date": day, "count": count}
+        for (cc, clade, lineage, day), count in counts.items()
+    ]
+
+
+def iter_tree_attrs(fp) -> Iterator[dict]:
+    """Yield the wanted ``node_attrs`` values of every tip (node without children), in order, from an auspice JSON stream.
 
-    if country_val and clade and num_date:
-        try:
-            code = normalize_country_code(country_val)
-            if code is None:
-                pass  # skip unrecognized countries
+    Works on raw ijson events with an explicit stack of container frames, so
+    tree depth is bounded by memory rather than the recursion limit. A node's
+    :data:`NODE_ATTRS` values are held until the node ends and dropped as soon
+    as its first child starts, so only the current tip's values are kept.
+    """
+    # Frames are [tag, current map key, payload]: the node's attribute values
+    # for _NODE (None once it turned out to have children), the attribute name
+    # for _ATTR.
+    stack: list[list] = []
+    for event, value in ijson.basic_parse(fp, use_float=True):
+        if event == "map_key":
+            stack[-1][1] = value
+        elif event == "start_map":
+            if not stack:
+                stack.append([_ROOT, None, None])
+                continue
+            tag, key, _ = stack[-1]
+            if tag == _CHILDREN:
+                stack[-2][2] = None  # the parent is an internal node
+                stack.append([_NODE, None, {}])
+            elif tag == _ROOT and key == "tree":
+                stack.append([_NODE, None, {}])
+            elif tag == _NODE and key == "node_attrs":
+                stack.append([_ATTRS, None, None])
+            elif tag == _ATTRS and key in NODE_ATTRS:
+                stack.append([_ATTR, None, key])
             else:
-                year = int(num_date)
-                frac = num_date - year
-                date_val = datetime(year, 1, 1) + __import__("datetime").timedelta(days=frac * 365.25)
-                records.append(
-                    {
-                        "country_code": code,
-                        "clade": clade,
-                        "lineage": "",
-                        "collection_date": date_val.date(),
-                        "count": 1,
-                    }
-                )
-        except (ValueError, TypeError):
-            pass
-
-    for child in node.get("children", []):
-        _walk_tree(child, records)
-
-
-async def ingest_nextstrain():
+                stack.append([_OTHER, None, None])
+        elif event == "start_array":
+            tag, key, _ = stack[-1]
+            stack.append([_CHILDREN if tag == _NODE and key == "children" else _OTHER, None, None])
+        elif event == "end_map" or event == "end_array":
+            tag, _, payload = stack.pop()
+            if tag == _NODE and payload is not None:
+                yield payload
+        elif stack and stack[-1][0] == _ATTR and stack[-1][1] == "value":
+            attrs = stack[-3][2]
+            if attrs is not None:
+                attrs[stack[-1][2]] = value
+
+
+def _node_record(values: dict, lineage: str = "") -> dict | None:
+    """Genomic record for one tree node's attribute values, or None if incomplete or unrecognized."""
+    country_val = values.get("country")
+    clade = values.get("clade_membership") or values.get("subclade")
+    num_date = values.get("num_date")
+    if not (country_val and clade and num_date):
+        return None
+    try:
+        code = normalize_country_code(country_val)
+        if code is None:
+            return None  # skip unrecognized countries
+        year = int(num_date)
+        date_val = datetime(year, 1, 1) + timedelta(days=(num_date - year) * 365.25)
+    except (ValueError, TypeError):
+        return None
+    return {
+        "country_code": code,
+        "clade": clade,
+        "lineage": lineage,
+        "collection_date": date_val.date(),
+        "count": 1,
+    }
+
+
+async def ingest_nextstrain(force: bool = False):
     """Fetch and upsert Nextstrain data."""
     try:
-        records = await fetch_nextstrain()
-        if not records:
-            return
-
-        async with async_session() as session:
-            for i in range(0, len(records), 1000):
-                batch = records[i : i + 1000]
-                stmt = pg_insert(GenomicSequence).values(batch)
-                stmt = stmt.on_conflict_do_nothing(constraint="uq_genomic_seq")
-                await session.execute(stmt)
-            await session.commit()
-            logger.info(f"Ingested {len(records)} genomic sequences")
+        await load_nextstrain(force=force)
     except Exception:
         logger.exception("Nextstrain ingestion failed")
+
+
+async def load_nextstrain(
+    table: Table = GenomicSequence.__table__, force: bool = False
+) -> tuple[int, list[CachedResponse]]:
+    """Fetch every configured Nextstrain dataset and upsert it into ``table`` in one transaction; raises on failure.
+
+    Returns the rows loaded and the responses still to be marked processed:
+    none for the live table, which marks them once committed; for a rebuild
+    shadow, all of them, to be marked once the shadow has been swapped in.
+    Loads nothing (0 rows) when no dataset changed since it was last loaded,
+    unless ``force``.
+    """
+    datasets = settings.NEXTSTRAIN_DATASETS
+    responses = await download_datasets(datasets)
+    if not force and all(r.unchanged for r in responses):
+        logger.info(f"Nextstrain datasets unchanged since last load; skipping load into {table.name}")
+        return 0, []
+    records = await parse_datasets(datasets, responses)
+    if not records:
+        return 0, []
+
+    # Each run re-reads the whole datasets, so the summed counts replace stored
+    # ones, and lineages no longer configured (including rows from before
+    # lineages were recorded, stored as "") are dropped.
+    lineages = sorted({dataset_lineage(d) for d in datasets})
+    async with async_session() as session:
+        await session.execute(delete(table).where(table.c.lineage.not_in(lineages)))
+        result = await bulk_upsert(session, table, records, unique_constraint_name(table), ["count"])
+        await session.commit()
+        live = table is GenomicSequence.__table__
+        if live:
+            bump_data_version("Nextstrain load")
+        logger.info(
+            "Upserted %s genomic count rows (%s sequences) into %s: %s new, %s updated, %s unchanged",
+            len(records),
+            sum(r["count"] for r in records),
+            table.name,
+            result.inserted,
+            result.updated,
+            result.unchanged,
+        )
+    if not live:
+        return len(records), responses
+    response_cache.mark_processed(responses)
+    return len(records), []
@@ -0,0 +1,167 @@
+"""ISO-year range partitions of ``flu_cases`` (PostgreSQL only).
+
+On PostgreSQL ``flu_cases`` is declared ``PARTITION BY RANGE (time)`` with one
+partition per ISO year, ``flu_cases_y<year>``, running from the Monday of ISO
+week 1 up to the Monday of the next year's week 1. ``time`` is always the
+Monday of a row's ISO week, so a partition holds exactly the rows of its
+``iso_year``. Reads are bounded by a recent ``time`` cutoff, and the weekly
+rollup refresh by the weeks it touched, so the planner prunes them to the one
+or two newest partitions.
+
+Partitions are created on demand: writers call :func:`ensure_partitions` for
+the years they are about to insert, and a monthly job creates the next year's
+partition ahead of time. A single year can be reloaded and exchanged without
+touching the others (see :func:`app.services.shadow.swap_partition`).
+
+A partitioned table's primary key must include the partition column, so the
+PostgreSQL table is keyed on ``(id, time)``; :func:`partitioned_table` builds
+that DDL from the model. Tables without a ``partition_by`` entry in their
+``info``, and every table on other dialects (SQLite in tests), stay plain, and
+the functions here leave them alone. So does a PostgreSQL ``flu_cases``
+created before partitioning, until ``migrations/partition_flu_cases.sql`` has
+converted it.
+"""
+
+import logging
+from collections.abc import Iterable
+from datetime import date
+
+from sqlalchemy import Column, Index, MetaData, Table, UniqueConstraint, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+
+def partition_column(table: Table) -> str | None:
+    """Name of the column ``table`` is range-partitioned on, if it is partitioned."""
+    return table.info.get("partition_by")
+
+
+def iso_year_bounds(year: int) -> tuple[date, date]:
+    """``[start, end)`` of ISO ``year``: the Mondays of its week 1 and of the next year's week 1."""
+    return date.fromisocalendar(year, 1, 1), date.fromisocalendar(year + 1, 1, 1)
+
+
+def iso_years(days: Iterable[date]) -> set[int]:
+    return {day.isocalendar()[0] for day in days}
+
+
+def partition_name(table_name: str, year: int) -> str:
+    return f"{table_name}_y{year}"
+
+
+def partition_bounds(year: int) -> str:
+    start, end = iso_year_bounds(year)
+    return f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+
+def partition_columns(table: Table) -> list[Column]:
+    """Copies of ``table``'s columns with the partition column added to the primary key."""
+    key = partition_column(table)
+    columns = []
+    for column in table.columns:
+        copy = column._copy()
+        copy.index = None
+        if column.name == key:
+            copy.primary_key = True
+        columns.append(copy)
+    return columns
+
+
+def partitioned_table(table: Table) -> Table:
+    """PostgreSQL DDL for ``table`` as a range-partitioned parent, with its constraints and indexes."""
+    key = partition_column(table)
+    parent = Table(
+        table.name,
+        MetaData(),
+        *partition_columns(table),
+        *(
+            UniqueConstraint(*c.columns.keys(), name=c.name, **c.dialect_kwargs)
+            for c in table.constraints
+            if isinstance(c, UniqueConstraint) and c.name
+        ),
+        info=dict(table.info),
+        postgresql_partition_by=f"RANGE ({key})",
+    )
+    for index in table.indexes:
+        # Indexes on the parent are created on every partition, present and future
+        Index(index.name, *(parent.c[c.name] for c in index.columns), unique=index.unique, **index.dialect_kwargs)
+    return parent
+
+
+def _partitioned_by_model(conn: AsyncConnection, table: Table) -> bool:
+    return conn.dialect.name == "postgresql" and partition_column(table) is not None
+
+
+async def is_partitioned(conn: AsyncConnection, table: Table) -> bool:
+    """Whether ``table`` should be partitioned and its relation in the database actually is.
+
+    Logs a warning when it exists as a plain table, i.e. the partitioning
+    migration has not been run yet.
+    """
+    if not _partitioned_by_model(conn, table):
+        return False
+    exists, partitioned = (
+        await conn.execute(
+            text(
+                "SELECT to_regclass(:t) IS NOT NULL, "
+                "EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"
+            ),
+            {"t": table.name},
+        )
+    ).one()
+    if exists and not partitioned:
+        logger.warning(
+            "%s is not partitioned; skipping partition management until migrations/partition_flu_cases.sql is run",
+            table.name,
+        )
+    return partitioned
+
+
+async def create_partitioned_table(conn: AsyncConnection, table: Table):
+    """Create ``table`` as a partitioned parent if it does not exist yet; run before ``create_all``."""
+    if _partitioned_by_model(conn, table):
+        parent = partitioned_table(table)
+        await conn.run_sync(lambda sync_conn: parent.create(sync_conn, checkfirst=True))
+
+
+async def partition_names(conn: AsyncConnection, table_name: str) -> list[str]:
+    """Names of the partitions currently attached to ``table_name``."""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass) ORDER BY c.relname"
+        ),
+        {"parent": table_name},
+    )
+    return list(result.scalars())
+
+
+async def partition_years(conn: AsyncConnection, table_name: str) -> set[int]:
+    prefix = partition_name(table_name, 0)[:-1]
+    return {
+        int(name.removeprefix(prefix))
+        for name in await partition_names(conn, table_name)
+        if name.startswith(prefix) and name.removeprefix(prefix).isdigit()
+    }
+
+
+async def ensure_partitions(conn: AsyncConnection, table: Table, years: Iterable[int]) -> list[int]:
+    """Create any missing partitions of ``table`` for ISO ``years``; returns the years created.
+
+    Creating a partition briefly locks the whole table, so call this in its own
+    short transaction rather than inside a long load.
+    """
+    if not await is_partitioned(conn, table):
+        return []
+    missing = sorted(set(years) - await partition_years(conn, table.name))
+    for year in missing:
+        await conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(table.name, year)} "
+                f"PARTITION OF {table.name} {partition_bounds(year)}"
+            )
+        )
+    if missing:
+        logger.info("Created partitions of %s for ISO years %s", table.name, missing)
+    return missing
@@ -0,0 +1,53 @@
+"""Weekly case totals maintained alongside ``flu_cases``.
+
+The cases API, anomaly detection and forecasts sum ``flu_cases_weekly``
+(one row per week, country and flu type) instead of raw ``flu_cases`` rows, so
+their cost scales with weeks × countries rather than with the raw row count.
+
+Writers call :func:`refresh_weekly_rollup` with the weeks they touched on the
+same session or connection as the write, so both tables commit together.
+"""
+
+from collections.abc import Iterable
+from datetime import date
+
+from sqlalchemy import Select, Table, delete, func, insert, select
+
+from app.models import CodedEnum, FluCase, FluCaseWeekly, FluTypeCode
+
+
+def weekly_totals(cases: Table = FluCase.__table__) -> Select:
+    """``SUM(new_cases) GROUP BY time, country_code, flu_type`` over ``cases``, as flu_cases_weekly rows."""
+    flu_type = cases.c.flu_type
+    source = cases
+    if isinstance(flu_type.type, CodedEnum):
+        # Compact layout: translate the codes back to the names flu_cases_weekly stores
+        codes = FluTypeCode.__table__
+        source = cases.join(codes, codes.c.code == cases.c.flu_type)
+        flu_type = codes.c.name
+    return (
+        select(cases.c.time, cases.c.country_code, flu_type, func.sum(cases.c.new_cases))
+        .select_from(source)
+        .group_by(cases.c.time, cases.c.country_code, flu_type)
+    )
+
+
+async def refresh_weekly_rollup(conn, weeks: Iterable[date] | None = None):
+    """Recompute the weekly totals for ``weeks`` (every week when None) from ``flu_cases``."""
+    cases = FluCase.__table__
+    weekly = FluCaseWeekly.__table__
+    clear = delete(weekly)
+    totals = weekly_totals(cases)
+    if weeks is not None:
+        weeks = sorted(set(weeks))
+        if not weeks:
+            return
+        clear = clear.where(weekly.c.time.in_(weeks))
+        totals = totals.where(cases.c.time.in_(weeks))
+
+    await conn.execute(clear)
+    await conn.execute(
+        insert(weekly).from_select(
+            [weekly.c.time, weekly.c.country_code, weekly.c.flu_type, weekly.c.new_cases], totals
+        )
+    )
@@ -0,0 +1,268 @@
+"""Shadow tables for zero-downtime full rebuilds.
+
+A rebuild loads into ``<table>_shadow`` while readers keep using the live
+table. The shadow starts with only its columns, primary key and unique
+constraint (needed for ``ON CONFLICT`` during the load). Secondary indexes are
+built after the load, and the tables are then swapped with renames inside a
+single transaction, so readers see either the old dataset or the complete new
+one and never a half-built table. The old table is dropped outright, which
+avoids the bloat of a mass ``DELETE``.
+
+On PostgreSQL a partitioned table (see :mod:`app.services.partitions`) gets a
+partitioned shadow whose partitions are renamed along with it. A single
+partition can also be rebuilt on its own: it is loaded into a standalone
+``<partition>_shadow`` table carrying the partition's bounds as a ``CHECK``
+constraint, and exchanged for the live partition with ``DETACH``/``ATTACH``.
+"""
+
+import logging
+
+from sqlalchemy import Index, MetaData, Table, UniqueConstraint, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import AddConstraint
+
+from app.services.partitions import (
+    is_partitioned,
+    iso_year_bounds,
+    partition_bounds,
+    partition_column,
+    partition_columns,
+    partition_name,
+    partition_names,
+    partition_years,
+)
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SUFFIX = "_shadow"
+OLD_SUFFIX = "_old"
+
+# Upper bound on waiting for in-flight readers before the rename gives up,
+# so a long query cannot make the swap queue every later reader behind it.
+SWAP_LOCK_TIMEOUT = "10s"
+
+
+def _shadow_name(name: str) -> str:
+    return f"{name}{SHADOW_SUFFIX}"
+
+
+def unique_constraint_name(table: Table) -> str:
+    """Name of the table's (single) named unique constraint, used as the ON CONFLICT target."""
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.name:
+            return constraint.name
+    raise ValueError(f"{table.name} has no named unique constraint")
+
+
+def build_shadow_table(table: Table, partitioned: bool = False) -> Table:
+    """Copy of ``table`` named ``<name>_shadow`` with its unique constraint but no secondary indexes.
+
+    With ``partitioned`` the copy is a range-partitioned parent like the live
+    PostgreSQL table.
+    """
+    if partitioned:
+        columns = partition_columns(table)
+        options = {"info": dict(table.info), "postgresql_partition_by": f"RANGE ({partition_column(table)})"}
+    else:
+        columns = []
+        for column in table.columns:
+            copy = column._copy()
+            copy.index = None
+            columns.append(copy)
+        options = {}
+
+    constraints = [
+        UniqueConstraint(*c.columns.keys(), name=_shadow_name(c.name), **c.dialect_kwargs)
+        for c in table.constraints
+        if isinstance(c, UniqueConstraint) and c.name
+    ]
+    return Table(_shadow_name(table.name), MetaData(), *columns, *constraints, **options)
+
+
+def _shadow_indexes(table: Table, shadow: Table) -> list[Index]:
+    return [
+        Index(
+            _shadow_name(index.name),
+            *(shadow.c[c.name] for c in index.columns),
+            unique=index.unique,
+            **index.dialect_kwargs,
+        )
+        for index in table.indexes
+    ]
+
+
+async def create_shadow_table(conn: AsyncConnection, table: Table) -> Table:
+    """(Re)create an empty shadow for ``table``, discarding leftovers from an aborted rebuild.
+
+    The shadow is partitioned only if the live table is, so a swap never
+    changes the table's layout behind the partitioning migration's back.
+    """
+    shadow = build_shadow_table(table, await is_partitioned(conn, table))
+    await conn.run_sync(lambda sync_conn: shadow.drop(sync_conn, checkfirst=True))
+    await conn.run_sync(lambda sync_conn: shadow.create(sync_conn))
+    logger.info("Created shadow table %s", shadow.name)
+    return shadow
+
+
+async def drop_shadow_table(conn: AsyncConnection, table: Table):
+    await conn.execute(text(f"DROP TABLE IF EXISTS {_shadow_name(table.name)}"))
+
+
+async def build_shadow_indexes(conn: AsyncConnection, table: Table, shadow: Table):
+    """Create the live table's secondary indexes on the loaded shadow, then refresh planner stats."""
+    for index in _shadow_indexes(table, shadow):
+        await conn.run_sync(lambda sync_conn, index=index: index.create(sync_conn))
+    await conn.execute(text(f"ANALYZE {shadow.name}"))
+
+
+def swap_statements(table: Table) -> list[str]:
+    """SQL that replaces ``table`` with its loaded shadow and restores canonical object names."""
+    name = table.name
+    shadow = _shadow_name(name)
+    statements = [
+        f"ALTER TABLE {name} RENAME TO {name}{OLD_SUFFIX}",
+        f"ALTER TABLE {shadow} RENAME TO {name}",
+        f"DROP TABLE {name}{OLD_SUFFIX}",
+        f"ALTER TABLE {name} RENAME CONSTRAINT {shadow}_pkey TO {name}_pkey",
+    ]
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.name:
+            statements.append(
+                f"ALTER TABLE {name} RENAME CONSTRAINT {_shadow_name(constraint.name)} TO {constraint.name}"
+            )
+    for index in table.indexes:
+        statements.append(f"ALTER INDEX {_shadow_name(index.name)} RENAME TO {index.name}")
+    for column in table.primary_key.columns:
+        if column.autoincrement is not False:
+            statements.append(f"ALTER SEQUENCE {shadow}_{column.name}_seq RENAME TO {name}_{column.name}_seq")
+    return statements
+
+
+async def swap_shadow_tables(conn: AsyncConnection, tables: list[Table]):
+    """Atomically swap every table in ``tables`` with its shadow.
+
+    Must run inside a single transaction (``engine.begin()``) so that all the
+    renames become visible together.
+    """
+    await conn.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+    for table in tables:
+        for statement in swap_statements(table):
+            await conn.execute(text(statement))
+        if conn.dialect.name == "postgresql" and partition_column(table) is not None:
+            # The old partitions were dropped along with the old table, freeing their names
+            prefix = f"{_shadow_name(table.name)}_y"
+            for name in await partition_names(conn, table.name):
+                if name.startswith(prefix):
+                    year = int(name.removeprefix(prefix))
+                    await conn.execute(text(f"ALTER TABLE {name} RENAME TO {partition_name(table.name, year)}"))
+    logger.info("Swapped in shadow tables: %s", ", ".join(t.name for t in tables))
+
+
+def _year_name(name: str, year: int) -> str:
+    return f"{name}_y{year}"
+
+
+def build_partition_shadow(table: Table, year: int) -> Table:
+    """Standalone ``<partition>_shadow`` table for reloading ISO ``year`` of ``table``, with its unique constraint."""
+    return Table(
+        _shadow_name(partition_name(table.name, year)),
+        MetaData(),
+        *partition_columns(table),
+        *(
+            UniqueConstraint(*c.columns.keys(), name=_shadow_name(_year_name(c.name, year)), **c.dialect_kwargs)
+            for c in table.constraints
+            if isinstance(c, UniqueConstraint) and c.name
+        ),
+    )
+
+
+async def create_partition_shadow(conn: AsyncConnection, table: Table, year: int) -> Table:
+    """(Re)create an empty partition shadow for ISO ``year`` of ``table``.
+
+    It is created ``LIKE`` the live table, so rows draw their ids from the live
+    sequence, and is constrained to the year's bounds.
+    """
+    shadow = build_partition_shadow(table, year)
+    key = partition_column(table)
+    start, end = iso_year_bounds(year)
+    await conn.execute(text(f"DROP TABLE IF EXISTS {shadow.name}"))
+    await conn.execute(text(f"CREATE TABLE {shadow.name} (LIKE {table.name} INCLUDING DEFAULTS)"))
+    # Lets ATTACH PARTITION trust the bounds instead of scanning the table
+    await conn.execute(
+        text(
+            f"ALTER TABLE {shadow.name} ADD CONSTRAINT {partition_name(table.name, year)}_bounds "
+            f"CHECK ({key} >= '{start.isoformat()}' AND {key} < '{end.isoformat()}')"
+        )
+    )
+    for constraint in shadow.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            await conn.execute(AddConstraint(constraint))
+    logger.info("Created partition shadow %s", shadow.name)
+    return shadow
+
+
+async def drop_partition_shadow(conn: AsyncConnection, table: Table, year: int):
+    await conn.execute(text(f"DROP TABLE IF EXISTS {_shadow_name(partition_name(table.name, year))}"))
+
+
+def _partition_shadow_indexes(table: Table, shadow: Table, year: int) -> list[Index]:
+    return [
+        Index(
+            _shadow_name(_year_name(index.name, year)),
+            *(shadow.c[c.name] for c in index.columns),
+            unique=index.unique,
+            **index.dialect_kwargs,
+        )
+        for index in table.indexes
+    ]
+
+
+async def build_partition_shadow_indexes(conn: AsyncConnection, table: Table, shadow: Table, year: int):
+    """Add the primary key and indexes the parent requires, so ATTACH adopts them instead of building them under lock."""
+    key = ", ".join(c.name for c in shadow.primary_key.columns)
+    await conn.execute(text(f"ALTER TABLE {shadow.name} ADD CONSTRAINT {shadow.name}_pkey PRIMARY KEY ({key})"))
+    for index in _partition_shadow_indexes(table, shadow, year):
+        await conn.run_sync(lambda sync_conn, index=index: index.create(sync_conn))
+    await conn.execute(text(f"ANALYZE {shadow.name}"))
+
+
+def partition_swap_statements(table: Table, year: int, replace: bool = True) -> list[str]:
+    """SQL that exchanges ISO ``year``'s partition of ``table`` for its loaded shadow.
+
+    Without ``replace`` the year has no partition yet and the shadow is just attached.
+    """
+    name = table.name
+    partition = partition_name(name, year)
+    shadow = _shadow_name(partition)
+    statements = []
+    if replace:
+        statements += [f"ALTER TABLE {name} DETACH PARTITION {partition}", f"DROP TABLE {partition}"]
+    statements += [
+        f"ALTER TABLE {shadow} RENAME TO {partition}",
+        f"ALTER TABLE {partition} RENAME CONSTRAINT {shadow}_pkey TO {partition}_pkey",
+    ]
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.name:
+            final = _year_name(constraint.name, year)
+            statements.append(f"ALTER TABLE {partition} RENAME CONSTRAINT {_shadow_name(final)} TO {final}")
+    for index in table.indexes:
+        final = _year_name(index.name, year)
+        statements.append(f"ALTER INDEX {_shadow_name(final)} RENAME TO {final}")
+    statements += [
+        f"ALTER TABLE {name} ATTACH PARTITION {partition} {partition_bounds(year)}",
+        # Implied by the partition bounds once attached
+        f"ALTER TABLE {partition} DROP CONSTRAINT {partition}_bounds",
+    ]
+    return statements
+
+
+async def swap_partition(conn: AsyncConnection, table: Table, year: int):
+    """Atomically replace ISO ``year``'s partition of ``table`` with its loaded shadow.
+
+    Must run inside a single transaction (``engine.begin()``), like :func:`swap_shadow_tables`.
+    """
+    await conn.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+    replace = year in await partition_years(conn, table.name)
+    for statement in partition_swap_statements(table, year, replace):
+        await conn.execute(text(statement))
+    logger.info("Swapped in partition %s", partition_name(table.name, year))
@@ -0,0 +1,144 @@
+"""In-memory columnar snapshot of weekly case totals for the dashboard endpoints.
+
+The whole ``flu_cases_weekly`` rollup (years × countries × flu types) fits in a
+few megabytes, so with ``settings.CASE_SNAPSHOT_ENABLED`` it is loaded into
+NumPy column arrays — week, country and flu type as small integer codes into
+lookup tables, counts as int32 — and the ``/api/cases/*`` endpoints and the
+forecast input are answered with vectorized group-bys instead of SQL round
+trips.
+
+:func:`refresh_snapshot` builds a new snapshot and swaps it in with a single
+reference assignment, so readers see either the old or the new data, never a
+mix, then bumps the data version so responses cached from the old data are
+dropped. It runs after every ingest that changes flu_cases. While the snapshot
+is disabled, not built yet or its last rebuild failed, :func:`get_snapshot`
+returns None and callers fall back to SQL.
+"""
+
+import logging
+from datetime import date
+
+import numpy as np
+from sqlalchemy import String, cast, select
+
+from app.cache import bump_data_version
+from app.config import settings
+from app.database import async_session
+from app.executor import run_cpu_bound
+from app.models import FluCaseWeekly
+
+logger = logging.getLogger(__name__)
+
+
+class CaseSnapshot:
+    def __init__(self, times: list[date], countries: list[str], flu_types: list[str], cases: list[int]):
+        ordinals, self.week = np.unique(np.array([t.toordinal() for t in times], dtype=np.int32), return_inverse=True)
+        self.week = self.week.astype(np.int32)
+        self.weeks = [date.fromordinal(int(o)) for o in ordinals]
+        self._ordinals = ordinals
+        self.countries, country = np.unique(np.array(countries, dtype=object), return_inverse=True)
+        self.country = country.astype(np.int16)
+        self.flu_types, flu_type = np.unique(np.array(flu_types, dtype=object), return_inverse=True)
+        self.flu_type = flu_type.astype(np.int8)
+        self.cases = np.array(cases, dtype=np.int32)
+        self._country_index = {cc: i for i, cc in enumerate(self.countries)}
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    @property
+    def max_date(self) -> date | None:
+        return self.weeks[-1] if self.weeks else None
+
+    def _mask(self, since: date | None = None, until: date | None = None, country: str | None = None) -> np.ndarray:
+        """Rows with ``since <= week < until`` (either bound optional), optionally for one country."""
+        mask = np.ones(len(self.cases), dtype=bool)
+        if since is not None:
+            mask &= self.week >= np.searchsorted(self._ordinals, since.toordinal())
+        if until is not None:
+            mask &= self.week < np.searchsorted(self._ordinals, until.toordinal())
+        if country is not None:
+            mask &= self.country == self._country_index.get(country, -1)
+        return mask
+
+    def _sum_by(self, codes: np.ndarray, size: int, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Per-code sums of ``cases`` over masked rows, and which codes had any rows."""
+        sums = np.bincount(codes[mask], weights=self.cases[mask], minlength=size).astype(np.int64)
+        present = np.bincount(codes[mask], minlength=size) > 0
+        return sums, present
+
+    def total(self, since: date | None = None, until: date | None = None) -> int:
+        return int(self.cases[self._mask(since, until)].sum(dtype=np.int64))
+
+    def countries_reporting(self) -> int:
+        return len(self.countries)
+
+    def weekly_totals(self, country: str | None = None, since: date | None = None) -> list[tuple[date, int]]:
+        """``SUM(new_cases) GROUP BY time ORDER BY time``."""
+        sums, present = self._sum_by(self.week, len(self.weeks), self._mask(since, country=country))
+        return [(self.weeks[i], int(sums[i])) for i in np.flatnonzero(present)]
+
+    def country_totals(self, since: date | None = None, until: date | None = None) -> dict[str, int]:
+        """``SUM(new_cases) GROUP BY country_code``."""
+        sums, present = self._sum_by(self.country, len(self.countries), self._mask(since, until))
+        return {self.countries[i]: int(sums[i]) for i in np.flatnonzero(present)}
+
+    def weekly_type_totals(self, since: date | None = None) -> list[tuple[date, str, int]]:
+        """``SUM(new_cases) GROUP BY time, flu_type ORDER BY time``."""
+        n_types = len(self.flu_types)
+        keys = self.week.astype(np.int64) * n_types + self.flu_type
+        sums, present = self._sum_by(keys, len(self.weeks) * n_types, self._mask(since))
+        return [(self.weeks[k // n_types], self.flu_types[k % n_types], int(sums[k])) for k in np.flatnonzero(present)]
+
+    def dominant_types(self, since: date | None = None) -> dict[str, str]:
+        """Flu type with the largest total per country."""
+        if not len(self.cases):
+            return {}
+        n_types = len(self.flu_types)
+        keys = self.country.astype(np.int64) * n_types + self.flu_type
+        sums, present = self._sum_by(keys, len(self.countries) * n_types, self._mask(since))
+        sums = np.where(present, sums, -1).reshape(len(self.countries), n_types)
+        best = sums.argmax(axis=1)
+        return {self.countries[c]: self.flu_types[best[c]] for c in range(len(self.countries)) if sums[c, best[c]] >= 0}
+
+    def country_weekly_series(self, since: date | None = None) -> dict[str, list[int]]:
+        """Weekly totals per country, in week order, for weeks the country reported."""
+        n_weeks = len(self.weeks)
+        keys = self.country.astype(np.int64) * n_weeks + self.week
+        sums, present = self._sum_by(keys, len(self.countries) * n_weeks, self._mask(since))
+        series: dict[str, list[int]] = {}
+        for k in np.flatnonzero(present):
+            series.setdefault(self.countries[k // n_weeks], []).append(int(sums[k]))
+        return series
+
+
+_snapshot: CaseSnapshot | None = None
+
+
+def get_snapshot() -> CaseSnapshot | None:
+    """The current snapshot, or None when callers should query SQL instead."""
+    return _snapshot if settings.CASE_SNAPSHOT_ENABLED else None
+
+
+async def refresh_snapshot():
+    """Rebuild the snapshot from flu_cases_weekly and swap it in; a no-op while disabled."""
+    global _snapshot
+    if not settings.CASE_SNAPSHOT_ENABLED:
+        return
+    try:
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    FluCaseWeekly.time,
+                    FluCaseWeekly.country_code,
+                    cast(FluCaseWeekly.flu_type, String),
+                    FluCaseWeekly.new_cases,
+                )
+            )
+            columns = [list(c) for c in zip(*result.all())] or [[], [], [], []]
+        _snapshot = await run_cpu_bound(CaseSnapshot, *columns, label="snapshot.build")
+        bump_data_version("case snapshot")
+        logger.info(f"Case snapshot rebuilt: {len(_snapshot)} rows, {len(_snapshot.weeks)} weeks")
+    except Exception:
+        _snapshot = None
+        logger.exception("Case snapshot rebuild failed; serving from SQL")
@@ -0,0 +1,126 @@
+"""Compare the streaming Nextstrain tree parser with decoding the whole auspice JSON.
+
+Parses either a downloaded dataset (``--file``, e.g. the 12y H3N2 HA tree from
+``NEXTSTRAIN_URL``) or a synthetic auspice tree of the same shape, with:
+
+* ``decoded`` — ``json.load`` the whole document, then walk it (the original path)
+* ``streaming`` — :func:`app.services.nextstrain.parse_nextstrain_file`
+
+and reports tips/sec and peak traced memory for each.
+
+Usage (from backend/):
+
+    curl -H 'Accept: application/json' -o /tmp/h3n2_12y.json \\
+        'https://nextstrain.org/charon/getDataset?prefix=/flu/seasonal/h3n2/ha/12y'
+    DATABASE_URL=sqlite+aiosqlite:// python -m benchmarks.bench_nextstrain_parse --file /tmp/h3n2_12y.json
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from app.services.nextstrain import NODE_ATTRS, _count_records, _node_record, _sequence_key, parse_nextstrain_file
+
+COUNTRIES = ["USA", "Japan", "Kenya", "Brazil", "France", "Australia", "India", "China", "Peru", "Spain"]
+
+
+def synthetic_auspice(leaves: int, seed: int = 3) -> dict:
+    """A random binary auspice tree with ``leaves`` tips and auspice-like node payloads."""
+    rng = random.Random(seed)
+
+    def node(i: int, children: list) -> dict:
+        country = rng.choice(COUNTRIES)
+        num_date = 2013 + rng.random() * 12
+        return {
+            "name": f"NODE_{i}" if children else f"A/{country}/{i}/2024",
+            "branch_attrs": {
+                "mutations": {"HA1": [f"K{rng.randint(1, 329)}N" for _ in range(rng.randint(0, 4))]},
+                "labels": {"aa": "HA1: K160T"} if rng.random() < 0.05 else {},
+            },
+            "node_attrs": {
+                "div": rng.random() / 10,
+                "country": {"value": country, "confidence": {country: 0.8, "USA": 0.2}},
+                "region": {"value": "Europe"},
+                "clade_membership": {"value": rng.choice(["2a", "2a.1", "2a.3a.1", "3C.2a1b"])},
+                "num_date": {"value": num_date, "confidence": [num_date - 0.2, num_date + 0.1]},
+                "ep": {"value": rng.random()},
+            },
+            **({"children": children} if children else {}),
+        }
+
+    nodes = [node(i, []) for i in range(leaves)]
+    counter = leaves
+    while len(nodes) > 1:
+        paired = []
+        for i in range(0, len(nodes) - 1, 2):
+            paired.append(node(counter, [nodes[i], nodes[i + 1]]))
+            counter += 1
+        if len(nodes) % 2:
+            paired.append(nodes[-1])
+        nodes = paired
+    return {"version": "v2", "meta": {"title": "synthetic"}, "tree": nodes[0]}
+
+
+def decoded_parse(path: str) -> tuple[list[dict], int]:
+    with open(path, "rb") as fp:
+        data = json.load(fp)
+    counts = defaultdict(int)
+    stack = [data.get("tree", {})]
+    while stack:
+        node = stack.pop()
+        if node.get("children"):
+            stack.extend(reversed(node["children"]))
+            continue
+        attrs = node.get("node_attrs", {})
+        record = _node_record({name: attrs.get(name, {}).get("value") for name in NODE_ATTRS})
+        if record is not None:
+            counts[_sequence_key(record)] += record["count"]
+    return _count_records(counts), None
+
+
+def _measure(fn, path: str) -> tuple[float, int, list[dict]]:
+    started = time.perf_counter()
+    records, _ = fn(path)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, records
+
+
+def main(path: str):
+    size = os.path.getsize(path)
+    _, tips = parse_nextstrain_file(path)
+    print(f"{path}: {size / 2**20:,.1f} MiB, {tips:,} tips")
+
+    results = {}
+    for label, fn in [("decoded", decoded_parse), ("streaming", parse_nextstrain_file)]:
+        elapsed, peak, records = _measure(fn, path)
+        results[label] = records
+        print(
+            f"  {label:>9}: {elapsed:6.2f}s  {tips / elapsed:>10,.0f} tips/sec  "
+            f"peak {peak / 2**20:7.1f} MiB  ({len(records):,} records)"
+        )
+    assert results["decoded"] == results["streaming"], "parsers disagree"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", help="auspice JSON to parse (default: generate a synthetic tree)")
+    parser.add_argument("--leaves", type=int, default=50_000, help="tips in the synthetic tree")
+    args = parser.parse_args()
+
+    if args.file:
+        main(args.file)
+    else:
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as tmp:
+            json.dump(synthetic_auspice(args.leaves), tmp)
+            tmp.flush()
+            main(tmp.name)
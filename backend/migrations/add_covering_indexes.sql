@@ -0,0 +1,38 @@
+-- Migration: Composite and covering indexes for the case and genomics queries
+--
+-- For NEW deployments: these indexes are created automatically via
+-- Base.metadata.create_all() from the Index() entries in app/models.py.
+--
+-- For EXISTING deployments, run this script manually. The case endpoints read
+-- flu_cases_weekly with WHERE time >= cutoff [AND country_code = X] and sum
+-- new_cases grouped by country_code/time/flu_type; the INCLUDE columns let
+-- PostgreSQL answer those from the index alone (index-only scans, once the
+-- visibility map is current, i.e. after VACUUM). The single-column time
+-- indexes on flu_cases_weekly and flu_cases, and the country_code one on
+-- flu_cases_weekly, are superseded and dropped.
+--
+-- NOTE: CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block.
+-- Run this directly via psql or an admin connection, not inside BEGIN/COMMIT.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_flu_cases_weekly_country_time
+    ON flu_cases_weekly (country_code, time);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_flu_cases_weekly_time_covering
+    ON flu_cases_weekly (time) INCLUDE (country_code, flu_type, new_cases);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_flu_cases_weekly_time;
+DROP INDEX CONCURRENTLY IF EXISTS ix_flu_cases_weekly_country_code;
+
+-- Rollup refreshes re-sum the touched weeks of flu_cases. The covering index
+-- also serves every lookup by time, so the single-column one only costs writes.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_flu_cases_time_covering
+    ON flu_cases (time) INCLUDE (country_code, flu_type, new_cases);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_flu_cases_time;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_genomic_sequences_collection_date_covering
+    ON genomic_sequences (collection_date) INCLUDE (clade, country_code, count);
+
+ANALYZE flu_cases_weekly;
+ANALYZE flu_cases;
+ANALYZE genomic_sequences;
@@ -0,0 +1,72 @@
+-- Migration: Convert flu_cases to the compact layout (FLU_CASE_SCHEMA=compact)
+--
+-- For NEW deployments: set FLU_CASE_SCHEMA=compact before the first startup
+-- and init_db() creates the compact table and seeds its lookup tables.
+--
+-- For EXISTING deployments, stop ingestion, run this script, then restart
+-- with FLU_CASE_SCHEMA=compact. It:
+--   * creates the flu_types and case_sources lookup tables (init_db() also
+--     rewrites them on every startup from app.models),
+--   * recodes flu_type and source as SMALLINT codes into them,
+--   * stores empty region/city as NULL,
+--   * replaces uq_flu_case with the narrower
+--     UNIQUE NULLS NOT DISTINCT (time, flu_type, source, country_code, region, city).
+-- The column changes are a single ALTER TABLE, so the table (each partition
+-- of it, if partitioned) is rewritten once, under an exclusive lock.
+-- Requires PostgreSQL 15+ for NULLS NOT DISTINCT. Codes must match
+-- app.models.FLU_TYPE_CODES / CASE_SOURCE_CODES (tests/test_models.py checks).
+-- Rows from sources other than who_flunet have no code: add them to
+-- CASE_SOURCE_CODES (and below) first, or the ALTER fails on the NULL.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS flu_types (
+    code SMALLINT PRIMARY KEY,
+    name VARCHAR(32) NOT NULL UNIQUE
+);
+INSERT INTO flu_types (code, name) VALUES
+    (1, 'H1N1'),
+    (2, 'H3N2'),
+    (3, 'H5N1'),
+    (4, 'H7N9'),
+    (5, 'B_YAMAGATA'),
+    (6, 'B_VICTORIA'),
+    (7, 'A_UNSUBTYPED'),
+    (8, 'B_LINEAGE_UNKNOWN'),
+    (9, 'UNKNOWN')
+ON CONFLICT (code) DO UPDATE SET name = EXCLUDED.name;
+
+CREATE TABLE IF NOT EXISTS case_sources (
+    code SMALLINT PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE
+);
+INSERT INTO case_sources (code, name) VALUES
+    (1, 'who_flunet')
+ON CONFLICT (code) DO UPDATE SET name = EXCLUDED.name;
+
+ALTER TABLE flu_cases DROP CONSTRAINT uq_flu_case;
+
+ALTER TABLE flu_cases
+    ALTER COLUMN flu_type TYPE SMALLINT USING CASE flu_type
+        WHEN 'H1N1' THEN 1
+        WHEN 'H3N2' THEN 2
+        WHEN 'H5N1' THEN 3
+        WHEN 'H7N9' THEN 4
+        WHEN 'B_YAMAGATA' THEN 5
+        WHEN 'B_VICTORIA' THEN 6
+        WHEN 'A_UNSUBTYPED' THEN 7
+        WHEN 'B_LINEAGE_UNKNOWN' THEN 8
+        WHEN 'UNKNOWN' THEN 9
+    END,
+    ALTER COLUMN source TYPE SMALLINT USING CASE source
+        WHEN 'who_flunet' THEN 1
+    END,
+    ALTER COLUMN region TYPE VARCHAR(100) USING NULLIF(region, ''),
+    ALTER COLUMN city TYPE VARCHAR(100) USING NULLIF(city, '');
+
+ALTER TABLE flu_cases ADD CONSTRAINT uq_flu_case
+    UNIQUE NULLS NOT DISTINCT (time, flu_type, source, country_code, region, city);
+
+COMMIT;
+
+ANALYZE flu_cases;
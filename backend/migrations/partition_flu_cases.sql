@@ -0,0 +1,60 @@
+-- Migration: Range-partition flu_cases by ISO year
+--
+-- For NEW deployments: init_db() creates flu_cases as a partitioned table
+-- (app.services.partitions) and partitions are added as data arrives.
+--
+-- For EXISTING deployments, run this script before starting the new version.
+-- It rebuilds flu_cases as a table partitioned on time with one partition per
+-- ISO year (flu_cases_y<year>, Monday of week 1 up to next year's), copies the
+-- rows across and drops the old table. The primary key becomes (id, time),
+-- since a partitioned table's keys must include the partition column; ids and
+-- the id sequence are kept. The copy rewrites the whole table and holds an
+-- exclusive lock on flu_cases until it commits, so run it during a quiet
+-- period (ingestion stopped).
+
+BEGIN;
+
+ALTER TABLE flu_cases RENAME TO flu_cases_unpartitioned;
+ALTER TABLE flu_cases_unpartitioned RENAME CONSTRAINT flu_cases_pkey TO flu_cases_unpartitioned_pkey;
+ALTER TABLE flu_cases_unpartitioned RENAME CONSTRAINT uq_flu_case TO uq_flu_case_unpartitioned;
+ALTER INDEX IF EXISTS ix_flu_cases_country_code RENAME TO ix_flu_cases_unpartitioned_country_code;
+ALTER INDEX IF EXISTS ix_flu_cases_time_covering RENAME TO ix_flu_cases_unpartitioned_time_covering;
+
+CREATE TABLE flu_cases (
+    LIKE flu_cases_unpartitioned INCLUDING DEFAULTS,
+    CONSTRAINT flu_cases_pkey PRIMARY KEY (id, time),
+    CONSTRAINT uq_flu_case UNIQUE (country_code, region, city, flu_type, source, time)
+) PARTITION BY RANGE (time);
+
+-- The sequence would otherwise be dropped with the old table
+ALTER SEQUENCE flu_cases_id_seq OWNED BY flu_cases.id;
+
+CREATE INDEX ix_flu_cases_country_code ON flu_cases (country_code);
+CREATE INDEX ix_flu_cases_time_covering ON flu_cases (time) INCLUDE (country_code, flu_type, new_cases);
+
+-- One partition per ISO year in the data, plus this year and next
+DO $$
+DECLARE
+    y integer;
+BEGIN
+    FOR y IN
+        SELECT DISTINCT extract(isoyear FROM time)::integer FROM flu_cases_unpartitioned
+        UNION SELECT extract(isoyear FROM current_date)::integer
+        UNION SELECT extract(isoyear FROM current_date)::integer + 1
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE flu_cases_y%s PARTITION OF flu_cases FOR VALUES FROM (%L) TO (%L)',
+            y,
+            to_date(y || '-01-1', 'IYYY-IW-ID'),
+            to_date((y + 1) || '-01-1', 'IYYY-IW-ID')
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO flu_cases SELECT * FROM flu_cases_unpartitioned;
+
+DROP TABLE flu_cases_unpartitioned;
+
+COMMIT;
+
+ANALYZE flu_cases;
@@ -18,11 +18,15 @@ os.environ.setdefault(
 
 from datetime import date, datetime
 
+import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.models import Anomaly, Base, FluCase, GenomicSequence
+from app.services.codes import seed_codes
+from app.services.countries import seed_countries
+from app.services.rollup import refresh_weekly_rollup
 
 # ---------------------------------------------------------------------------
 # Engine / session that every test will share
@@ -41,27 +45,34 @@ _MODULES_USING_SESSION = [
     "app.routers.genomics",
     "app.routers.anomalies",
     "app.services.flunet",
+    "app.services.checkpoints",
     "app.services.nextstrain",
     "app.services.anomaly",
+    "app.services.case_stats",
     "app.services.forecast",
+    "app.services.snapshot",
 ]
 
 
 @pytest_asyncio.fixture(autouse=True)
 async def setup_db():
     """Create all tables before each test, drop them after."""
+    import importlib
     import sys
 
-    # Patch async_session in every module that imported it
+    # Patch async_session in every module that imported it (importing them first, so a
+    # module first loaded later by the app under test still sees the test engine)
     originals = {}
     for mod_name in _MODULES_USING_SESSION:
-        mod = sys.modules.get(mod_name)
+        mod = importlib.import_module(mod_name)
         if mod and hasattr(mod, "async_session"):
             originals[mod_name] = getattr(mod, "async_session")
             setattr(mod, "async_session", TestSession)
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await seed_countries(conn)
+        await seed_codes(conn)
 
     yield
 
@@ -75,6 +86,25 @@ async def setup_db():
             setattr(mod, "async_session", orig)
 
 
+@pytest.fixture(autouse=True)
+def http_cache_dir(tmp_path, monkeypatch):
+    """Give every test its own empty upstream response cache."""
+    from app.services.http_cache import response_cache
+
+    monkeypatch.setattr(response_cache, "directory", tmp_path / "http-cache")
+    return response_cache.directory
+
+
+@pytest.fixture(autouse=True)
+def api_cache(monkeypatch):
+    """Give every test an empty API response cache (tests seed the database without bumping the version)."""
+    from app import cache
+
+    fresh = cache.ResponseCache()
+    monkeypatch.setattr(cache, "api_cache", fresh)
+    return fresh
+
+
 @pytest_asyncio.fixture
 async def db_session():
     """Provide a clean database session for direct DB tests."""
@@ -148,6 +178,8 @@ async def seed_flu_cases(db_session: AsyncSession):
         ),
     ]
     db_session.add_all(cases)
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
     await db_session.commit()
     return cases
 
@@ -0,0 +1,115 @@
+"""The original per-record FluNet processor and synthetic raw records to compare it with.
+
+:func:`reference_process_records` is the loop that the columnar
+``_process_records`` replaced; the tests and
+``benchmarks/bench_flunet_processing.py`` check the two agree.
+"""
+
+import random
+from collections import defaultdict
+from datetime import datetime
+
+from app.services.flunet import AGGREGATE_MAP, LAST_RESORT_FIELDS, SUBTYPE_MAP, _normalize_country
+
+COUNTRIES = ["US", "FR", "DE", "BR", "IN", "JP", "ZA", "AU", "XE", "XI", "XS", "XW"] + [
+    f"{a}{b}" for a in "KLMNOP" for b in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+]
+
+
+def synthetic_records(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        rec = {
+            "ISO2": COUNTRIES[i % len(COUNTRIES)],
+            "ISO_YEAR": 2015 + (i // 20000) % 11,
+            "ISO_WEEK": 1 + (i // len(COUNTRIES)) % 52,
+            "ORIGIN_SOURCE": rng.choice(["SENTINEL", "NONSENTINEL"]),
+        }
+        coverage = rng.random()
+        if coverage < 0.5:
+            for field in SUBTYPE_MAP:
+                rec[field] = rng.choice([None, 0, rng.randint(1, 400)])
+        elif coverage < 0.8:
+            for field in AGGREGATE_MAP:
+                rec[field] = rng.choice([None, rng.randint(0, 900)])
+        else:
+            rec["INF_ALL"] = rng.choice([None, rng.randint(0, 2000)])
+        records.append(rec)
+    return records
+
+
+def reference_process_records(records: list) -> list[dict]:
+    """The original per-record implementation, kept as the correctness and speed baseline."""
+    parsed = []
+
+    def row(cc, label, time_val, val, iso_year, iso_week):
+        return {
+            "country_code": cc,
+            "region": "",
+            "city": "",
+            "flu_type": label,
+            "source": "who_flunet",
+            "time": time_val.date(),
+            "new_cases": val,
+            "iso_year": iso_year,
+            "iso_week": iso_week,
+        }
+
+    for rec in records:
+        iso_year = rec.get("ISO_YEAR")
+        iso_week = rec.get("ISO_WEEK")
+        if not iso_year or not iso_week:
+            continue
+        country_code = _normalize_country(rec.get("ISO2") or rec.get("COUNTRY_CODE") or "")
+        if not country_code:
+            continue
+        try:
+            time_val = datetime.strptime(f"{iso_year}-W{iso_week:02d}-1", "%G-W%V-%u")
+        except (ValueError, TypeError):
+            continue
+
+        has_specific = False
+        for field, label in SUBTYPE_MAP.items():
+            val = rec.get(field)
+            if val and int(val) > 0:
+                has_specific = True
+                parsed.append(row(country_code, label, time_val, int(val), iso_year, iso_week))
+        if not has_specific:
+            for field, label in AGGREGATE_MAP.items():
+                val = rec.get(field)
+                if val and int(val) > 0:
+                    has_specific = True
+                    parsed.append(row(country_code, label, time_val, int(val), iso_year, iso_week))
+        if not has_specific:
+            for field in LAST_RESORT_FIELDS:
+                val = rec.get(field)
+                if val and int(val) > 0:
+                    parsed.append(row(country_code, "unknown", time_val, int(val), iso_year, iso_week))
+                    break
+
+    agg = defaultdict(int)
+    meta = {}
+    for r in parsed:
+        key = (r["time"], r["country_code"], r["region"], r["city"], r["flu_type"], r["source"])
+        agg[key] += r["new_cases"]
+        meta[key] = (r["iso_year"], r["iso_week"])
+
+    result = []
+    for key, total in agg.items():
+        time_val, cc, region, city, flu_type, source = key
+        iy, iw = meta[key]
+        result.append(
+            {
+                "country_code": cc,
+                "region": region,
+                "city": city,
+                "flu_type": flu_type,
+                "source": source,
+                "time": time_val,
+                "new_cases": total,
+                "iso_year": iy,
+                "iso_week": iw,
+            }
+        )
+    return result
@@ -6,6 +6,7 @@ import pytest
 
 from app.models import FluCase
 from app.population import POPULATIONS
+from app.services.rollup import refresh_weekly_rollup
 
 
 @pytest.mark.asyncio
@@ -66,6 +67,8 @@ async def test_cases_map_computes_per_100k(client, db_session):
         ),
     ]
     db_session.add_all(rows)
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
     await db_session.commit()
 
     resp = await client.get("/api/cases/map")
@@ -118,6 +121,8 @@ async def test_cases_historical_normalizes_oct_sep_season(client, db_session):
         ),
     ]
     db_session.add_all(rows)
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
     await db_session.commit()
 
     resp = await client.get("/api/cases/historical")
@@ -156,6 +161,8 @@ async def test_cases_historical_country_filter(client, db_session):
         ),
     ]
     db_session.add_all(rows)
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
     await db_session.commit()
 
     resp = await client.get("/api/cases/historical?country=US")
@@ -214,3 +221,51 @@ async def test_cases_countries_search_no_match(client, seed_flu_cases):
     resp = await client.get("/api/cases/countries?search=ZZZZ")
     assert resp.status_code == 200
     assert resp.json() == []
+
+
+@pytest.mark.asyncio
+async def test_cases_countries_rows(client, seed_flu_cases):
+    resp = await client.get("/api/cases/countries")
+    data = [
+        (r["rank"], r["country_code"], r["total_cases"], r["prior_year_cases"], r["dominant_type"], r["sparkline"])
+        for r in resp.json()
+    ]
+    assert data == [
+        (1, "US", 270, 0, "H1N1", [150, 120]),
+        (2, "GB", 140, 0, "H3N2", [80, 60]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cases_countries_filters(client, seed_flu_cases):
+    async def codes(query):
+        resp = await client.get(f"/api/cases/countries?{query}")
+        assert resp.status_code == 200
+        return [(r["rank"], r["country_code"], r["continent"]) for r in resp.json()]
+
+    assert await codes("continent=Europe") == [(2, "GB", "Europe")]
+    assert await codes("continent=north%20america") == [(1, "US", "North America")]
+    assert await codes("flu_type=H3N2") == [(2, "GB", "Europe")]
+    assert await codes("search=g") == [(2, "GB", "Europe")]
+    assert await codes("continent=Asia") == []
+
+
+@pytest.mark.asyncio
+async def test_cases_countries_sort_and_keyset_pagination(client, seed_flu_cases):
+    async def codes(query):
+        return [r["country_code"] for r in (await client.get(f"/api/cases/countries?{query}")).json()]
+
+    assert await codes("sort=cases") == ["US", "GB"]
+    # GB has far fewer people than the US
+    assert await codes("sort=per_100k") == ["GB", "US"]
+    assert await codes("sort=severity") == ["GB", "US"]
+    assert await codes("sort=per_100k&limit=1") == ["GB"]
+    assert await codes("sort=per_100k&limit=1&after=GB") == ["US"]
+    assert await codes("sort=per_100k&limit=1&after=US") == []
+    assert (await client.get("/api/cases/countries?sort=name")).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_cases_countries_names(client, seed_flu_cases):
+    data = (await client.get("/api/cases/countries?search=kingdom")).json()
+    assert [(r["country_code"], r["country_name"]) for r in data] == [("GB", "United Kingdom")]
@@ -0,0 +1,142 @@
+"""Tests for the /api/dashboard bundle endpoint."""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models import FluCase
+from app.routers import dashboard
+from app.services.rollup import refresh_weekly_rollup
+from tests.conftest import engine
+
+SECTIONS = {
+    "summary": "/api/cases/summary",
+    "map": "/api/cases/map",
+    "countries": "/api/cases/countries",
+    "subtypes": "/api/cases/subtypes",
+    "anomalies": "/api/anomalies",
+    "clade_trends": "/api/genomics/trends",
+}
+
+
+@pytest.mark.asyncio
+async def test_dashboard_empty(client):
+    resp = await client.get("/api/dashboard")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["summary"]["total_cases"] == 0
+    assert data["map"] == data["countries"] == data["anomalies"] == []
+    assert data["forecast"] == {"historical": [], "forecast": []}
+    assert data["errors"] == []
+
+
+@pytest.mark.asyncio
+async def test_dashboard_matches_individual_endpoints(client, seed_flu_cases, seed_anomalies, seed_genomic_sequences):
+    bundle = (await client.get("/api/dashboard")).json()
+
+    for section, path in SECTIONS.items():
+        expected = (await client.get(path)).json()
+        if section == "map":
+            bundle["map"].sort(key=lambda p: p["country_code"])
+            expected.sort(key=lambda p: p["country_code"])
+        assert bundle[section] == expected, section
+    assert bundle["historical"] == (await client.get("/api/cases/historical")).json()
+    assert bundle["forecast"] == (await client.get("/api/forecast")).json()
+    assert bundle["summary"]["countries_reporting"] == 2
+
+
+@pytest.mark.asyncio
+async def test_dashboard_country_filters_historical_and_forecast(client, db_session):
+    start = date(2025, 1, 6)
+    for i in range(10):
+        for cc in ["US", "GB"]:
+            db_session.add(
+                FluCase(
+                    country_code=cc,
+                    flu_type="H1N1",
+                    source="who_flunet",
+                    time=start + timedelta(weeks=i),
+                    new_cases=100 + i if cc == "US" else 5,
+                    iso_year=2025,
+                    iso_week=2 + i,
+                )
+            )
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
+    await db_session.commit()
+
+    bundle = (await client.get("/api/dashboard?country=us")).json()
+    assert bundle["historical"] == (await client.get("/api/cases/historical?country=US")).json()
+    assert bundle["forecast"] == (await client.get("/api/forecast?country=US")).json()
+    assert bundle["forecast"]["historical"][-1]["actual"] == 109
+    assert len(bundle["map"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_dashboard_shares_intermediate_queries(client, seed_flu_cases):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.lower())
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        assert (await client.get("/api/dashboard")).status_code == 200
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    case_queries = [s for s in statements if "flu_cases_weekly" in s]
+    assert sum("max(flu_cases_weekly.time)" in s for s in case_queries) == 1
+    # Latest week, summary, map totals, country table, subtypes and weekly totals
+    assert len(case_queries) == 6
+
+
+@pytest.mark.asyncio
+async def test_dashboard_isolates_a_failing_section(client, seed_flu_cases, monkeypatch):
+    calls = []
+
+    async def failing_trends(**kwargs):
+        calls.append(kwargs)
+        raise RuntimeError("genomics down")
+
+    monkeypatch.setattr(dashboard, "genomic_trends", failing_trends)
+
+    resp = await client.get("/api/dashboard")
+    assert resp.status_code == 200
+    bundle = resp.json()
+    assert bundle["errors"] == ["clade_trends"]
+    assert bundle["clade_trends"] is None
+    assert bundle["summary"] == (await client.get("/api/cases/summary")).json()
+    assert bundle["anomalies"] == []
+    # A partial bundle is neither tagged nor cached, so the failing section is retried
+    assert resp.headers["cache-control"] == "no-store"
+    assert "etag" not in resp.headers
+    await client.get("/api/dashboard")
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_dashboard_nulls_only_the_forecast_when_it_fails(client, seed_flu_cases, monkeypatch):
+    async def failing_forecast(**kwargs):
+        raise ValueError("singular matrix")
+
+    monkeypatch.setattr(dashboard, "generate_forecast", failing_forecast)
+
+    bundle = (await client.get("/api/dashboard")).json()
+    assert bundle["errors"] == ["forecast"]
+    assert bundle["forecast"] is None
+    assert bundle["historical"] == (await client.get("/api/cases/historical")).json()
+
+
+@pytest.mark.asyncio
+async def test_dashboard_nulls_every_case_section_when_case_queries_fail(client, monkeypatch):
+    def failing_stats():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(dashboard, "case_stats", failing_stats)
+
+    bundle = (await client.get("/api/dashboard")).json()
+    assert bundle["errors"] == list(dashboard.CASE_SECTIONS)
+    assert all(bundle[section] is None for section in dashboard.CASE_SECTIONS)
+    assert bundle["anomalies"] == []
@@ -5,6 +5,7 @@ from datetime import date, timedelta
 import pytest
 
 from app.models import FluCase
+from app.services.rollup import refresh_weekly_rollup
 
 
 @pytest.mark.asyncio
@@ -42,6 +43,8 @@ async def test_forecast_with_enough_data_points(client, db_session):
                 iso_week=1 + i,
             )
         )
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
     await db_session.commit()
 
     resp = await client.get("/api/forecast?country=US&weeks=3")
@@ -0,0 +1,167 @@
+"""Tests for the data-versioned API response cache."""
+
+import asyncio
+
+import pytest
+
+from app import cache
+from app.cache import ResponseCache, bump_data_version, cached_endpoint
+from app.models import Anomaly
+
+
+async def test_hits_until_data_version_changes(api_cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert await api_cache.get_or_compute("k", compute) == 1
+    assert await api_cache.get_or_compute("k", compute) == 1
+    bump_data_version("test")
+    assert await api_cache.get_or_compute("k", compute) == 2
+
+    stats = api_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+
+async def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(cache.settings, "RESPONSE_CACHE_MAX_ENTRIES", 2)
+    lru = ResponseCache()
+
+    async def value(key):
+        return await lru.get_or_compute(key, lambda: asyncio.sleep(0, result=key))
+
+    for key in ["a", "b", "a", "c"]:
+        await value(key)
+
+    assert list(k for _, k in lru._entries) == ["a", "c"]
+    assert lru.stats()["evictions"] == 1
+
+
+async def test_disabled_cache_always_computes(monkeypatch):
+    monkeypatch.setattr(cache.settings, "RESPONSE_CACHE_MAX_ENTRIES", 0)
+    disabled = ResponseCache()
+    for _ in range(2):
+        await disabled.get_or_compute("k", lambda: asyncio.sleep(0, result=1))
+    assert disabled.stats()["misses"] == 2
+
+
+async def test_concurrent_misses_share_one_computation(api_cache):
+    started = 0
+    release = asyncio.Event()
+
+    async def slow():
+        nonlocal started
+        started += 1
+        await release.wait()
+        return "value"
+
+    tasks = [asyncio.create_task(api_cache.get_or_compute("k", slow)) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == ["value"] * 5
+    assert started == 1
+    assert api_cache.stats()["coalesced"] == 4
+
+
+async def test_errors_are_shared_but_not_cached(api_cache):
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("db down")
+
+    tasks = [asyncio.create_task(api_cache.get_or_compute("k", failing)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert await api_cache.get_or_compute("k", lambda: asyncio.sleep(0, result="ok")) == "ok"
+
+
+async def test_waiters_recompute_when_the_leader_is_cancelled(api_cache):
+    async def hang():
+        await asyncio.Event().wait()
+
+    leader = asyncio.create_task(api_cache.get_or_compute("k", hang))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(api_cache.get_or_compute("k", lambda: asyncio.sleep(0, result="fresh")))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "fresh"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_cached_endpoint_keys_on_normalized_params(api_cache):
+    calls = []
+
+    @cached_endpoint
+    async def endpoint(country: str = "", weeks: int = 8):
+        calls.append((country, weeks))
+        return country, weeks
+
+    await endpoint()
+    await endpoint(country="", weeks=8)
+    await endpoint(weeks=8, country="US")
+    await endpoint("US", 8)
+
+    assert calls == [("", 8), ("US", 8)]
+
+
+async def test_anomaly_endpoint_is_invalidated_by_detection(client, db_session):
+    assert (await client.get("/api/anomalies")).json() == []
+    db_session.add(Anomaly(country_code="US", country_name="US", anomaly_type="spike", severity="high", message="m"))
+    await db_session.commit()
+    assert (await client.get("/api/anomalies")).json() == []
+
+    bump_data_version("test")
+    assert len((await client.get("/api/anomalies")).json()) == 1
+
+
+async def test_health_cache_endpoint(client):
+    await client.get("/api/cases/summary")
+    await client.get("/api/cases/summary")
+    data = (await client.get("/api/health/cache")).json()
+    assert data["hits"] == 1 and data["misses"] == 1
+    assert set(data) >= {"data_version", "entries", "max_entries", "coalesced", "evictions", "hit_ratio"}
+
+
+async def test_etag_round_trip_skips_the_endpoint(client, monkeypatch):
+    first = await client.get("/api/cases/summary")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "public, max-age=60"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("endpoint ran for a matching If-None-Match")
+
+    monkeypatch.setattr(cache, "api_cache", fail)
+    resp = await client.get("/api/cases/summary", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == etag
+    assert resp.content == b""
+
+
+async def test_etag_depends_on_query_and_data_version(client):
+    a = (await client.get("/api/cases/historical?country=US")).headers["etag"]
+    assert (await client.get("/api/cases/historical?country=GB")).headers["etag"] != a
+    bump_data_version("test")
+    resp = await client.get("/api/cases/historical?country=US", headers={"If-None-Match": a})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != a
+
+
+async def test_paths_without_policy_and_errors_are_not_tagged(client, monkeypatch):
+    assert "etag" not in (await client.get("/api/health")).headers
+    resp = await client.get("/api/cases/historical?country=TOOLONG")
+    assert resp.status_code == 422
+    assert "etag" not in resp.headers
+
+    monkeypatch.setattr(cache.settings, "CACHE_CONTROL", {"/api": "no-cache", "/api/cases/map": "public, max-age=5"})
+    assert (await client.get("/api/cases/map")).headers["cache-control"] == "public, max-age=5"
+    assert (await client.get("/api/cases/mapx")).status_code == 404
+    assert (await client.get("/api/health/cache")).headers["cache-control"] == "no-cache"
@@ -0,0 +1,90 @@
+"""Tests for the CPU executor layer and event-loop lag monitor."""
+
+import asyncio
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from app import executor
+from app.executor import LoopLagMonitor, get_executor_stats, run_cpu_bound, shutdown_executor
+from app.services.forecast import _compute_forecast
+
+
+def _square(x):
+    return x * x
+
+
+@pytest.fixture(autouse=True)
+def _reset_executor(monkeypatch):
+    monkeypatch.setattr(executor, "_task_stats", executor.defaultdict(executor._task_stats.default_factory))
+    yield
+    shutdown_executor()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["inline", "thread"])
+async def test_run_cpu_bound_returns_result_and_records_stats(monkeypatch, mode):
+    monkeypatch.setattr(executor.settings, "CPU_EXECUTOR", mode)
+    assert await run_cpu_bound(_square, 7, label="square") == 49
+    assert await run_cpu_bound(_square, 3, label="square") == 9
+
+    stats = get_executor_stats()
+    assert stats["mode"] == mode
+    assert stats["tasks"]["square"]["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_run_cpu_bound_defaults_label_to_function_name(monkeypatch):
+    monkeypatch.setattr(executor.settings, "CPU_EXECUTOR", "inline")
+    await run_cpu_bound(_square, 2)
+    assert "_square" in get_executor_stats()["tasks"]
+
+
+@pytest.mark.asyncio
+async def test_run_cpu_bound_propagates_errors(monkeypatch):
+    monkeypatch.setattr(executor.settings, "CPU_EXECUTOR", "thread")
+    with pytest.raises(ZeroDivisionError):
+        await run_cpu_bound(divmod, 1, 0, label="divide")
+    assert get_executor_stats()["tasks"]["divide"]["count"] == 1
+
+
+def test_lag_monitor_stats():
+    monitor = LoopLagMonitor(0.1)
+    assert monitor.stats()["samples"] == 0
+    for lag in [0.001, 0.002, -0.001, 0.25]:
+        monitor.record(lag)
+
+    stats = monitor.stats()
+    assert stats["samples"] == 4
+    assert stats["max_ms"] == 250.0
+    assert stats["p99_ms"] == 250.0
+    assert stats["blocked_seconds"] == pytest.approx(0.253, abs=0.001)
+
+
+@pytest.mark.asyncio
+async def test_lag_monitor_detects_blocking_callback():
+    monitor = LoopLagMonitor(0.01)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)  # block the loop
+    await asyncio.sleep(0.03)
+    await monitor.stop()
+
+    assert monitor.stats()["max_ms"] >= 50
+
+
+def test_compute_forecast_is_pure():
+    dates = [date(2025, 1, 6) + timedelta(weeks=i) for i in range(6)]
+    result = _compute_forecast(dates, [10.0, 20.0, 30.0, 40.0, 50.0, 60.0], 2, 0.3, 1.96)
+    assert len(result["historical"]) == 6
+    assert [p["date"] for p in result["forecast"]] == ["2025-02-17", "2025-02-24"]
+
+
+@pytest.mark.asyncio
+async def test_health_executor_endpoint(client):
+    resp = await client.get("/api/health/executor")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert set(data) == {"mode", "workers", "tasks", "loop_lag"}
+    assert set(data["loop_lag"]) == {"interval_seconds", "samples", "p99_ms", "max_ms", "blocked_seconds"}
@@ -1,12 +1,28 @@
-"""Tests for FluNet service — pure functions only (no network calls)."""
+"""Tests for FluNet service — pure functions and mocked HTTP (no network calls)."""
 
-from datetime import date
+from datetime import date, datetime
 
+import httpx
+import pytest
+
+from app.models import FluCase, IngestionState
+from app.services import flunet
+from app.services.bulk import UpsertResult
+from app.services.checkpoints import load_checkpoints, save_checkpoint
 from app.services.flunet import (
     _normalize_country,
     _parse_week_date,
     _process_records,
 )
+from app.services.http_cache import response_cache
+from app.services.shadow import build_shadow_table
+from tests.flunet_reference import reference_process_records, synthetic_records
+
+
+class _FixedDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return cls(2025, 3, 1)
 
 
 class TestParseWeekDate:
@@ -70,6 +86,15 @@ class TestProcessRecords:
         assert "H1N1" not in types
         assert "unknown" in types
 
+    def test_all_zero_records_yield_nothing(self):
+        assert _process_records([self._make_record(AH3=0, INF_A=0), self._make_record(INF_ALL=None)]) == []
+
+    def test_all_zero_page_does_not_break_aggregation(self):
+        aggregator = flunet._WeeklyAggregator()
+        aggregator.add([self._make_record(AH3=7)])
+        aggregator.add([self._make_record(week=11, AH3=0, INF_A=0)])
+        assert [(r["iso_week"], r["new_cases"]) for r in aggregator.drain()] == [(10, 7)]
+
     def test_uk_merging(self):
         recs = [
             self._make_record(iso2="XE", AH3=10),
@@ -87,3 +112,435 @@ class TestProcessRecords:
     def test_skips_missing_country(self):
         rec = {"ISO2": "", "ISO_YEAR": 2025, "ISO_WEEK": 10, "AH3": 5}
         assert _process_records([rec]) == []
+
+    def test_skips_out_of_range_week(self):
+        recs = [self._make_record(week=54, AH3=5), self._make_record(week=0, AH3=5)]
+        assert _process_records(recs) == []
+
+    def test_week_53_rolls_into_next_year_like_strptime(self):
+        (row,) = _process_records([self._make_record(year=2025, week=53, AH3=5)])
+        assert row["time"] == date(2025, 12, 29)
+
+    def test_non_numeric_counts_are_ignored(self):
+        rec = self._make_record(AH3="n/a", INF_B="12")
+        result = _process_records([rec])
+        assert [(r["flu_type"], r["new_cases"]) for r in result] == [("B (lineage unknown)", 12)]
+
+    def test_matches_reference_implementation(self):
+        records = synthetic_records(5000, seed=3)
+        assert _process_records(records) == reference_process_records(records)
+
+    def test_aggregates_across_pages_like_single_batch(self):
+        records = synthetic_records(3000, seed=11)
+        aggregator = flunet._WeeklyAggregator()
+        for i in range(0, len(records), 700):
+            aggregator.add(records[i : i + 700])
+        assert aggregator.drain() == reference_process_records(records)
+
+
+def _mock_client_factory(monkeypatch, handler):
+    """Route every httpx.AsyncClient created by the flunet module through ``handler``."""
+    real_client = httpx.AsyncClient
+
+    def factory(*args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(handler)
+        return real_client(*args, **kwargs)
+
+    monkeypatch.setattr(flunet.httpx, "AsyncClient", factory)
+
+
+class TestStreamFlunetFull:
+    async def test_yields_one_aggregated_batch_per_year(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+
+        def handler(request):
+            url = str(request.url)
+            if "page=2" in url:
+                return httpx.Response(200, json={"value": [{"ISO2": "XS", "ISO_YEAR": 2024, "ISO_WEEK": 5, "AH3": 7}]})
+            if "ISO_YEAR%20ge%202024" in url or "ISO_YEAR ge 2024" in url:
+                return httpx.Response(
+                    200,
+                    json={
+                        "value": [{"ISO2": "XE", "ISO_YEAR": 2024, "ISO_WEEK": 5, "AH3": 3}],
+                        "@odata.nextLink": "https://example.test/next?page=2",
+                    },
+                )
+            return httpx.Response(200, json={"value": [{"ISO2": "US", "ISO_YEAR": 2025, "ISO_WEEK": 1, "INF_B": 4}]})
+
+        _mock_client_factory(monkeypatch, handler)
+
+        batches = [batch async for batch in flunet.stream_flunet_full(years_back=1, concurrency=1)]
+
+        assert len(batches) == 2
+        # UK rows on different pages of the same year are merged before flushing
+        assert [(r["country_code"], r["new_cases"]) for r in batches[0]] == [("GB", 10)]
+        assert [(r["country_code"], r["flu_type"]) for r in batches[1]] == [("US", "B (lineage unknown)")]
+
+    async def test_concurrent_mode_matches_sequential(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+
+        def handler(request):
+            url = str(request.url)
+            year = next(y for y in range(2020, 2026) if f"ge%20{y}" in url or f"ge {y}" in url)
+            if "page=2" in url:
+                return httpx.Response(
+                    200, json={"value": [{"ISO2": "XW", "ISO_YEAR": year, "ISO_WEEK": 2, "AH3": year}]}
+                )
+            return httpx.Response(
+                200,
+                json={
+                    "value": [{"ISO2": "XI", "ISO_YEAR": year, "ISO_WEEK": 2, "AH3": 1, "BVIC": 2}],
+                    "@odata.nextLink": f"{flunet.FLUNET_URL}?$filter=ISO_YEAR ge {year}&page=2",
+                },
+            )
+
+        _mock_client_factory(monkeypatch, handler)
+
+        sequential = [b async for b in flunet.stream_flunet_full(years_back=5, concurrency=1, force=True)]
+        concurrent = [b async for b in flunet.stream_flunet_full(years_back=5, concurrency=3, force=True)]
+
+        assert concurrent == sequential
+        assert len(concurrent) == 6
+        progress = flunet.get_backfill_progress()
+        assert set(progress) == set(range(2020, 2026))
+        assert all(p["status"] == "done" and p["pages"] == 2 for p in progress.values())
+
+    async def test_unchanged_years_are_skipped_until_content_changes(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+        cases = {2024: 1, 2025: 1}
+        etags_sent = []
+
+        def handler(request):
+            year = 2024 if "ge%202024" in str(request.url) or "ge 2024" in str(request.url) else 2025
+            etags_sent.append(request.headers.get("if-none-match"))
+            etag = f'"{year}-{cases[year]}"'
+            if request.headers.get("if-none-match") == etag:
+                return httpx.Response(304)
+            record = {"ISO2": "US", "ISO_YEAR": year, "ISO_WEEK": 3, "AH3": cases[year]}
+            return httpx.Response(200, json={"value": [record]}, headers={"ETag": etag})
+
+        _mock_client_factory(monkeypatch, handler)
+
+        first = [b async for b in flunet.stream_flunet_full(years_back=1, concurrency=2)]
+        assert [b[0]["new_cases"] for b in first] == [1, 1]
+
+        assert [b async for b in flunet.stream_flunet_full(years_back=1, concurrency=2)] == []
+        assert etags_sent[-2:] == ['"2024-1"', '"2025-1"']
+        assert {p["status"] for p in flunet.get_backfill_progress().values()} == {"unchanged"}
+
+        cases[2025] = 9
+        third = [b async for b in flunet.stream_flunet_full(years_back=1, concurrency=1)]
+        assert [(b[0]["iso_year"], b[0]["new_cases"]) for b in third] == [(2025, 9)]
+
+        forced = [b async for b in flunet.stream_flunet_full(years_back=1, concurrency=1, force=True)]
+        assert len(forced) == 2
+
+    async def test_year_not_marked_loaded_when_consumer_fails(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+        _mock_client_factory(
+            monkeypatch,
+            lambda request: httpx.Response(
+                200, json={"value": [{"ISO2": "US", "ISO_YEAR": 2025, "ISO_WEEK": 3, "AH3": 1}]}
+            ),
+        )
+
+        with pytest.raises(RuntimeError):
+            async for _ in flunet.stream_flunet_full(years_back=0, concurrency=1):
+                raise RuntimeError("upsert failed")
+
+        assert len([b async for b in flunet.stream_flunet_full(years_back=0, concurrency=1)]) == 1
+
+    async def test_shadow_load_skips_when_nothing_changed(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+        _mock_client_factory(
+            monkeypatch,
+            lambda request: httpx.Response(
+                200, json={"value": [{"ISO2": "US", "ISO_YEAR": 2025, "ISO_WEEK": 3, "AH3": 1}]}
+            ),
+        )
+        upserted = []
+
+        async def fake_upsert(records, table):
+            upserted.append((table.name, len(records)))
+
+        monkeypatch.setattr(flunet, "_upsert_records", fake_upsert)
+        shadow = build_shadow_table(FluCase.__table__)
+
+        years = flunet.FULL_BACKFILL_YEARS + 1
+        rows, pending = await flunet.load_flunet_full(shadow)
+        assert (rows, len(pending)) == (years, years)
+        # Not marked processed until the shadow is swapped in, so still changed
+        assert (await flunet.load_flunet_full(shadow))[0] == years
+        response_cache.mark_processed(pending)
+        assert await flunet.load_flunet_full(FluCase.__table__) == (0, [])
+        assert await flunet.load_flunet_full(shadow) == (0, [])
+        assert (await flunet.load_flunet_full(shadow, force=True))[0] == years
+        assert upserted == [("flu_cases_shadow", 1)] * years * 3
+
+    async def test_year_load_keeps_backfill_progress(self, monkeypatch):
+        _mock_client_factory(
+            monkeypatch,
+            lambda request: httpx.Response(
+                200, json={"value": [{"ISO2": "US", "ISO_YEAR": 2024, "ISO_WEEK": 3, "AH3": 1}]}
+            ),
+        )
+
+        async def fake_upsert(records, table):
+            pass
+
+        monkeypatch.setattr(flunet, "_upsert_records", fake_upsert)
+        monkeypatch.setattr(flunet, "_backfill_progress", {2023: {"status": "done"}})
+
+        rows, pages = await flunet.load_flunet_year(2024, build_shadow_table(FluCase.__table__))
+
+        assert (rows, len(pages)) == (1, 1)
+        progress = flunet.get_backfill_progress()
+        assert progress[2023] == {"status": "done"}
+        assert progress[2024]["status"] == "done"
+
+    async def test_interrupted_backfill_resumes_from_checkpoints(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+        requested = []
+        fail = {"page2": True}
+
+        def handler(request):
+            url = str(request.url)
+            requested.append(url)
+            year = next(y for y in range(2023, 2026) if f"ge%20{y}" in url or f"ge {y}" in url)
+            if "page=2" in url:
+                if fail["page2"] and year == 2024:
+                    return httpx.Response(503)
+                return httpx.Response(200, json={"value": [{"ISO2": "XW", "ISO_YEAR": year, "ISO_WEEK": 2, "AH3": 2}]})
+            return httpx.Response(
+                200,
+                json={
+                    "value": [{"ISO2": "XS", "ISO_YEAR": year, "ISO_WEEK": 2, "AH3": 1}],
+                    "@odata.nextLink": f"{flunet.FLUNET_URL}?$filter=ISO_YEAR ge {year}&page=2",
+                },
+            )
+
+        _mock_client_factory(monkeypatch, handler)
+        written = []
+        with pytest.raises(httpx.HTTPStatusError):
+            async for batch in flunet.stream_flunet_full(years_back=2, concurrency=1, force=True, job="test"):
+                written.append(batch)
+        assert [b[0]["iso_year"] for b in written] == [2023]
+
+        checkpoints = await load_checkpoints("test")
+        assert checkpoints[2023]["completed"]
+        assert len(checkpoints[2024]["pages"]) == 1 and "page=2" in checkpoints[2024]["next_link"]
+
+        fail["page2"] = False
+        requested.clear()
+        async for batch in flunet.stream_flunet_full(years_back=2, concurrency=1, force=True, job="test"):
+            written.append(batch)
+
+        # 2023 is not fetched again and 2024 continues from its second page, still merging the UK rows
+        assert [(b[0]["iso_year"], b[0]["new_cases"]) for b in written] == [(2023, 3), (2024, 3), (2025, 3)]
+        assert not any("2023" in url for url in requested)
+        assert sum("2024" in url for url in requested) == 1
+        assert flunet.get_backfill_progress()[2023]["status"] == "resumed"
+        assert await load_checkpoints("test") == {}
+
+    async def test_stale_checkpoints_are_discarded(self, monkeypatch):
+        await save_checkpoint("test", 2024, [], None, completed=True)
+        assert (await load_checkpoints("test"))[2024]["completed"]
+
+        monkeypatch.setattr(flunet.settings, "BACKFILL_CHECKPOINT_MAX_AGE_HOURS", 0)
+        assert await load_checkpoints("test") == {}
+
+    async def test_ingest_flunet_full_upserts_each_year(self, monkeypatch):
+        jobs = []
+
+        async def fake_stream(force=False, job=None, processed=None):
+            jobs.append(job)
+            yield [{"country_code": "US"}]
+            yield [{"country_code": "GB"}, {"country_code": "FR"}]
+
+        upserted = []
+
+        async def fake_upsert(records, table):
+            upserted.append((table.name, len(records)))
+
+        monkeypatch.setattr(flunet, "stream_flunet_full", fake_stream)
+        monkeypatch.setattr(flunet, "_upsert_records", fake_upsert)
+
+        await flunet.ingest_flunet_full()
+
+        assert upserted == [("flu_cases", 1), ("flu_cases", 2)]
+        assert jobs == [flunet.BACKFILL_JOB]
+
+
+class TestDeltaIngestion:
+    def test_since_url_handles_year_boundary(self):
+        url = flunet._since_url(date(2024, 12, 23))
+        assert "ISO_YEAR gt 2024 or (ISO_YEAR eq 2024 and ISO_WEEK ge 52)" in url
+
+    def test_latest_weeks_per_country(self):
+        records = [
+            {"country_code": "US", "iso_year": 2024, "iso_week": 52},
+            {"country_code": "US", "iso_year": 2025, "iso_week": 2},
+            {"country_code": "US", "iso_year": 2025, "iso_week": 1},
+            {"country_code": "GB", "iso_year": 2024, "iso_week": 40},
+        ]
+        assert flunet._latest_weeks(records) == {"US": (2025, 2), "GB": (2024, 40)}
+
+    def test_revision_floors_subtract_lookback(self):
+        floors = flunet._revision_floors({"US": (2025, 10), "GB": (2025, 2)}, lookback_weeks=4)
+        assert floors == {"US": date(2025, 2, 3), "GB": date(2024, 12, 9)}
+
+    async def test_load_watermarks(self, db_session):
+        db_session.add_all(
+            [
+                IngestionState(source="who_flunet", country_code="US", last_iso_year=2025, last_iso_week=9),
+                IngestionState(source="other", country_code="US", last_iso_year=2020, last_iso_week=1),
+            ]
+        )
+        await db_session.commit()
+
+        assert await flunet._load_watermarks("who_flunet") == {"US": (2025, 9)}
+
+    async def test_delta_requests_from_oldest_floor_and_filters_per_country(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+
+        async def fake_watermarks(source):
+            # DE stopped reporting a year ago
+            return {"US": (2025, 8), "GB": (2025, 6), "DE": (2024, 8)}
+
+        requested = []
+
+        async def fake_fetch(start):
+            requested.append(start)
+            records = [
+                {"country_code": "US", "time": date(2025, 1, 13)},  # before US floor (2025-01-20)
+                {"country_code": "US", "time": date(2025, 2, 3)},
+                {"country_code": "GB", "time": date(2025, 1, 6)},
+                {"country_code": "FR", "time": date(2025, 1, 6)},  # no watermark yet
+                {"country_code": "DE", "time": date(2025, 2, 10)},  # reporting again
+            ]
+            return records, []
+
+        upserted = []
+
+        async def fake_upsert(records):
+            upserted.extend(records)
+
+        monkeypatch.setattr(flunet, "_load_watermarks", fake_watermarks)
+        monkeypatch.setattr(flunet, "_fetch_since", fake_fetch)
+        monkeypatch.setattr(flunet, "_upsert_records", fake_upsert)
+
+        await flunet.ingest_flunet_delta(lookback_weeks=4)
+
+        # The stale DE watermark does not widen the window beyond GB's floor
+        assert requested == [date(2025, 1, 6)]
+        assert [(r["country_code"], r["time"]) for r in upserted] == [
+            ("US", date(2025, 2, 3)),
+            ("GB", date(2025, 1, 6)),
+            ("FR", date(2025, 1, 6)),
+            ("DE", date(2025, 2, 10)),
+        ]
+
+    async def test_delta_catches_up_when_every_watermark_is_old(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+
+        async def fake_watermarks(source):
+            # Ingestion was down since autumn; nobody is stale relative to the others
+            return {"US": (2024, 40), "GB": (2024, 38)}
+
+        requested = []
+
+        async def fake_fetch(start):
+            requested.append(start)
+            return None, []
+
+        monkeypatch.setattr(flunet, "_load_watermarks", fake_watermarks)
+        monkeypatch.setattr(flunet, "_fetch_since", fake_fetch)
+
+        await flunet.ingest_flunet_delta(lookback_weeks=4)
+
+        assert requested == [date(2024, 8, 19)]
+
+    async def test_delta_skips_upsert_when_response_unchanged(self, monkeypatch):
+        monkeypatch.setattr(flunet, "datetime", _FixedDatetime)
+
+        async def fake_watermarks(source):
+            return {"US": (2025, 8)}
+
+        upserted = []
+
+        async def fake_upsert(records):
+            upserted.append(len(records))
+            return UpsertResult(inserted=len(records))
+
+        record = {"ISO2": "US", "ISO_YEAR": 2025, "ISO_WEEK": 8, "AH3": 4}
+        _mock_client_factory(monkeypatch, lambda request: httpx.Response(200, json={"value": [record]}))
+        monkeypatch.setattr(flunet, "_load_watermarks", fake_watermarks)
+        monkeypatch.setattr(flunet, "_upsert_records", fake_upsert)
+
+        assert await flunet.ingest_flunet_delta() == UpsertResult(inserted=1)
+        assert await flunet.ingest_flunet_delta() == UpsertResult()
+        assert upserted == [1]
+
+    async def test_delta_without_watermarks_falls_back_to_window(self, monkeypatch):
+        async def no_watermarks(source):
+            return {}
+
+        calls = []
+
+        async def fake_ingest(weeks_back):
+            calls.append(weeks_back)
+
+        monkeypatch.setattr(flunet, "_load_watermarks", no_watermarks)
+        monkeypatch.setattr(flunet, "ingest_flunet", fake_ingest)
+
+        await flunet.ingest_flunet_delta()
+
+        assert calls == [4]
+
+
+class TestUpsertRecords:
+    def _record(self, cc="US", cases=5):
+        return {
+            "country_code": cc,
+            "region": "",
+            "city": "",
+            "flu_type": "H3N2",
+            "source": "who_flunet",
+            "time": date(2025, 1, 6),
+            "new_cases": cases,
+            "iso_year": 2025,
+            "iso_week": 2,
+        }
+
+    async def _no_watermarks(self, session, source, records):
+        return None
+
+    async def test_update_mode_upserts_changed_counts(self, monkeypatch):
+        calls = []
+
+        async def fake_upsert(session, table, records, constraint, update_columns):
+            calls.append((len(records), constraint, update_columns))
+            return UpsertResult(inserted=1, updated=1)
+
+        monkeypatch.setattr(flunet, "bulk_upsert", fake_upsert)
+        monkeypatch.setattr(flunet, "_advance_watermarks", self._no_watermarks)
+
+        result = await flunet._upsert_records([self._record(), self._record(), self._record("GB")])
+
+        assert calls == [(2, "uq_flu_case", ["new_cases"])]
+        assert result == UpsertResult(inserted=1, updated=1)
+
+    async def test_ignore_mode_reports_unchanged(self, monkeypatch):
+        async def fake_insert(session, table, records, constraint):
+            return 1
+
+        monkeypatch.setattr(flunet.settings, "FLUNET_UPSERT_MODE", "ignore")
+        monkeypatch.setattr(flunet, "bulk_insert", fake_insert)
+        monkeypatch.setattr(flunet, "_advance_watermarks", self._no_watermarks)
+
+        result = await flunet._upsert_records([self._record(), self._record("GB")])
+
+        assert result == UpsertResult(inserted=1, updated=0, unchanged=1)
+
+    async def test_empty_records(self):
+        assert await flunet._upsert_records([]) == UpsertResult()
@@ -1,12 +1,29 @@
 """Tests for ORM models (table creation, unique constraints, basic CRUD)."""
 
 from datetime import date, datetime
+from pathlib import Path
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import MetaData, insert, select, text
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.schema import CreateTable
 
-from app.models import Anomaly, FluCase, GenomicSequence
+from app.models import (
+    CASE_SOURCE_CODES,
+    FLU_TYPE_CODES,
+    Anomaly,
+    CaseSource,
+    CodedEnum,
+    FluCase,
+    FluType,
+    FluTypeCode,
+    GenomicSequence,
+    flu_case_table,
+)
+from app.services.codes import seed_codes
+from app.services.rollup import weekly_totals
 
 
 @pytest.mark.asyncio
@@ -87,3 +104,61 @@ async def test_anomaly_insert(db_session):
     rows = list(result.scalars())
     assert len(rows) == 1
     assert rows[0].severity == "medium"
+
+
+def test_coded_enum_round_trips_members_names_and_values():
+    codes = CodedEnum(FluType)
+
+    assert codes.process_bind_param(FluType.B_YAMAGATA, None) == 5
+    assert codes.process_bind_param("B_YAMAGATA", None) == 5
+    assert codes.process_bind_param("B/Yamagata", None) == 5
+    assert codes.process_result_value(5, None) is FluType.B_YAMAGATA
+    assert CASE_SOURCE_CODES.process_result_value(1, None) == "who_flunet"
+    with pytest.raises(ValueError):
+        CASE_SOURCE_CODES.process_bind_param("other", None)
+
+
+def test_compact_migration_uses_the_model_codes():
+    sql = (Path(__file__).resolve().parent.parent / "migrations" / "compact_flu_cases.sql").read_text()
+    for codes in (FLU_TYPE_CODES, CASE_SOURCE_CODES):
+        for row in codes.rows():
+            assert f"({row['code']}, '{row['name']}')" in sql
+            assert f"WHEN '{row['name']}' THEN {row['code']}" in sql
+
+
+def test_compact_flu_cases_ddl():
+    ddl = str(CreateTable(flu_case_table(MetaData(), compact=True)).compile(dialect=postgresql.dialect()))
+
+    assert "flu_type SMALLINT NOT NULL" in ddl
+    assert "source SMALLINT NOT NULL" in ddl
+    assert "UNIQUE NULLS NOT DISTINCT (time, flu_type, source, country_code, region, city)" in ddl
+
+
+@pytest.mark.asyncio
+async def test_compact_flu_cases_store_codes_and_nulls():
+    compact = flu_case_table(MetaData(), compact=True)
+    week = date(2025, 1, 6)
+    row = {"country_code": "US", "source": "who_flunet", "time": week, "iso_year": 2025, "iso_week": 2}
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(compact.create)
+        await conn.run_sync(FluTypeCode.__table__.create)
+        await conn.run_sync(CaseSource.__table__.create)
+        await seed_codes(conn)
+        await conn.execute(
+            insert(compact),
+            [
+                {**row, "region": "", "city": "", "flu_type": "B/Yamagata", "new_cases": 3},
+                {**row, "region": "CA", "city": "", "flu_type": FluType.B_YAMAGATA, "new_cases": 4},
+                {**row, "region": "", "city": "", "flu_type": "H3N2", "new_cases": 5},
+            ],
+        )
+
+        raw = await conn.execute(text("SELECT region, flu_type, source FROM flu_cases ORDER BY id"))
+        assert raw.all() == [(None, 5, 1), ("CA", 5, 1), (None, 2, 1)]
+        typed = await conn.execute(select(compact.c.region, compact.c.flu_type).order_by(compact.c.id))
+        assert typed.all() == [("", FluType.B_YAMAGATA), ("CA", FluType.B_YAMAGATA), ("", FluType.H3N2)]
+        # The rollup reads compact rows back as the names flu_cases_weekly stores
+        totals = await conn.execute(weekly_totals(compact).order_by(compact.c.flu_type))
+        assert totals.all() == [(week, "US", "H3N2", 5), (week, "US", "B_YAMAGATA", 7)]
+    await engine.dispose()
@@ -1,32 +1,41 @@
-"""Tests for the _per_100k helper in the cases router."""
+"""Tests for the per_100k helper and its SQL counterpart."""
 
-from app.population import DEFAULT_POPULATION, POPULATIONS
-from app.routers.cases import _per_100k
+import pytest
+
+from app.population import DEFAULT_POPULATION, POPULATIONS, per_100k
 
 
 def test_known_country():
-    result = _per_100k(1000, "US")
-    expected = round(1000 / POPULATIONS["US"] * 100000, 2)
+    result = per_100k(1000, "US")
+    expected = 1000 / POPULATIONS["US"] * 100000
     assert result == expected
 
 
 def test_unknown_country_uses_default():
-    result = _per_100k(1000, "ZZ")
-    expected = round(1000 / DEFAULT_POPULATION * 100000, 2)
+    result = per_100k(1000, "ZZ")
+    expected = 1000 / DEFAULT_POPULATION * 100000
     assert result == expected
 
 
 def test_zero_cases():
-    assert _per_100k(0, "US") == 0.0
+    assert per_100k(0, "US") == 0.0
 
 
 def test_small_country_dataset_entry_is_used():
-    result = _per_100k(1000, "LU")
-    expected = round(1000 / POPULATIONS["LU"] * 100000, 2)
+    result = per_100k(1000, "LU")
+    expected = 1000 / POPULATIONS["LU"] * 100000
     assert result == expected
 
 
 def test_large_case_count():
-    result = _per_100k(1_000_000, "US")
+    result = per_100k(1_000_000, "US")
     assert result > 0
     assert isinstance(result, float)
+
+
+@pytest.mark.asyncio
+async def test_map_rates_come_from_the_countries_table(client, seed_flu_cases):
+    data = (await client.get("/api/cases/map")).json()
+    assert [p["country_code"] for p in data] == ["GB", "US"]  # highest incidence first
+    for point in data:
+        assert point["per_100k"] == round(per_100k(point["total_cases"], point["country_code"]), 2)
@@ -0,0 +1,91 @@
+"""EXPLAIN-based regression tests: the read queries must keep using their indexes."""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.models import FluCase, FluCaseWeekly, GenomicSequence
+from app.services import shadow
+from tests.conftest import engine
+
+
+def _index(table, name):
+    return next(i for i in table.indexes if i.name == name)
+
+
+@pytest.mark.parametrize(
+    "table, name, expected",
+    [
+        (
+            FluCaseWeekly.__table__,
+            "ix_flu_cases_weekly_time_covering",
+            "ON flu_cases_weekly (time) INCLUDE (country_code, flu_type, new_cases)",
+        ),
+        (FluCaseWeekly.__table__, "ix_flu_cases_weekly_country_time", "ON flu_cases_weekly (country_code, time)"),
+        (
+            FluCase.__table__,
+            "ix_flu_cases_time_covering",
+            "ON flu_cases (time) INCLUDE (country_code, flu_type, new_cases)",
+        ),
+        (
+            GenomicSequence.__table__,
+            "ix_genomic_sequences_collection_date_covering",
+            "ON genomic_sequences (collection_date) INCLUDE (clade, country_code, count)",
+        ),
+    ],
+)
+def test_postgres_index_ddl(table, name, expected):
+    assert expected in str(CreateIndex(_index(table, name)).compile(dialect=postgresql.dialect()))
+
+
+def test_no_single_column_index_duplicates_a_covering_one():
+    for table in (FluCase.__table__, FluCaseWeekly.__table__, GenomicSequence.__table__):
+        # Covering indexes have a single key column too (INCLUDE columns are not keys)
+        keys = [i.columns[0].name for i in table.indexes if len(i.columns) == 1]
+        assert len(keys) == len(set(keys)), table.name
+
+
+def test_shadow_indexes_keep_included_columns():
+    table = FluCaseWeekly.__table__
+    indexes = shadow._shadow_indexes(table, shadow.build_shadow_table(table))
+    ddl = [str(CreateIndex(i).compile(dialect=postgresql.dialect())) for i in indexes]
+    assert any("INCLUDE (country_code, flu_type, new_cases)" in d for d in ddl)
+
+
+async def _plans(client, path) -> dict[str, str]:
+    """EXPLAIN QUERY PLAN of every statement ``path`` runs, keyed by statement."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        assert (await client.get(path)).status_code == 200
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    plans = {}
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans[statement] = "\n".join(r[-1] for r in rows)
+    return plans
+
+
+@pytest.mark.asyncio
+async def test_country_history_uses_country_time_index(client, seed_flu_cases):
+    plans = await _plans(client, "/api/cases/historical?country=US")
+    [plan] = [p for s, p in plans.items() if "country_code = " in s]
+    assert "USING INDEX ix_flu_cases_weekly_country_time (country_code=?)" in plan
+
+
+@pytest.mark.asyncio
+async def test_genomic_trends_use_collection_date_index(client, seed_genomic_sequences):
+    plans = await _plans(client, "/api/genomics/trends")
+    windowed = [p for s, p in plans.items() if "collection_date >=" in s]
+    assert len(windowed) == 2
+    for plan in windowed:
+        assert "USING INDEX ix_genomic_sequences_collection_date_covering (collection_date>?)" in plan
@@ -1,4 +1,13 @@
+from contextlib import asynccontextmanager
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app import scheduler
 from app.scheduler import create_scheduler
+from app.services import anomaly, flunet, http_cache, nextstrain, partitions, rollup, shadow
+from app.services.bulk import UpsertResult
 
 
 def test_create_scheduler_has_expected_jobs():
@@ -8,4 +17,204 @@ def test_create_scheduler_has_expected_jobs():
     job_ids = {job.id for job in jobs}
 
     assert len(jobs) == 3
-    assert job_ids == {"who_flunet", "anomaly_detection", "full_daily_rebuild"}
+    assert job_ids == {"who_flunet", "anomaly_detection", "flu_case_partitions"}
+
+
+def test_create_scheduler_full_rebuild_is_opt_in(monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "FULL_REBUILD_ENABLED", True)
+
+    job_ids = {job.id for job in create_scheduler().get_jobs()}
+
+    assert job_ids == {"who_flunet", "anomaly_detection", "flu_case_partitions", "full_daily_rebuild"}
+
+
+@pytest.fixture
+def rebuild_calls(monkeypatch):
+    calls = []
+
+    async def fake_create(conn, table):
+        calls.append(("create", table.name))
+        return shadow.build_shadow_table(table)
+
+    async def fake_indexes(conn, table, shadow_table):
+        calls.append(("indexes", table.name))
+
+    async def fake_drop(conn, table):
+        calls.append(("drop", table.name))
+
+    async def fake_swap(conn, tables):
+        calls.append(("swap", [t.name for t in tables]))
+
+    async def fake_detect():
+        calls.append(("detect",))
+
+    monkeypatch.setattr(shadow, "create_shadow_table", fake_create)
+    monkeypatch.setattr(shadow, "build_shadow_indexes", fake_indexes)
+    monkeypatch.setattr(shadow, "drop_shadow_table", fake_drop)
+    monkeypatch.setattr(shadow, "swap_shadow_tables", fake_swap)
+    monkeypatch.setattr(anomaly, "detect_anomalies", fake_detect)
+    monkeypatch.setattr(http_cache.response_cache, "mark_processed", lambda r: calls.append(("processed", r)))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_full_rebuild_loads_shadows_and_swaps(monkeypatch, rebuild_calls):
+    async def fake_flunet(table):
+        rebuild_calls.append(("load", table.name))
+        return 10, ["flunet page"]
+
+    async def fake_nextstrain(table):
+        rebuild_calls.append(("load", table.name))
+        return 5, ["nextstrain dataset"]
+
+    monkeypatch.setattr(flunet, "load_flunet_full", fake_flunet)
+    monkeypatch.setattr(nextstrain, "load_nextstrain", fake_nextstrain)
+
+    await scheduler._run_full_rebuild()
+
+    assert rebuild_calls == [
+        ("create", "flu_cases"),
+        ("load", "flu_cases_shadow"),
+        ("indexes", "flu_cases"),
+        ("create", "genomic_sequences"),
+        ("load", "genomic_sequences_shadow"),
+        ("indexes", "genomic_sequences"),
+        ("swap", ["flu_cases", "genomic_sequences"]),
+        # Only once the swap has committed
+        ("processed", ["flunet page", "nextstrain dataset"]),
+        ("detect",),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_full_rebuild_keeps_live_table_when_a_load_fails(monkeypatch, rebuild_calls):
+    async def failing_flunet(table):
+        raise RuntimeError("WHO API down")
+
+    async def empty_nextstrain(table):
+        return 0, []
+
+    monkeypatch.setattr(flunet, "load_flunet_full", failing_flunet)
+    monkeypatch.setattr(nextstrain, "load_nextstrain", empty_nextstrain)
+
+    await scheduler._run_full_rebuild()
+
+    assert ("drop", "flu_cases") in rebuild_calls
+    assert ("drop", "genomic_sequences") in rebuild_calls
+    assert not any(call[0] in ("swap", "processed") for call in rebuild_calls)
+    assert rebuild_calls[-1] == ("detect",)
+
+
+class _PostgresEngine:
+    dialect = SimpleNamespace(name="postgresql")
+
+    @asynccontextmanager
+    async def begin(self):
+        yield None
+
+
+@pytest.mark.parametrize("rows", [53, 0])
+@pytest.mark.asyncio
+async def test_year_rebuild_swaps_one_partition(monkeypatch, rows):
+    calls = []
+
+    async def fake_create(conn, table, year):
+        calls.append(("create", year))
+        return shadow.build_partition_shadow(table, year)
+
+    async def fake_load(year, table):
+        calls.append(("load", table.name))
+        return rows, ["page"]
+
+    async def fake_indexes(conn, table, shadow_table, year):
+        calls.append(("indexes", year))
+
+    async def fake_drop(conn, table, year):
+        calls.append(("drop", year))
+
+    async def fake_swap(conn, table, year):
+        calls.append(("swap", year))
+
+    async def fake_rollup(conn, weeks):
+        calls.append(("rollup", weeks[0], weeks[-1], len(weeks)))
+
+    async def fake_snapshot():
+        calls.append(("snapshot",))
+
+    async def fake_detect():
+        calls.append(("detect",))
+
+    async def fake_is_partitioned(conn, table):
+        return True
+
+    monkeypatch.setattr(scheduler, "engine", _PostgresEngine())
+    monkeypatch.setattr(partitions, "is_partitioned", fake_is_partitioned)
+    monkeypatch.setattr(shadow, "create_partition_shadow", fake_create)
+    monkeypatch.setattr(shadow, "build_partition_shadow_indexes", fake_indexes)
+    monkeypatch.setattr(shadow, "drop_partition_shadow", fake_drop)
+    monkeypatch.setattr(shadow, "swap_partition", fake_swap)
+    monkeypatch.setattr(flunet, "load_flunet_year", fake_load)
+    monkeypatch.setattr(rollup, "refresh_weekly_rollup", fake_rollup)
+    monkeypatch.setattr(scheduler, "refresh_snapshot", fake_snapshot)
+    monkeypatch.setattr(anomaly, "detect_anomalies", fake_detect)
+    monkeypatch.setattr(http_cache.response_cache, "mark_processed", lambda r: calls.append(("processed", r)))
+
+    await scheduler._run_full_rebuild(year=2020)
+
+    if rows:
+        assert calls == [
+            ("create", 2020),
+            ("load", "flu_cases_y2020_shadow"),
+            ("indexes", 2020),
+            ("swap", 2020),
+            # ISO 2020 has 53 weeks
+            ("rollup", date(2019, 12, 30), date(2020, 12, 28), 53),
+            ("processed", ["page"]),
+            ("snapshot",),
+            ("detect",),
+        ]
+    else:
+        assert calls == [("create", 2020), ("load", "flu_cases_y2020_shadow"), ("drop", 2020)]
+
+
+@pytest.mark.asyncio
+async def test_year_rebuild_needs_postgres(monkeypatch):
+    async def fail(*args):
+        raise AssertionError("should not load")
+
+    monkeypatch.setattr(flunet, "load_flunet_year", fail)
+    await scheduler._run_full_rebuild(year=2024)
+
+
+@pytest.mark.asyncio
+async def test_year_rebuild_needs_a_partitioned_table(monkeypatch):
+    async def fail(*args):
+        raise AssertionError("should not rebuild")
+
+    async def plain(conn, table):
+        return False
+
+    monkeypatch.setattr(scheduler, "engine", _PostgresEngine())
+    monkeypatch.setattr(partitions, "is_partitioned", plain)
+    monkeypatch.setattr(shadow, "create_partition_shadow", fail)
+    monkeypatch.setattr(flunet, "load_flunet_year", fail)
+    await scheduler._run_full_rebuild(year=2024)
+
+
+@pytest.mark.parametrize("result,expected_runs", [(UpsertResult(updated=2), 1), (UpsertResult(unchanged=9), 0)])
+@pytest.mark.asyncio
+async def test_who_flunet_job_runs_anomaly_detection_only_on_change(monkeypatch, result, expected_runs):
+    runs = []
+
+    async def fake_delta():
+        return result
+
+    async def fake_detect():
+        runs.append(True)
+
+    monkeypatch.setattr(flunet, "ingest_flunet_delta", fake_delta)
+    monkeypatch.setattr(anomaly, "detect_anomalies", fake_detect)
+
+    await scheduler._run_who_flunet_job()
+
+    assert len(runs) == expected_runs
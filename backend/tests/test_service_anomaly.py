@@ -99,6 +99,7 @@ async def test_detect_anomalies_creates_high_severity_spike(monkeypatch):
 
     created = session.added[0]
     assert created.country_code == "US"
+    assert created.country_name == "United States"
     assert created.severity == "high"
     assert created.anomaly_type == "spike"
     assert "5.0x std above mean" in created.message
@@ -0,0 +1,109 @@
+"""Tests for recording upstream payloads and replaying them offline."""
+
+import httpx
+import pytest
+
+from app.services import archive, flunet
+from app.services.archive import PayloadArchive, RecordingTransport, ReplayTransport, source_clock, upstream_client
+
+URL = "https://example.test/data.json?page=1"
+
+
+@pytest.fixture
+def payloads(tmp_path):
+    return PayloadArchive(tmp_path / "archive")
+
+
+async def _record(payloads, handler, *urls) -> list[bytes]:
+    transport = RecordingTransport(payloads, httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        return [(await client.get(url)).content for url in urls]
+
+
+async def test_records_bodies_content_addressed(payloads):
+    def handler(request):
+        return httpx.Response(
+            200, content=b'{"value": []}', headers={"ETag": '"v1"', "Content-Type": "application/json"}
+        )
+
+    bodies = await _record(payloads, handler, URL, "https://example.test/other.json")
+
+    assert bodies == [b'{"value": []}'] * 2
+    assert len(list(payloads.directory.glob("blobs/*/*.gz"))) == 1
+    entry = PayloadArchive(payloads.directory).lookup(URL)
+    assert entry["status"] == 200
+    assert entry["headers"] == {"etag": '"v1"', "content-type": "application/json"}
+    assert payloads.recorded_at is not None
+
+
+async def test_recording_strips_validators_and_skips_errors(payloads):
+    sent = []
+
+    def handler(request):
+        sent.append(request.headers.get("if-none-match"))
+        return httpx.Response(503 if "fail" in str(request.url) else 200, content=b"[1]")
+
+    transport = RecordingTransport(payloads, httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        await client.get(URL, headers={"If-None-Match": '"old"'})
+        assert (await client.get("https://example.test/fail")).status_code == 503
+
+    assert sent == [None, None]
+    assert payloads.lookup("https://example.test/fail") is None
+
+
+async def test_replay_serves_archive_and_honours_validators(payloads):
+    await _record(payloads, lambda request: httpx.Response(200, content=b"[1, 2]", headers={"ETag": '"v1"'}), URL)
+
+    async with httpx.AsyncClient(transport=ReplayTransport(PayloadArchive(payloads.directory))) as client:
+        response = await client.get(URL)
+        assert response.content == b"[1, 2]"
+        assert (await client.get(URL, headers={"If-None-Match": '"v1"'})).status_code == 304
+        with pytest.raises(LookupError, match="not in the payload archive"):
+            await client.get("https://example.test/missing")
+
+
+def test_upstream_client_follows_ingest_source(monkeypatch, tmp_path):
+    monkeypatch.setattr(archive.settings, "INGEST_ARCHIVE_DIR", str(tmp_path))
+    for mode, transport in [("record", RecordingTransport), ("replay", ReplayTransport)]:
+        monkeypatch.setattr(archive.settings, "INGEST_SOURCE", mode)
+        assert isinstance(upstream_client(timeout=5)._transport, transport)
+
+    monkeypatch.setattr(archive.settings, "INGEST_SOURCE", "live")
+    assert isinstance(upstream_client(timeout=5)._transport, httpx.AsyncHTTPTransport)
+    assert source_clock() is None
+
+    monkeypatch.setattr(archive.settings, "INGEST_SOURCE", "carrier-pigeon")
+    with pytest.raises(ValueError):
+        upstream_client(timeout=5)
+
+
+async def test_flunet_backfill_replays_recorded_run(monkeypatch, tmp_path):
+    monkeypatch.setattr(archive.settings, "INGEST_ARCHIVE_DIR", str(tmp_path / "archive"))
+
+    def handler(request):
+        url = str(request.url)
+        if "page=2" in url:
+            return httpx.Response(200, json={"value": [{"ISO2": "XS", "ISO_YEAR": 2024, "ISO_WEEK": 5, "AH3": 7}]})
+        return httpx.Response(
+            200,
+            json={
+                "value": [{"ISO2": "XE", "ISO_YEAR": 2024, "ISO_WEEK": 5, "AH3": 3}],
+                "@odata.nextLink": "https://example.test/next?page=2",
+            },
+        )
+
+    monkeypatch.setattr(archive, "_live_transport", lambda limits: httpx.MockTransport(handler))
+    monkeypatch.setattr(archive.settings, "INGEST_SOURCE", "record")
+    recorded = [b async for b in flunet.stream_flunet_full(years_back=1, concurrency=1, force=True)]
+
+    def offline(limits):
+        raise AssertionError("replay must not open a network transport")
+
+    monkeypatch.setattr(archive, "_live_transport", offline)
+    monkeypatch.setattr(archive.settings, "INGEST_SOURCE", "replay")
+    assert source_clock() == PayloadArchive(tmp_path / "archive").recorded_at
+    replayed = [b async for b in flunet.stream_flunet_full(years_back=1, concurrency=1, force=True)]
+
+    assert replayed == recorded
+    assert len(recorded) == 2
@@ -0,0 +1,135 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import MetaData
+from sqlalchemy.dialects import postgresql
+
+from app.models import FluCase, GenomicSequence, flu_case_table
+from app.services import bulk
+from app.services.partitions import partitioned_table
+
+
+def test_load_columns_skip_autoincrement_id():
+    columns = bulk._load_columns(FluCase.__table__)
+    assert "id" not in columns
+    assert columns[0] == "country_code"
+    assert "new_cases" in columns
+
+
+def test_load_columns_keep_partition_key_of_composite_primary_key():
+    columns = bulk._load_columns(partitioned_table(FluCase.__table__))
+    assert "id" not in columns
+    assert "time" in columns
+
+
+def test_row_tuples_apply_bind_processing_and_defaults():
+    table = FluCase.__table__
+    columns = bulk._load_columns(table)
+    records = [
+        {
+            "country_code": "US",
+            "flu_type": "B/Yamagata",
+            "time": date(2025, 1, 6),
+            "new_cases": 5,
+            "iso_year": 2025,
+            "iso_week": 2,
+        }
+    ]
+
+    (row,) = list(bulk._row_tuples(table, columns, records, postgresql.asyncpg.dialect()))
+    values = dict(zip(columns, row))
+
+    # Non-native enums are stored by member name, exactly as an ORM insert would
+    assert values["flu_type"] == "B_YAMAGATA"
+    assert values["region"] == ""
+    assert values["source"] == "who_flunet"
+    assert values["time"] == date(2025, 1, 6)
+
+
+def test_row_tuples_encode_the_compact_layout():
+    table = flu_case_table(MetaData(), compact=True)
+    columns = bulk._load_columns(table)
+    records = [{"country_code": "US", "flu_type": "B/Yamagata", "time": date(2025, 1, 6), "new_cases": 5}]
+
+    (row,) = list(bulk._row_tuples(table, columns, records, postgresql.asyncpg.dialect()))
+    values = dict(zip(columns, row))
+
+    # COPY sends the SMALLINT codes and NULL for "no region/city"
+    assert (values["flu_type"], values["source"]) == (5, 1)
+    assert (values["region"], values["city"]) == (None, None)
+
+
+def test_row_tuples_genomic_defaults():
+    table = GenomicSequence.__table__
+    columns = bulk._load_columns(table)
+    records = [{"country_code": "US", "clade": "2a", "collection_date": date(2025, 1, 1)}]
+
+    (row,) = list(bulk._row_tuples(table, columns, records, postgresql.asyncpg.dialect()))
+
+    assert dict(zip(columns, row)) == {
+        "country_code": "US",
+        "clade": "2a",
+        "lineage": "",
+        "collection_date": date(2025, 1, 1),
+        "count": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_falls_back_to_insert_batches_off_postgres(db_session, monkeypatch):
+    calls = []
+
+    async def fake_insert_batches(session, table, records, constraint):
+        calls.append((table.name, len(records), constraint))
+        return len(records)
+
+    async def fail_copy(*args, **kwargs):
+        raise AssertionError("COPY path must not be used on SQLite")
+
+    monkeypatch.setattr(bulk.settings, "BULK_LOAD_METHOD", "copy")
+    monkeypatch.setattr(bulk, "insert_batches", fake_insert_batches)
+    monkeypatch.setattr(bulk, "copy_insert", fail_copy)
+
+    inserted = await bulk.bulk_insert(db_session, FluCase.__table__, [{"country_code": "US"}], "uq_flu_case")
+
+    assert inserted == 1
+    assert calls == [("flu_cases", 1, "uq_flu_case")]
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_empty_is_noop(db_session):
+    assert await bulk.bulk_insert(db_session, FluCase.__table__, [], "uq_flu_case") == 0
+
+
+def test_upsert_result_counts_and_addition():
+    result = bulk._count_flags([True, False, True], total=5)
+    assert result == bulk.UpsertResult(inserted=2, updated=1, unchanged=2)
+    assert result.changed == 3
+    assert result + bulk.UpsertResult(1, 1, 1) == bulk.UpsertResult(3, 2, 3)
+
+
+def test_constraint_columns():
+    assert bulk._constraint_columns(GenomicSequence.__table__, "uq_genomic_seq") == [
+        "country_code",
+        "clade",
+        "lineage",
+        "collection_date",
+    ]
+    with pytest.raises(ValueError):
+        bulk._constraint_columns(GenomicSequence.__table__, "missing")
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_uses_batches_off_postgres(db_session, monkeypatch):
+    calls = []
+
+    async def fake_upsert_batches(session, table, records, constraint, update_columns):
+        calls.append((table.name, constraint, update_columns))
+        return bulk.UpsertResult(inserted=len(records))
+
+    monkeypatch.setattr(bulk, "upsert_batches", fake_upsert_batches)
+
+    result = await bulk.bulk_upsert(db_session, FluCase.__table__, [{}, {}], "uq_flu_case", ["new_cases"])
+
+    assert result == bulk.UpsertResult(inserted=2)
+    assert calls == [("flu_cases", "uq_flu_case", ["new_cases"])]
@@ -6,6 +6,7 @@ import pytest
 from app.config import settings
 from app.models import FluCase
 from app.services.forecast import generate_forecast
+from app.services.rollup import refresh_weekly_rollup
 
 
 @pytest.mark.asyncio
@@ -23,6 +24,8 @@ async def test_generate_forecast_requires_minimum_points(db_session):
                 iso_week=1 + i,
             )
         )
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
     await db_session.commit()
 
     out = await generate_forecast(country_code="US", weeks_ahead=4)
@@ -61,6 +64,8 @@ async def test_generate_forecast_exponential_smoothing_output(db_session):
         )
     )
 
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
     await db_session.commit()
 
     out = await generate_forecast(country_code="US", weeks_ahead=3)
@@ -104,6 +109,8 @@ async def test_generate_forecast_uses_configurable_parameters(db_session):
                 iso_week=1 + i,
             )
         )
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
     await db_session.commit()
 
     original_alpha = settings.FORECAST_ALPHA
@@ -0,0 +1,155 @@
+"""Tests for the on-disk upstream response cache."""
+
+import gzip
+import os
+import time
+
+import httpx
+import pytest
+
+from app.services.http_cache import ResponseCache, open_body
+
+URL = "https://example.test/data.json"
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(tmp_path / "cache")
+
+
+async def test_stores_compressed_body_and_revalidates_with_etag(cache):
+    sent = []
+
+    def handler(request):
+        sent.append(dict(request.headers))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=b'{"value": [1, 2, 3]}', headers={"ETag": '"v1"'})
+
+    async with _client(handler) as client:
+        first = await cache.fetch(client, URL)
+        second = await cache.fetch(client, URL)
+
+    assert first.fresh and not second.fresh
+    assert first.digest == second.digest
+    assert "if-none-match" not in sent[0]
+    assert sent[1]["if-none-match"] == '"v1"'
+    with open(first.path, "rb") as fp:
+        assert fp.read(2) == b"\x1f\x8b"
+    with second.open() as fp:
+        assert fp.read() == b'{"value": [1, 2, 3]}'
+
+
+async def test_revalidates_with_last_modified(cache):
+    sent = []
+    modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+    def handler(request):
+        sent.append(request.headers.get("if-modified-since"))
+        if request.headers.get("if-modified-since") == modified:
+            return httpx.Response(304)
+        return httpx.Response(200, content=b"{}", headers={"Last-Modified": modified})
+
+    async with _client(handler) as client:
+        await cache.fetch(client, URL)
+        response = await cache.fetch(client, URL)
+
+    assert sent == [None, modified]
+    assert not response.fresh
+
+
+async def test_unchanged_only_after_mark_processed(cache):
+    body = {"content": b"[1]"}
+
+    def handler(request):
+        return httpx.Response(200, content=body["content"])
+
+    async with _client(handler) as client:
+        first = await cache.fetch(client, URL)
+        assert not first.unchanged
+        cache.mark_processed([first])
+
+        # No validators: the body is downloaded again but its hash matches
+        again = await cache.fetch(client, URL)
+        assert again.fresh and again.unchanged
+
+        body["content"] = b"[2]"
+        changed = await cache.fetch(client, URL)
+        assert not changed.unchanged
+
+
+async def test_annotations_are_dropped_when_content_changes(cache):
+    body = {"content": b"[1]"}
+
+    async with _client(lambda request: httpx.Response(200, content=body["content"])) as client:
+        response = await cache.fetch(client, URL)
+        cache.annotate(response, next_link="https://example.test/page2")
+        assert (await cache.fetch(client, URL)).meta["next_link"] == "https://example.test/page2"
+
+        body["content"] = b"[2]"
+        assert "next_link" not in (await cache.fetch(client, URL)).meta
+
+
+async def test_disabled_cache_never_sends_validators_or_reports_unchanged(cache, monkeypatch):
+    from app.services import http_cache
+
+    monkeypatch.setattr(http_cache.settings, "HTTP_CACHE_ENABLED", False)
+    sent = []
+
+    def handler(request):
+        sent.append(request.headers.get("if-none-match"))
+        return httpx.Response(200, content=b"[]", headers={"ETag": '"x"'})
+
+    async with _client(handler) as client:
+        response = await cache.fetch(client, URL)
+        cache.mark_processed([response])
+        response = await cache.fetch(client, URL)
+
+    assert sent == [None, None]
+    assert not response.unchanged
+
+
+async def test_error_status_raises_and_keeps_previous_body(cache):
+    status = {"code": 200}
+
+    def handler(request):
+        return httpx.Response(status["code"], content=b"[1]")
+
+    async with _client(handler) as client:
+        response = await cache.fetch(client, URL)
+        status["code"] = 503
+        with pytest.raises(httpx.HTTPStatusError):
+            await cache.fetch(client, URL)
+
+    with response.open() as fp:
+        assert fp.read() == b"[1]"
+    assert not list(cache.directory.glob("*.tmp"))
+
+
+def test_prune_removes_stale_entries(cache):
+    cache.directory.mkdir(parents=True)
+    stale = cache.directory / "old.gz"
+    fresh = cache.directory / "new.gz"
+    stale.write_bytes(b"x")
+    fresh.write_bytes(b"y")
+    old = time.time() - 10 * 86400
+    os.utime(stale, (old, old))
+
+    assert cache.prune(86400) == 1
+    assert not stale.exists() and fresh.exists()
+
+
+def test_open_body_reads_plain_and_gzip_files(tmp_path):
+    plain = tmp_path / "plain.json"
+    plain.write_bytes(b"[1]")
+    packed = tmp_path / "packed.gz"
+    packed.write_bytes(gzip.compress(b"[2]"))
+
+    with open_body(plain) as fp:
+        assert fp.read() == b"[1]"
+    with open_body(packed) as fp:
+        assert fp.read() == b"[2]"
@@ -1,12 +1,36 @@
+import asyncio
+import json
 from datetime import date
 
+import httpx
 import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.models import GenomicSequence
+from app.services import http_cache, nextstrain
+from app.services.bulk import UpsertResult
+from app.services.nextstrain import (
+    NEXTSTRAIN_URL,
+    dataset_lineage,
+    dataset_url,
+    normalize_country_code,
+    parse_nextstrain_file,
+)
+from app.services.shadow import create_shadow_table
+from tests.conftest import engine
+
 
-from app.services.nextstrain import NEXTSTRAIN_URL, _walk_tree, normalize_country_code
+def test_nextstrain_datasets_use_at_least_10_year_window():
+    assert settings.NEXTSTRAIN_DATASETS
+    assert all(dataset.endswith("/12y") for dataset in settings.NEXTSTRAIN_DATASETS)
 
 
-def test_nextstrain_dataset_uses_at_least_10_year_window():
-    assert "/12y" in NEXTSTRAIN_URL
+def test_dataset_url_and_lineage():
+    assert dataset_url("/flu/seasonal/h3n2/ha/12y") == NEXTSTRAIN_URL.format(dataset="flu/seasonal/h3n2/ha/12y")
+    assert dataset_lineage("flu/seasonal/h1n1pdm/na/6y") == "h1n1pdm"
+    assert dataset_lineage("flu/seasonal/vic/ha/12y") == "vic"
+    assert dataset_lineage("avian-flu/h5n1/ha") == "avian-flu"
 
 
 # --- normalize_country_code tests ---
@@ -70,10 +94,17 @@ def test_normalize_strips_whitespace():
     assert normalize_country_code("  Canada  ") == "CA"
 
 
-# --- _walk_tree tests ---
+# --- tree parsing tests ---
+
 
+def _parse_tree(tmp_path, tree: dict) -> list[dict]:
+    path = tmp_path / "auspice.json"
+    path.write_text(json.dumps({"tree": tree}))
+    records, _ = parse_nextstrain_file(str(path))
+    return records
 
-def test_walk_tree_collects_valid_nodes_recursively():
+
+def test_parse_collects_valid_tips(tmp_path):
     tree = {
         "node_attrs": {
             "country": {"value": "United States"},
@@ -100,22 +131,14 @@ def test_walk_tree_collects_valid_nodes_recursively():
         ],
     }
 
-    records = []
-    _walk_tree(tree, records)
-
-    assert len(records) == 2
-
-    first, second = records
-    assert first["country_code"] == "US"
-    assert first["clade"] == "2a.3a.1"
-    assert first["collection_date"] == date(2024, 1, 1)
+    # The root is an internal (inferred) node, so only the GB tip is kept
+    assert _parse_tree(tmp_path, tree) == [
+        # clade falls back to subclade
+        {"country_code": "GB", "clade": "2a.3", "lineage": "", "collection_date": date(2023, 1, 1), "count": 1}
+    ]
 
-    assert second["country_code"] == "GB"
-    assert second["clade"] == "2a.3"  # falls back to subclade
-    assert second["collection_date"] == date(2023, 1, 1)
 
-
-def test_walk_tree_skips_unknown_country():
+def test_parse_skips_unknown_country(tmp_path):
     tree = {
         "node_attrs": {
             "country": {"value": "Atlantis"},
@@ -125,13 +148,10 @@ def test_walk_tree_skips_unknown_country():
         "children": [],
     }
 
-    records = []
-    _walk_tree(tree, records)
-
-    assert records == []
+    assert _parse_tree(tmp_path, tree) == []
 
 
-def test_walk_tree_skips_invalid_num_date():
+def test_parse_skips_invalid_num_date(tmp_path):
     tree = {
         "node_attrs": {
             "country": {"value": "US"},
@@ -140,7 +160,266 @@ def test_walk_tree_skips_invalid_num_date():
         }
     }
 
-    records = []
-    _walk_tree(tree, records)
+    assert _parse_tree(tmp_path, tree) == []
+
+
+# --- streaming parser tests ---
+
+
+def _node(country, clade, num_date, children=()):
+    return {
+        "name": f"{country}/{num_date}",
+        "branch_attrs": {"mutations": {"HA1": ["K1N"]}, "labels": {"clade": clade}},
+        "node_attrs": {
+            "div": 0.01,
+            "country": {"value": country, "confidence": {country: 0.9}},
+            "clade_membership": {"value": clade},
+            "num_date": {"value": num_date, "confidence": [num_date - 0.1, num_date + 0.1]},
+        },
+        "children": list(children),
+    }
+
+
+AUSPICE = {
+    "version": "v2",
+    "meta": {"title": "h3n2", "colorings": [{"key": "country"}], "tree": {"not": "a node"}},
+    "tree": _node(
+        "USA",
+        "2a",
+        2023.5,
+        [
+            _node("USA", "2a", 2023.5),
+            _node("Japan", "2a.1", 2024.25, [_node("Atlantis", "2a.1", 2024.3), _node("Japan", "2a.1", 2024.25)]),
+            {"name": "no-attrs", "children": [_node("Kenya", "2a.3", 2024.75)]},
+            _node("FR", "", 2024.0),
+        ],
+    ),
+}
+
+
+def test_parse_nextstrain_file_counts_each_tip_once(tmp_path):
+    path = tmp_path / "auspice.json"
+    path.write_text(json.dumps(AUSPICE))
+
+    records, tips = parse_nextstrain_file(str(path))
+
+    # Internal USA and Japan nodes are not counted again; Atlantis and the clade-less FR tip are skipped
+    assert [(r["country_code"], r["clade"], r["collection_date"], r["count"]) for r in records] == [
+        ("US", "2a", date(2023, 7, 2), 1),
+        ("JP", "2a.1", date(2024, 4, 1), 1),
+        ("KE", "2a.3", date(2024, 9, 30), 1),
+    ]
+    assert tips == 5
+
+
+def test_parse_nextstrain_file_handles_deep_trees(tmp_path):
+    depth = 20000
+    path = tmp_path / "deep.json"
+    leaf = json.dumps(_node("GB", "2a", 2024.0))
+    path.write_text('{"tree": ' + '{"children": [' * depth + leaf + "]}" * depth + "}")
+
+    records, tips = parse_nextstrain_file(str(path))
+
+    assert tips == 1
+    assert [r["country_code"] for r in records] == ["GB"]
+
+
+def test_parse_nextstrain_file_skips_internal_nodes_listing_children_first(tmp_path):
+    internal = _node("USA", "2a", 2024.0)
+    internal["children"] = [_node("GB", "2a", 2024.0)]
+    # Key order is not guaranteed: node_attrs may follow children
+    reordered = {"children": internal["children"], "node_attrs": internal["node_attrs"]}
+    path = tmp_path / "auspice.json"
+    path.write_text(json.dumps({"tree": reordered}))
+
+    records, tips = parse_nextstrain_file(str(path))
+
+    assert tips == 1
+    assert [r["country_code"] for r in records] == ["GB"]
+
+
+def _mock_client_factory(monkeypatch, handler):
+    """Route every httpx.AsyncClient created by the nextstrain module through ``handler``."""
+    real_client = httpx.AsyncClient
+
+    def factory(*args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(handler)
+        return real_client(*args, **kwargs)
+
+    monkeypatch.setattr(nextstrain.httpx, "AsyncClient", factory)
+
+
+async def _fetch(datasets, concurrency=None):
+    responses = await nextstrain.download_datasets(datasets, concurrency)
+    return await nextstrain.parse_datasets(datasets, responses)
+
+
+@pytest.mark.asyncio
+async def test_download_and_parse_streams_response(monkeypatch):
+    body = json.dumps(AUSPICE).encode()
+    _mock_client_factory(monkeypatch, lambda request: httpx.Response(200, content=body))
+    monkeypatch.setattr(http_cache, "CHUNK_SIZE", 64)
+
+    records = await _fetch(["flu/seasonal/h3n2/ha/12y"])
+
+    assert [(r["country_code"], r["clade"], r["lineage"]) for r in records] == [
+        ("US", "2a", "h3n2"),
+        ("JP", "2a.1", "h3n2"),
+        ("KE", "2a.3", "h3n2"),
+    ]
+    assert records[1]["collection_date"] == date(2024, 4, 1)
+
+
+@pytest.mark.asyncio
+async def test_download_and_parse_fetches_datasets_concurrently_with_bound(monkeypatch):
+    in_flight = peak = 0
+    trees = {
+        "h3n2/ha": _node("USA", "2a", 2024.0),
+        "h3n2/na": _node("USA", "2a", 2024.0, [_node("USA", "2a", 2024.0), _node("USA", "2a", 2024.0)]),
+        "vic/ha": _node("Kenya", "V1A", 2024.0),
+        "yam/ha": _node("Japan", "Y3", 2024.0),
+    }
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        prefix = request.url.params["prefix"]
+        tree = next(t for key, t in trees.items() if key in prefix)
+        return httpx.Response(200, json={"tree": tree})
+
+    _mock_client_factory(monkeypatch, handler)
+    datasets = [f"flu/seasonal/{key}/12y" for key in trees]
+
+    records = await _fetch(datasets, concurrency=2)
+
+    assert peak == 2
+    # Segments of the same lineage overlap: the larger count wins instead of summing
+    assert sorted((r["lineage"], r["country_code"], r["count"]) for r in records) == [
+        ("h3n2", "US", 2),
+        ("vic", "KE", 1),
+        ("yam", "JP", 1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_download_and_parse_raises_when_a_dataset_fails(monkeypatch):
+    def handler(request):
+        if "vic" in request.url.params["prefix"]:
+            return httpx.Response(500)
+        return httpx.Response(200, json=AUSPICE)
+
+    _mock_client_factory(monkeypatch, handler)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await _fetch(["flu/seasonal/h3n2/ha/12y", "flu/seasonal/vic/ha/12y"])
+
+
+# --- aggregation tests ---
+
+
+def _seq(cc="US", clade="2a", day=date(2024, 1, 1), count=1):
+    return {"country_code": cc, "clade": clade, "lineage": "", "collection_date": day, "count": count}
+
+
+def test_parse_nextstrain_file_sums_sequences_sharing_a_key(tmp_path):
+    tree = _node("USA", "2a", 2024.0, [_node("United States", "2a", 2024.0), _node("US", "2a", 2024.0)])
+    path = tmp_path / "auspice.json"
+    path.write_text(json.dumps({"tree": tree}))
+
+    records, tips = parse_nextstrain_file(str(path))
+
+    # The USA root is the inferred ancestor of the two tips, not a third sequence
+    assert tips == 2
+    assert records == [_seq(count=2)]
+
+
+async def _fake_download(datasets, concurrency=None):
+    return []
+
+
+@pytest.mark.asyncio
+async def test_load_nextstrain_upserts_summed_counts(monkeypatch):
+    calls = []
+
+    async def fake_parse(datasets, responses):
+        return [_seq(count=4), _seq("GB", count=2)]
+
+    async def fake_upsert(session, table, records, constraint, update_columns):
+        calls.append((records, constraint, update_columns))
+        return UpsertResult(inserted=2)
+
+    monkeypatch.setattr(nextstrain, "download_datasets", _fake_download)
+    monkeypatch.setattr(nextstrain, "parse_datasets", fake_parse)
+    monkeypatch.setattr(nextstrain, "bulk_upsert", fake_upsert)
+
+    assert await nextstrain.load_nextstrain(force=True) == (2, [])
+    assert calls == [([_seq(count=4), _seq("GB", count=2)], "uq_genomic_seq", ["count"])]
+
+
+@pytest.mark.asyncio
+async def test_load_nextstrain_drops_unconfigured_lineages(monkeypatch, db_session):
+    db_session.add_all(
+        [
+            GenomicSequence(country_code="US", clade="2a", lineage="", collection_date=date(2024, 1, 1), count=9),
+            GenomicSequence(country_code="US", clade="2a", lineage="h3n2", collection_date=date(2024, 1, 1), count=1),
+            GenomicSequence(country_code="KE", clade="V1", lineage="vic", collection_date=date(2024, 1, 1), count=3),
+        ]
+    )
+    await db_session.commit()
+
+    async def fake_parse(datasets, responses):
+        return [{**_seq(), "lineage": "h3n2"}]
+
+    async def fake_upsert(session, table, records, constraint, update_columns):
+        return UpsertResult(unchanged=1)
+
+    monkeypatch.setattr(settings, "NEXTSTRAIN_DATASETS", ["flu/seasonal/h3n2/ha/12y"])
+    monkeypatch.setattr(nextstrain, "download_datasets", _fake_download)
+    monkeypatch.setattr(nextstrain, "parse_datasets", fake_parse)
+    monkeypatch.setattr(nextstrain, "bulk_upsert", fake_upsert)
+
+    await nextstrain.load_nextstrain(force=True)
+
+    rows = (await db_session.execute(select(GenomicSequence.lineage, GenomicSequence.count))).all()
+    assert [tuple(r) for r in rows] == [("h3n2", 1)]
+
+
+@pytest.mark.asyncio
+async def test_load_nextstrain_skips_unchanged_datasets(monkeypatch):
+    _mock_client_factory(monkeypatch, lambda request: httpx.Response(200, json=AUSPICE))
+    monkeypatch.setattr(settings, "NEXTSTRAIN_DATASETS", ["flu/seasonal/h3n2/ha/12y", "flu/seasonal/vic/ha/12y"])
+    upserts = []
+
+    async def fake_upsert(session, table, records, constraint, update_columns):
+        upserts.append(len(records))
+        return UpsertResult(inserted=len(records))
+
+    monkeypatch.setattr(nextstrain, "bulk_upsert", fake_upsert)
+
+    assert await nextstrain.load_nextstrain() == (6, [])
+    assert await nextstrain.load_nextstrain() == (0, [])
+    assert await nextstrain.load_nextstrain(force=True) == (6, [])
+    assert upserts == [6, 6]
+
+
+@pytest.mark.asyncio
+async def test_load_nextstrain_leaves_shadow_responses_unprocessed(monkeypatch):
+    _mock_client_factory(monkeypatch, lambda request: httpx.Response(200, json=AUSPICE))
+    monkeypatch.setattr(settings, "NEXTSTRAIN_DATASETS", ["flu/seasonal/h3n2/ha/12y"])
+
+    async def fake_upsert(session, table, records, constraint, update_columns):
+        return UpsertResult(inserted=len(records))
+
+    monkeypatch.setattr(nextstrain, "bulk_upsert", fake_upsert)
+    async with engine.begin() as conn:
+        shadow = await create_shadow_table(conn, GenomicSequence.__table__)
 
-    assert records == []
+    rows, pending = await nextstrain.load_nextstrain(shadow)
+    assert (rows, len(pending)) == (3, 1)
+    # Until the caller marks them after the swap, the datasets still count as changed
+    assert (await nextstrain.load_nextstrain(shadow))[0] == 3
+    http_cache.response_cache.mark_processed(pending)
+    assert await nextstrain.load_nextstrain(shadow) == (0, [])
@@ -0,0 +1,99 @@
+from datetime import date
+
+from sqlalchemy import select, update
+
+from app.models import FluCase, FluCaseWeekly
+from app.services import flunet
+from app.services.bulk import UpsertResult
+from app.services.rollup import refresh_weekly_rollup
+
+
+def _case(cc, week, cases, flu_type="H3N2", source="who_flunet", region=""):
+    return FluCase(
+        country_code=cc,
+        region=region,
+        flu_type=flu_type,
+        source=source,
+        time=week,
+        new_cases=cases,
+        iso_year=week.isocalendar()[0],
+        iso_week=week.isocalendar()[1],
+    )
+
+
+async def _weekly(session) -> list[tuple]:
+    result = await session.execute(
+        select(
+            FluCaseWeekly.time, FluCaseWeekly.country_code, FluCaseWeekly.flu_type, FluCaseWeekly.new_cases
+        ).order_by(FluCaseWeekly.time, FluCaseWeekly.country_code, FluCaseWeekly.flu_type)
+    )
+    return [(r.time, r.country_code, r.flu_type.value, r.new_cases) for r in result]
+
+
+async def test_refresh_sums_rows_per_week_country_and_type(db_session):
+    week = date(2025, 1, 6)
+    db_session.add_all(
+        [
+            _case("US", week, 10),
+            _case("US", week, 5, region="CA"),
+            _case("US", week, 2, source="other"),
+            _case("US", week, 7, flu_type="H1N1"),
+            _case("GB", week, 3),
+        ]
+    )
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
+    await db_session.commit()
+
+    assert await _weekly(db_session) == [
+        (week, "GB", "H3N2", 3),
+        (week, "US", "H1N1", 7),
+        (week, "US", "H3N2", 17),
+    ]
+
+
+async def test_refresh_only_touches_given_weeks(db_session):
+    first, second = date(2025, 1, 6), date(2025, 1, 13)
+    db_session.add_all([_case("US", first, 1), _case("US", second, 2)])
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
+    await db_session.execute(update(FluCase).values(new_cases=FluCase.new_cases + 10))
+
+    await refresh_weekly_rollup(db_session, [second])
+    assert await _weekly(db_session) == [(first, "US", "H3N2", 1), (second, "US", "H3N2", 12)]
+
+    await refresh_weekly_rollup(db_session, [])
+    assert len(await _weekly(db_session)) == 2
+
+
+async def test_flunet_upsert_refreshes_the_weeks_it_wrote(db_session, monkeypatch):
+    touched = []
+
+    async def fake_upsert(session, table, records, constraint, update_columns):
+        return UpsertResult(inserted=len(records))
+
+    async def fake_refresh(session, weeks):
+        touched.append(weeks)
+
+    async def no_watermarks(session, source, records):
+        return None
+
+    monkeypatch.setattr(flunet, "bulk_upsert", fake_upsert)
+    monkeypatch.setattr(flunet, "refresh_weekly_rollup", fake_refresh)
+    monkeypatch.setattr(flunet, "_advance_watermarks", no_watermarks)
+    records = [
+        {"country_code": cc, "region": "", "city": "", "flu_type": "H3N2", "source": "who_flunet", "time": week}
+        for cc, week in [("US", date(2025, 1, 6)), ("GB", date(2025, 1, 6)), ("US", date(2025, 1, 13))]
+    ]
+
+    await flunet._upsert_records(records)
+    assert touched == [{date(2025, 1, 6), date(2025, 1, 13)}]
+
+    # Nothing written: the rollup is left alone
+    monkeypatch.setattr(flunet, "bulk_upsert", lambda *args: _unchanged(records))
+    await flunet._upsert_records(records)
+    assert len(touched) == 1
+
+
+async def _unchanged(records):
+    return UpsertResult(unchanged=len(records))
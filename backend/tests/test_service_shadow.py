@@ -0,0 +1,104 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import UniqueConstraint, insert, select
+
+from app.models import FluCase, GenomicSequence
+from app.services import shadow
+from tests.conftest import engine
+
+
+def test_build_shadow_table_has_unique_constraint_but_no_secondary_indexes():
+    table = shadow.build_shadow_table(FluCase.__table__)
+
+    assert table.name == "flu_cases_shadow"
+    assert [c.name for c in table.columns] == [c.name for c in FluCase.__table__.columns]
+    assert table.indexes == set()
+    uniques = [c for c in table.constraints if isinstance(c, UniqueConstraint)]
+    assert [(u.name, list(u.columns.keys())) for u in uniques] == [
+        ("uq_flu_case_shadow", ["country_code", "region", "city", "flu_type", "source", "time"])
+    ]
+    assert shadow.unique_constraint_name(table) == "uq_flu_case_shadow"
+
+
+def test_unique_constraint_name_for_live_tables():
+    assert shadow.unique_constraint_name(FluCase.__table__) == "uq_flu_case"
+    assert shadow.unique_constraint_name(GenomicSequence.__table__) == "uq_genomic_seq"
+
+
+def test_swap_statements_restore_canonical_names():
+    statements = shadow.swap_statements(FluCase.__table__)
+
+    assert statements[:3] == [
+        "ALTER TABLE flu_cases RENAME TO flu_cases_old",
+        "ALTER TABLE flu_cases_shadow RENAME TO flu_cases",
+        "DROP TABLE flu_cases_old",
+    ]
+    assert "ALTER TABLE flu_cases RENAME CONSTRAINT flu_cases_shadow_pkey TO flu_cases_pkey" in statements
+    assert "ALTER TABLE flu_cases RENAME CONSTRAINT uq_flu_case_shadow TO uq_flu_case" in statements
+    assert "ALTER INDEX ix_flu_cases_time_covering_shadow RENAME TO ix_flu_cases_time_covering" in statements
+    assert "ALTER INDEX ix_flu_cases_country_code_shadow RENAME TO ix_flu_cases_country_code" in statements
+    assert statements[-1] == "ALTER SEQUENCE flu_cases_shadow_id_seq RENAME TO flu_cases_id_seq"
+
+
+def test_partitioned_shadow_table_keeps_partitioning():
+    table = shadow.build_shadow_table(FluCase.__table__, partitioned=True)
+
+    assert table.name == "flu_cases_shadow"
+    assert [c.name for c in table.primary_key.columns] == ["id", "time"]
+    assert table.dialect_options["postgresql"]["partition_by"] == "RANGE (time)"
+    assert shadow.unique_constraint_name(table) == "uq_flu_case_shadow"
+
+
+def test_partition_swap_statements_exchange_one_year():
+    statements = shadow.partition_swap_statements(FluCase.__table__, 2024)
+
+    assert statements[:3] == [
+        "ALTER TABLE flu_cases DETACH PARTITION flu_cases_y2024",
+        "DROP TABLE flu_cases_y2024",
+        "ALTER TABLE flu_cases_y2024_shadow RENAME TO flu_cases_y2024",
+    ]
+    assert "ALTER TABLE flu_cases_y2024 RENAME CONSTRAINT uq_flu_case_y2024_shadow TO uq_flu_case_y2024" in statements
+    assert (
+        "ALTER INDEX ix_flu_cases_time_covering_y2024_shadow RENAME TO ix_flu_cases_time_covering_y2024" in statements
+    )
+    assert statements[-2:] == [
+        "ALTER TABLE flu_cases ATTACH PARTITION flu_cases_y2024 FOR VALUES FROM ('2024-01-01') TO ('2024-12-30')",
+        "ALTER TABLE flu_cases_y2024 DROP CONSTRAINT flu_cases_y2024_bounds",
+    ]
+    # A year without a live partition is just attached
+    assert not any("DETACH" in s for s in shadow.partition_swap_statements(FluCase.__table__, 2024, replace=False))
+
+
+def test_partition_shadow_loads_like_the_live_table():
+    table = shadow.build_partition_shadow(FluCase.__table__, 2024)
+
+    assert table.name == "flu_cases_y2024_shadow"
+    assert shadow.unique_constraint_name(table) == "uq_flu_case_y2024_shadow"
+    assert table.autoincrement_column is table.c.id
+
+
+@pytest.mark.asyncio
+async def test_create_shadow_table_is_independent_of_live_table(seed_flu_cases):
+    async with engine.begin() as conn:
+        table = await shadow.create_shadow_table(conn, FluCase.__table__)
+        await conn.execute(
+            insert(table).values(
+                country_code="FR",
+                flu_type="H1N1",
+                time=date(2025, 6, 2),
+                new_cases=3,
+                iso_year=2025,
+                iso_week=23,
+            )
+        )
+
+    async with engine.connect() as conn:
+        shadow_rows = (await conn.execute(select(table.c.country_code, table.c.source))).all()
+        live_count = len((await conn.execute(select(FluCase.id))).all())
+
+    assert shadow_rows == [("FR", "who_flunet")]
+    assert live_count == len(seed_flu_cases)
+
+    async with engine.begin() as conn:
+        await shadow.drop_shadow_table(conn, FluCase.__table__)
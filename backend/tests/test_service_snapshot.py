@@ -0,0 +1,128 @@
+"""Tests for the in-memory case snapshot and its parity with the SQL endpoints."""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.models import FluCase
+from app.services import snapshot
+from app.services.forecast import generate_forecast
+from app.services.rollup import refresh_weekly_rollup
+from app.services.snapshot import CaseSnapshot, get_snapshot, refresh_snapshot
+
+WEEKS = [date(2024, 1, 1) + timedelta(weeks=i) for i in range(70)]
+
+
+@pytest.fixture(autouse=True)
+def _enable_snapshot(monkeypatch):
+    monkeypatch.setattr(snapshot.settings, "CASE_SNAPSHOT_ENABLED", True)
+    monkeypatch.setattr(snapshot, "_snapshot", None)
+
+
+@pytest_asyncio.fixture
+async def seed_weeks(db_session):
+    rng = random.Random(5)
+    for week in WEEKS:
+        for cc in ["US", "GB", "FR", "JP"]:
+            for flu_type in rng.sample(["H1N1", "H3N2", "B/Victoria", "A (unsubtyped)"], 2):
+                db_session.add(
+                    FluCase(
+                        country_code=cc,
+                        flu_type=flu_type,
+                        source="who_flunet",
+                        time=week,
+                        new_cases=rng.randint(0, 500),
+                        iso_year=week.isocalendar()[0],
+                        iso_week=week.isocalendar()[1],
+                    )
+                )
+    await db_session.flush()
+    await refresh_weekly_rollup(db_session)
+    await db_session.commit()
+
+
+def test_group_bys():
+    weeks = [date(2025, 1, 6), date(2025, 1, 13)]
+    snap = CaseSnapshot(
+        [weeks[1], weeks[0], weeks[0], weeks[1], weeks[1]],
+        ["US", "US", "GB", "GB", "US"],
+        ["H3N2", "H3N2", "H1N1", "H1N1", "H1N1"],
+        [5, 2, 4, 1, 6],
+    )
+
+    assert snap.max_date == weeks[1]
+    assert snap.total() == 18
+    assert snap.total(since=weeks[1]) == 12
+    assert snap.total(until=weeks[1]) == 6
+    assert snap.weekly_totals() == [(weeks[0], 6), (weeks[1], 12)]
+    assert snap.weekly_totals(country="GB") == [(weeks[0], 4), (weeks[1], 1)]
+    assert snap.weekly_totals(country="ZZ") == []
+    assert snap.country_totals(since=weeks[1]) == {"GB": 1, "US": 11}
+    assert snap.weekly_type_totals(since=weeks[1]) == [(weeks[1], "H1N1", 7), (weeks[1], "H3N2", 5)]
+    assert snap.dominant_types() == {"GB": "H1N1", "US": "H3N2"}
+    assert snap.country_weekly_series() == {"GB": [4, 1], "US": [2, 11]}
+    assert snap.week.dtype.name == "int32" and snap.cases.dtype.name == "int32"
+
+
+def test_empty_snapshot():
+    snap = CaseSnapshot([], [], [], [])
+    assert snap.max_date is None
+    assert snap.total() == 0
+    assert snap.weekly_totals() == []
+    assert snap.dominant_types() == {}
+
+
+async def test_disabled_snapshot_is_never_served(monkeypatch, seed_weeks):
+    await refresh_snapshot()
+    assert get_snapshot() is not None
+    monkeypatch.setattr(snapshot.settings, "CASE_SNAPSHOT_ENABLED", False)
+    assert get_snapshot() is None
+
+
+async def test_failed_rebuild_falls_back_to_sql(monkeypatch, seed_weeks):
+    await refresh_snapshot()
+
+    def broken(*columns):
+        raise ValueError("bad column")
+
+    monkeypatch.setattr(snapshot, "CaseSnapshot", broken)
+    await refresh_snapshot()
+    assert get_snapshot() is None
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/api/cases/summary",
+        "/api/cases/map",
+        "/api/cases/historical",
+        "/api/cases/historical?country=gb",
+        "/api/cases/subtypes",
+        "/api/cases/countries",
+        "/api/cases/countries?search=u",
+        "/api/cases/countries?continent=europe&sort=per_100k",
+        "/api/cases/countries?flu_type=h3n2&sort=delta",
+        "/api/cases/countries?sort=severity&after=GB&limit=1",
+        "/api/forecast?country=FR",
+    ],
+)
+async def test_endpoints_match_sql(client, seed_weeks, path):
+    from_sql = (await client.get(path)).json()
+    # Refreshing bumps the data version, so the SQL-computed responses are not served from cache
+    await refresh_snapshot()
+    assert get_snapshot() is not None
+    from_snapshot = (await client.get(path)).json()
+
+    if path == "/api/cases/map":
+        from_sql.sort(key=lambda p: p["country_code"])
+        from_snapshot.sort(key=lambda p: p["country_code"])
+    assert from_snapshot == from_sql
+    assert from_sql
+
+
+async def test_forecast_input_matches_sql(seed_weeks):
+    from_sql = await generate_forecast("US")
+    await refresh_snapshot()
+    assert await generate_forecast("US") == from_sql
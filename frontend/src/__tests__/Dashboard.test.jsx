@@ -4,14 +4,7 @@ import { MemoryRouter } from 'react-router-dom'
 
 vi.mock('../api', () => ({
   api: {
-    summary: vi.fn(),
-    mapData: vi.fn(),
-    historical: vi.fn(),
-    forecast: vi.fn(),
-    subtypes: vi.fn(),
-    countries: vi.fn(),
-    anomalies: vi.fn(),
-    genomicTrends: vi.fn(),
+    dashboard: vi.fn(),
   },
 }))
 
@@ -22,7 +15,9 @@ vi.mock('../components/ChoroplethMap', () => ({
 }))
 
 vi.mock('../components/HistoricalChart', () => ({
-  default: () => <div>MockHistoricalChart</div>,
+  default: ({ forecastUnavailable }) => (
+    <div>MockHistoricalChart{forecastUnavailable && ' (forecast unavailable)'}</div>
+  ),
 }))
 
 vi.mock('../components/CladeTrends', () => ({
@@ -63,15 +58,20 @@ function renderDashboard() {
   )
 }
 
+const bundleData = {
+  summary: summaryData,
+  map: [],
+  historical: [],
+  forecast: { historical: [], forecast: [] },
+  subtypes: [],
+  countries: countriesData,
+  anomalies: [],
+  clade_trends: [],
+  errors: [],
+}
+
 beforeEach(() => {
-  api.summary.mockResolvedValue(summaryData)
-  api.mapData.mockResolvedValue([])
-  api.historical.mockResolvedValue([])
-  api.forecast.mockResolvedValue([])
-  api.subtypes.mockResolvedValue([])
-  api.countries.mockResolvedValue(countriesData)
-  api.anomalies.mockResolvedValue([])
-  api.genomicTrends.mockResolvedValue([])
+  api.dashboard.mockResolvedValue(bundleData)
 })
 
 afterEach(() => {
@@ -93,8 +93,8 @@ describe('Dashboard', () => {
     await waitFor(() => expect(screen.getByText('Country Dashboard')).toBeInTheDocument())
   })
 
-  it('summaryError — error message visible, KPI section absent', async () => {
-    api.summary.mockRejectedValue(new Error('summary failed'))
+  it('bundle error — section errors visible, KPI section absent', async () => {
+    api.dashboard.mockRejectedValue(new Error('dashboard failed'))
     renderDashboard()
 
     await waitFor(() =>
@@ -103,34 +103,52 @@ describe('Dashboard', () => {
       ).toBeInTheDocument(),
     )
     expect(screen.queryByText('Total Cases')).not.toBeInTheDocument()
+    expect(
+      screen.getByText('Unable to load anomaly alerts — please refresh.'),
+    ).toBeInTheDocument()
+    expect(
+      screen.getByText('Failed to load country data — please refresh.'),
+    ).toBeInTheDocument()
   })
 
-  it('anomaliesError — AlertBar shows error message', async () => {
-    api.anomalies.mockRejectedValue(new Error('anomalies failed'))
+  it('section errors — only the failed sections show errors', async () => {
+    api.dashboard.mockResolvedValue({
+      ...bundleData,
+      clade_trends: null,
+      forecast: null,
+      errors: ['clade_trends', 'forecast'],
+    })
     renderDashboard()
 
-    await waitFor(() =>
-      expect(
-        screen.getByRole('region', { name: 'Anomaly alerts' }),
-      ).toBeInTheDocument(),
-    )
-    await waitFor(() =>
-      expect(
-        screen.getByText('Unable to load anomaly alerts — please refresh.'),
-      ).toBeInTheDocument(),
-    )
+    await waitFor(() => expect(screen.getByText('Total Cases')).toBeInTheDocument())
+    expect(
+      screen.getByText('Failed to load clade trend data — please refresh.'),
+    ).toBeInTheDocument()
+    expect(screen.getByText('MockHistoricalChart (forecast unavailable)')).toBeInTheDocument()
+    expect(screen.getByText('MockSubtypeTrends')).toBeInTheDocument()
+    expect(screen.getByText('No active anomalies')).toBeInTheDocument()
+    expect(
+      screen.queryByText('Failed to load country data — please refresh.'),
+    ).not.toBeInTheDocument()
+  })
+
+  it('loads the page in a single request', async () => {
+    renderDashboard()
+
+    await waitFor(() => expect(screen.getByText('Total Cases')).toBeInTheDocument())
+    expect(api.dashboard).toHaveBeenCalledTimes(1)
+    expect(api.dashboard).toHaveBeenCalledWith('')
   })
 
-  it('country selection — api.historical and api.forecast called with country=US', async () => {
+  it('country selection — api.dashboard called with country=US', async () => {
     renderDashboard()
 
-    await waitFor(() => expect(api.historical).toHaveBeenCalledWith(''))
+    await waitFor(() => expect(api.dashboard).toHaveBeenCalledWith(''))
 
     fireEvent.click(screen.getByText('MockMap'))
 
     await waitFor(() =>
-      expect(api.historical).toHaveBeenCalledWith('country=US'),
+      expect(api.dashboard).toHaveBeenCalledWith('country=US'),
     )
-    expect(api.forecast).toHaveBeenCalledWith('country=US')
   })
 })
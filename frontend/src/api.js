@@ -15,6 +15,7 @@ async function fetchJson(path) {
 }
 
 export const api = {
+  dashboard: (params = '') => fetchJson(`/dashboard${params ? '?' + params : ''}`),
   summary: () => fetchJson('/cases/summary'),
   mapData: () => fetchJson('/cases/map'),
   historical: (params = '') => fetchJson(`/cases/historical${params ? '?' + params : ''}`),
@@ -194,32 +194,29 @@ const IconTrending = (
 
 export default function Dashboard() {
   const [selectedCountry, setSelectedCountry] = useState('')
-  const { data: summary, error: summaryError } = useApi(() => api.summary(), [])
-  const { data: mapData, error: mapError } = useApi(() => api.mapData(), [])
-  const historicalParams = selectedCountry ? `country=${selectedCountry}` : ''
-  const { data: historical, error: historicalError } = useApi(
-    () => api.historical(historicalParams),
+  // The whole page comes from one /api/dashboard request; the selected country only
+  // changes its historical and forecast sections
+  const countryParams = selectedCountry ? `country=${selectedCountry}` : ''
+  const { data: bundle, error: bundleError } = useApi(
+    () => api.dashboard(countryParams),
     [selectedCountry],
   )
-  const forecastParams = selectedCountry ? `country=${selectedCountry}` : ''
-  const { data: forecast, error: forecastError } = useApi(
-    () => api.forecast(forecastParams),
-    [selectedCountry],
-  )
-  const { data: subtypes, error: subtypesError } = useApi(() => api.subtypes(), [])
-  const { data: countries, error: countriesError } = useApi(() => api.countries(), [])
-  const { data: anomalies, error: anomaliesError } = useApi(() => api.anomalies(), [])
-  const { data: cladeTrends, error: cladeTrendsError } = useApi(() => api.genomicTrends(), [])
+  const {
+    summary, map: mapData, historical, forecast, subtypes, countries, anomalies, clade_trends: cladeTrends,
+  } = bundle || {}
+  // A failed request fails every section; otherwise only those the bundle lists in errors
+  const failedSections = new Set(bundle?.errors || [])
+  const failed = (section) => Boolean(bundleError) || failedSections.has(section)
 
   const weekChangePct = summary?.week_change_pct
   const weekUp = weekChangePct >= 0
 
   return (
     <div style={{ minHeight: '100vh', paddingBottom: 24 }}>
-      <ErrorBoundary><AlertBar anomalies={anomalies} loadError={anomaliesError} /></ErrorBoundary>
+      <ErrorBoundary><AlertBar anomalies={anomalies} loadError={failed('anomalies')} /></ErrorBoundary>
 
       {/* ── KPI Cards ── */}
-      {summaryError ? (
+      {failed('summary') ? (
         <div style={{ padding: '16px 24px' }}>
           <ErrorCard message="Failed to load summary data — please refresh." />
         </div>
@@ -287,7 +284,7 @@ export default function Dashboard() {
       </div>
 
       <div className="grid-hero">
-        {mapError ? (
+        {failed('map') ? (
           <ErrorCard message="Failed to load map data — please refresh." />
         ) : (
           <ErrorBoundary>
@@ -298,15 +295,15 @@ export default function Dashboard() {
             />
           </ErrorBoundary>
         )}
-        {historicalError ? (
+        {failed('historical') ? (
           <ErrorCard message="Failed to load historical data — please refresh." />
         ) : (
           <ErrorBoundary>
             <HistoricalChart
               data={historical}
               country={selectedCountry}
-              forecast={forecastError ? null : forecast}
-              forecastUnavailable={!!forecastError}
+              forecast={forecast}
+              forecastUnavailable={failed('forecast')}
             />
           </ErrorBoundary>
         )}
@@ -317,12 +314,12 @@ export default function Dashboard() {
         <div className="section-header__title">Trend Analysis</div>
       </div>
       <div className="grid-half">
-        {cladeTrendsError ? (
+        {failed('clade_trends') ? (
           <ErrorCard message="Failed to load clade trend data — please refresh." />
         ) : (
           <ErrorBoundary><CladeTrends data={cladeTrends} /></ErrorBoundary>
         )}
-        {subtypesError ? (
+        {failed('subtypes') ? (
           <ErrorCard message="Failed to load subtype data — please refresh." />
         ) : (
           <ErrorBoundary><SubtypeTrends data={subtypes} /></ErrorBoundary>
@@ -343,7 +340,7 @@ export default function Dashboard() {
         )}
       </div>
       <div style={{ padding: '0 24px' }}>
-        {countriesError ? (
+        {failed('countries') ? (
           <ErrorCard message="Failed to load country data — please refresh." />
         ) : countries ? (
           <ErrorBoundary>